@@ -145,4 +145,40 @@ DEBUG_IP_OVERRIDE = config("DEBUG_IP_OVERRIDE", default=None)
 # ========================
 # POLICY VERSIONING
 # ========================
-COOKIE_POLICY_VERSION = "1.0"
\ No newline at end of file
+COOKIE_POLICY_VERSION = "1.0"
+
+# ========================
+# CATALOG API
+# ========================
+CATALOG_PAGE_SIZE = 50        # Default page size of the paginated product lists
+CATALOG_MAX_PAGE_SIZE = 500   # Upper limit for ?page_size=
+CATALOG_SNAPSHOT_ENABLED = False  # Serve product views from the per-worker in-memory catalog snapshot
+CATALOG_PAYLOAD_CACHE_TIMEOUT = 60 * 60  # Seconds a rendered, compressed catalog response stays cached
+CATALOG_EXPORT_DIR = BASE_DIR / 'data' / 'exports'  # Columnar catalog exports served by /api/products/export/
+
+# ========================
+# CACHE
+# ========================
+# Holds the catalog version used for ETags and cached catalog data.
+# Local memory is per process; use a shared backend (Redis, Memcached)
+# in production so every worker sees catalog updates.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# ========================
+# PRICE SCRAPERS
+# ========================
+# Base URL of each supermarket's online shop, by Supermarket name
+SCRAPER_BASE_URLS = {
+    'Tesco': config('SCRAPER_TESCO_URL', default='https://nakup.itesco.cz'),
+    'Billa': config('SCRAPER_BILLA_URL', default='https://shop.billa.cz'),
+    'Albert': config('SCRAPER_ALBERT_URL', default='https://www.albert.cz'),
+}
+SCRAPER_MAX_CONCURRENCY_PER_HOST = 4  # Requests in flight per shop
+SCRAPER_MIN_INTERVAL = 0.25           # Seconds between two request starts on one shop
+SCRAPER_RETRIES = 3                   # Extra attempts after a timeout, 429 or 5xx
+SCRAPER_RETRY_BACKOFF = 1.0           # Seconds before the first retry, doubled for each further one
+SCRAPER_TIMEOUT = 15                  # Seconds per request
@@ -6,12 +6,14 @@ This allows admins to view, add, edit, and delete:
 - Generic products (e.g., "Milk 1L")
 - Supermarkets (e.g., Tesco, Billa)
 - Product variants (specific brands in shops)
+- Best prices (cheapest variant per product, maintained automatically)
 """
 
 from django.contrib import admin
-from products.models import Category, GenericProduct, Supermarket, ProductVariant
+from products.models import BestPrice, Category, GenericProduct, Supermarket, ProductVariant
 
 admin.site.register(Category)
 admin.site.register(GenericProduct)
 admin.site.register(Supermarket)
-admin.site.register(ProductVariant)
\ No newline at end of file
+admin.site.register(ProductVariant)
+admin.site.register(BestPrice)
@@ -5,5 +5,9 @@ class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
 
+    def ready(self):
+        # Keeps the BestPrice table in line with variant writes
+        from products import signals  # noqa: F401
+
 
 #defines how Django initializes the products app    
@@ -0,0 +1,289 @@
+"""
+Prefix autocomplete for the product search box.
+
+Completions are the names of GenericProducts and ProductVariants. Every
+name is stored once per word start, folded like the search index
+("Madeta Jihočeské máslo" -> "madeta jihoceske maslo", "jihoceske maslo",
+"maslo"), in one sorted list of keys with a parallel array of entry ids.
+A lookup is two bisects that bound the keys with the typed prefix, so
+typing "jihoc" or "masl" both suggest the butter.
+
+Built lazily on the first request and patched per product by the signal
+handlers in `products.signals` after each committed catalog write: the
+keys of a changed product are deleted and re-inserted at their bisected
+positions, without re-sorting the list. Like the search index, the
+autocomplete is tagged with the catalog version it is current at and
+rebuilt when a write from another process moved the version.
+
+Ranking every key under a prefix costs as much as the prefix is common,
+so each prefix keeps its best TOP_COMPLETIONS entry ids: computed with
+the index for prefixes up to PRECOMPUTED_PREFIX_LENGTH characters, on
+first use for longer ones. Patches insert into and remove from those
+lists; a list that lost entries below the requested limit is recomputed
+from its key range.
+"""
+
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+from products.models import GenericProduct, ProductVariant
+from products.search import fold, tokenize
+from products.versioning import get_catalog_version
+
+TOP_COMPLETIONS = 20  # Ranked entries kept per prefix: the autocomplete view's largest ?limit=
+PRECOMPUTED_PREFIX_LENGTH = 4
+MAX_LAZY_PREFIXES = 50000  # Longer prefixes ranked on use; the oldest are dropped first
+
+PRODUCT = "product"
+VARIANT = "variant"
+
+
+def _rank(entry):
+    # Products before variants; within each, cheaper first
+    text, product_id, kind, price = entry
+    return (kind != PRODUCT, price is None, price or 0, text, product_id)
+
+
+def _word_start_keys(name):
+    """
+    Returns the folded name and every suffix of it that starts at a word.
+    """
+    tokens = tokenize(name)
+    return {" ".join(tokens[i:]) for i in range(len(tokens))}
+
+
+class Autocomplete:
+    """
+    Sorted-array completion index over product and variant names.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._version = None         # catalog version the index is current at
+        self._keys = []              # sorted folded keys
+        self._key_entries = array('I')  # entry id of each key
+        self._entries = {}           # entry id -> (text, product_id, kind, price)
+        self._next_entry_id = 0
+        self._product_entries = {}   # product_id -> [entry ids]
+        self._top = {}               # key prefix -> [best entry ids, whether that is every match]
+        self._lazy_prefixes = {}     # prefixes in _top ranked on use, oldest first
+
+    def invalidate(self):
+        """
+        Drops the index; it is rebuilt from the database on next use.
+        """
+        with self._lock:
+            self._built = False
+            self._keys = []
+            self._key_entries = array('I')
+            self._entries = {}
+            self._next_entry_id = 0
+            self._product_entries = {}
+            self._top = {}
+            self._lazy_prefixes = {}
+
+    def _load_entries(self, product_ids=None):
+        """
+        Reads completion entries: (text, product_id, kind, price) tuples.
+
+        Products are priced by their best deal; variant names sold in several
+        supermarkets are merged into one entry with the lowest price.
+        """
+        products = GenericProduct.objects.all()
+        variants = ProductVariant.objects.all()
+        if product_ids is not None:
+            products = products.filter(id__in=product_ids)
+            variants = variants.filter(generic_product_id__in=product_ids)
+
+        entries = [
+            (name, product_id, PRODUCT, price)
+            for product_id, name, price in products.values_list("id", "name", "best_price__price").iterator(chunk_size=2000)
+        ]
+
+        cheapest = {}
+        for product_id, name, price in variants.values_list("generic_product_id", "name", "price").iterator(chunk_size=2000):
+            key = (fold(name), product_id)
+            if key not in cheapest or price < cheapest[key][3]:
+                cheapest[key] = (name, product_id, VARIANT, price)
+        entries.extend(cheapest.values())
+        return entries
+
+    def _build(self):
+        # Read the version before the data: a concurrent write can only
+        # make the index newer than its label
+        self._version = get_catalog_version()
+        self._entries = {}
+        self._next_entry_id = 0
+        self._product_entries = {}
+        keyed = []
+        for entry in self._load_entries():
+            entry_id = self._register(entry)
+            keyed.extend((key, entry_id) for key in _word_start_keys(entry[0]))
+        keyed.sort()
+        self._keys = [key for key, _ in keyed]
+        self._key_entries = array('I', (entry_id for _, entry_id in keyed))
+        self._precompute_top()
+        self._built = True
+
+    def _precompute_top(self):
+        """
+        Ranks the entries under every prefix of up to PRECOMPUTED_PREFIX_LENGTH
+        characters in one pass over the keys per length.
+        """
+        entries = self._entries
+        order = sorted(entries, key=lambda entry_id: _rank(entries[entry_id]))
+        ordinal = {entry_id: position for position, entry_id in enumerate(order)}
+        # Keys by rank ordinal, so each prefix is ranked by nsmallest over ints
+        key_ordinals = array('I', (ordinal[entry_id] for entry_id in self._key_entries))
+        keys = self._keys
+        self._top = {}
+        self._lazy_prefixes = {}
+        for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1):
+            start = 0
+            while start < len(keys):
+                prefix = keys[start][:length]
+                if len(prefix) < length:
+                    start += 1  # Ranked with the shorter prefixes
+                    continue
+                end = bisect_left(keys, prefix + "\U0010ffff", start)
+                matches = set(key_ordinals[start:end])
+                self._top[prefix] = [
+                    [order[position] for position in heapq.nsmallest(TOP_COMPLETIONS, matches)],
+                    len(matches) <= TOP_COMPLETIONS,
+                ]
+                start = end
+
+    def _rank_range(self, key_prefix, count):
+        start = bisect_left(self._keys, key_prefix)
+        end = bisect_left(self._keys, key_prefix + "\U0010ffff", start)
+        matches = set(self._key_entries[start:end])
+        entries = self._entries
+        ranked = heapq.nsmallest(count, matches, key=lambda entry_id: _rank(entries[entry_id]))
+        return [ranked, len(matches) <= count]
+
+    def _top_prefixes(self, entry_id):
+        """
+        Yields the ranked lists of the prefixes of the entry's keys.
+        """
+        seen = set()
+        for key in _word_start_keys(self._entries[entry_id][0]):
+            for length in range(1, len(key) + 1):
+                prefix = key[:length]
+                top = self._top.get(prefix)
+                if top is not None and prefix not in seen:
+                    seen.add(prefix)
+                    yield top
+
+    def _register(self, entry):
+        entry_id = self._next_entry_id
+        self._next_entry_id += 1
+        self._entries[entry_id] = entry
+        self._product_entries.setdefault(entry[1], []).append(entry_id)
+        return entry_id
+
+    def _insert_keys(self, entry_id):
+        # Equal keys stay ordered by entry id, as after a build: new ids are the highest
+        for key in _word_start_keys(self._entries[entry_id][0]):
+            index = bisect_right(self._keys, key)
+            self._keys.insert(index, key)
+            self._key_entries.insert(index, entry_id)
+
+        entries = self._entries
+        rank = _rank(entries[entry_id])
+        for top in self._top_prefixes(entry_id):
+            ranked, exhaustive = top
+            # A list that is not every match can only take entries ranked
+            # above its last one: unlisted matches may rank in between
+            if not exhaustive and (not ranked or rank > _rank(entries[ranked[-1]])):
+                continue
+            ranked.insert(bisect_left(ranked, rank, key=lambda other: _rank(entries[other])), entry_id)
+            if len(ranked) > TOP_COMPLETIONS:
+                ranked.pop()
+                top[1] = False
+
+    def _remove_keys(self, entry_id):
+        for ranked, _ in self._top_prefixes(entry_id):
+            if entry_id in ranked:
+                ranked.remove(entry_id)
+        for key in _word_start_keys(self._entries.pop(entry_id)[0]):
+            index = bisect_left(self._keys, key)
+            while self._key_entries[index] != entry_id:  # Same key of other entries
+                index += 1
+            del self._keys[index]
+            del self._key_entries[index]
+
+    def _ensure_current(self):
+        if not self._built or self._version != get_catalog_version():
+            self._build()
+
+    def refresh_products(self, product_ids, version=None):
+        """
+        Replaces the completions of the given generic products.
+
+        `version` is the catalog version the write produced; the index
+        moves to it if it was exactly one version behind (see
+        SearchIndex.refresh_products).
+        """
+        product_ids = {product_id for product_id in product_ids if product_id is not None}
+        with self._lock:
+            if not self._built:
+                return  # Nothing cached yet; the next build picks it up
+
+            if product_ids:
+                for product_id in product_ids:
+                    for entry_id in self._product_entries.pop(product_id, ()):
+                        self._remove_keys(entry_id)
+                for entry in self._load_entries(product_ids):
+                    self._insert_keys(self._register(entry))
+            if version is not None and self._version == version - 1:
+                self._version = version
+
+    def complete(self, prefix, limit=10):
+        """
+        Returns up to `limit` completions for a typed prefix.
+
+        Products come before variants; within each, cheaper first. All
+        keys with the prefix are ranked, however many there are.
+        Limits up to TOP_COMPLETIONS are answered from the prefix's
+        ranked list.
+
+        Returns:
+            list: [{"text": "Madeta Jihočeské máslo", "product_id": 2,
+                    "type": "variant", "price": Decimal("69.90")}, ...]
+        """
+        key_prefix = " ".join(tokenize(prefix))
+        if not key_prefix:
+            return []
+        if prefix[-1:].isspace():
+            key_prefix += " "  # "madeta " must not complete to "madetaxyz"
+
+        with self._lock:
+            self._ensure_current()
+
+            if limit > TOP_COMPLETIONS:
+                ranked, _ = self._rank_range(key_prefix, limit)
+            else:
+                top = self._top.get(key_prefix)
+                if top is None or (len(top[0]) < limit and not top[1]):
+                    top = self._rank_range(key_prefix, TOP_COMPLETIONS)
+                    self._top[key_prefix] = top
+                    self._lazy_prefixes.pop(key_prefix, None)
+                    self._lazy_prefixes[key_prefix] = None
+                    if len(self._lazy_prefixes) > MAX_LAZY_PREFIXES:
+                        oldest = next(iter(self._lazy_prefixes))
+                        del self._lazy_prefixes[oldest]
+                        del self._top[oldest]
+                ranked = top[0][:limit]
+            matches = [self._entries[entry_id] for entry_id in ranked]
+
+        return [
+            {"text": text, "product_id": product_id, "type": kind, "price": price}
+            for text, product_id, kind, price in matches
+        ]
+
+
+# Shared instance used by the autocomplete view and kept current by signals
+autocomplete = Autocomplete()
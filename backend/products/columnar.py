@@ -0,0 +1,361 @@
+"""
+Compact columnar export of the whole catalog.
+
+Clients and analytics jobs load the catalog from one file instead of
+paging through JSON. The file holds four tables (categories,
+supermarkets, products, variants), stored column by column:
+- numbers are fixed-width little-endian integers ("<u4", "<i8", ...);
+  prices and amounts are integer hundredths (haléře), timestamps are
+  microseconds since the Unix epoch (UTC)
+- strings are dictionary-encoded: the column holds "<u4" codes into a
+  per-column dictionary of distinct values (offsets + UTF-8 bytes)
+- nulls are -1 in signed columns and NULL_CODE in string columns
+
+Layout:
+
+    MAGIC (8 bytes) | format version <u4 | header length <u4 | header JSON
+    | padding | column buffers, each aligned to ALIGNMENT bytes
+
+The JSON header names the catalog version and, for every column, its
+type and the offset/size of its buffer from the start of the data
+section. Buffers can therefore be memory-mapped and used in place
+(`ColumnarCatalog.open`, or numpy.frombuffer with the stored type).
+
+`import_catalog` applies a file's variant prices through the bulk
+ingestion path (one `ingest_price_feed` per supermarket); generic
+products are matched by id and supermarkets by name.
+
+`open_exported_catalog` keeps one export per catalog version on disk for
+the export endpoint, so downloads do not re-read the catalog.
+"""
+
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+
+from products.ingestion import INGEST_CHUNK_SIZE, ingest_price_feed
+from products.models import Category, GenericProduct, ProductVariant, Supermarket
+from products.services import from_halere, to_halere
+from products.versioning import get_catalog_version
+
+MAGIC = b"KOLIKCOL"
+FORMAT_VERSION = 1
+PRELUDE = struct.Struct("<8sII")  # magic, format version, header length
+ALIGNMENT = 8
+
+CONTENT_TYPE = "application/vnd.kolik.catalog"
+FILE_EXTENSION = "kcol"
+
+NULL_CODE = 0xFFFFFFFF  # Null in a dictionary-encoded string column
+
+# Stored types and the array typecodes holding them
+TYPECODES = {"<u1": "B", "<u2": "H", "<u4": "I", "<i4": "i", "<i8": "q"}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# Column kinds of each table: the values_list() field, its stored type and
+# how it is converted ("int", "cents", "time" or "str")
+TABLES = {
+    "categories": (Category, (
+        ("id", "id", "<u4", "int"),
+        ("name", "name", "<u4", "str"),
+    )),
+    "supermarkets": (Supermarket, (
+        ("id", "id", "<u4", "int"),
+        ("name", "name", "<u4", "str"),
+    )),
+    "products": (GenericProduct, (
+        ("id", "id", "<u4", "int"),
+        ("name", "name", "<u4", "str"),
+        ("amount", "amount", "<i4", "cents"),
+        ("unit", "unit", "<u4", "str"),
+        ("category_id", "category_id", "<u4", "int"),
+    )),
+    "variants": (ProductVariant, (
+        ("id", "id", "<u4", "int"),
+        ("generic_product_id", "generic_product_id", "<u4", "int"),
+        ("supermarket_id", "supermarket_id", "<u4", "int"),
+        ("name", "name", "<u4", "str"),
+        ("price", "price", "<i8", "cents"),
+        ("unit_price", "unit_price", "<i8", "cents"),
+        ("base_unit", "base_unit", "<u4", "str"),
+        ("last_updated", "last_updated", "<i8", "time"),
+    )),
+}
+
+
+class CatalogFormatError(ValueError):
+    """
+    Raised for a file that is not a columnar catalog of a known format version.
+    """
+
+
+def _little_endian(values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _encode_column(values, kind, typecode):
+    """
+    Returns the buffers of one column: {"values": bytes} plus, for strings,
+    the dictionary's {"offsets": bytes, "data": bytes}.
+    """
+    if kind == "str":
+        codes, strings = {}, []
+        encoded = array(typecode)
+        for value in values:
+            if value is None:
+                encoded.append(NULL_CODE)
+                continue
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(strings)
+                strings.append(value.encode())
+            encoded.append(code)
+        offsets = array("I", [0])
+        for string in strings:
+            offsets.append(offsets[-1] + len(string))
+        return {"values": _little_endian(encoded), "offsets": _little_endian(offsets), "data": b"".join(strings)}
+
+    if kind == "cents":
+        values = (-1 if value is None else to_halere(value) for value in values)
+    elif kind == "time":
+        values = (-1 if value is None else (value - EPOCH) // MICROSECOND for value in values)
+    return {"values": _little_endian(array(typecode, values))}
+
+
+def export_catalog(output):
+    """
+    Writes the whole catalog to a binary file object.
+
+    The header lists every buffer's offset, so it can only be written
+    once all buffers are encoded. They are encoded one table at a time
+    and spilled to a temporary file, which is copied after the header;
+    memory use is bounded by the largest table, not the whole catalog.
+
+    Returns:
+        dict: The file header (catalog version, row counts, column layout).
+    """
+    # Read the version before the data, as the catalog snapshot does: a
+    # concurrent write can only make the file newer than its label
+    version = get_catalog_version()
+    header = {
+        "format": FORMAT_VERSION,
+        "catalog_version": version,
+        "exported_at": timezone.now().isoformat(),
+        "tables": {},
+    }
+    spool = tempfile.TemporaryFile()
+    position = 0
+
+    def place(data):
+        nonlocal position
+        padding = -position % ALIGNMENT
+        spool.write(b"\0" * padding)
+        position += padding
+        entry = {"offset": position, "size": len(data)}
+        spool.write(data)
+        position += len(data)
+        return entry
+
+    with spool, transaction.atomic():
+        for table, (model, columns) in TABLES.items():
+            rows = list(model.objects.order_by("id").values_list(*(field for _, field, _, _ in columns)))
+            layout = {}
+            for index, (name, _, stored_type, kind) in enumerate(columns):
+                encoded = _encode_column((row[index] for row in rows), kind, TYPECODES[stored_type])
+                layout[name] = {"type": stored_type, "kind": kind, **place(encoded["values"])}
+                if kind == "str":
+                    layout[name]["dictionary"] = {
+                        "offsets": {"type": "<u4", **place(encoded["offsets"])},
+                        "data": place(encoded["data"]),
+                    }
+            header["tables"][table] = {"rows": len(rows), "columns": layout}
+            del rows
+
+        header_bytes = json.dumps(header, separators=(",", ":")).encode()
+        start = PRELUDE.size + len(header_bytes)
+        padding = -start % ALIGNMENT
+        output.write(PRELUDE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        output.write(header_bytes + b"\0" * padding)
+
+        spool.seek(0)
+        shutil.copyfileobj(spool, output)
+    return header
+
+
+def open_exported_catalog(directory):
+    """
+    Opens the current catalog version's export in `directory`, writing
+    it first if it is not there yet.
+
+    Each version is exported once and then served from disk; exports of
+    older versions are deleted when a newer one is written (open files
+    stay readable). Two workers missing the same version both export it,
+    and the second rename wins.
+
+    Returns:
+        file: The export, opened for binary reading.
+    """
+    directory = Path(directory)
+    try:
+        return open(directory / f"kolik-catalog-{get_catalog_version()}.{FILE_EXTENSION}", "rb")
+    except FileNotFoundError:
+        pass
+
+    directory.mkdir(parents=True, exist_ok=True)
+    output = tempfile.NamedTemporaryFile(dir=directory, suffix=".partial", delete=False)
+    try:
+        with output:
+            header = export_catalog(output)
+        # Named by the version the file was read at, which may be newer than the one looked up
+        version = header["catalog_version"]
+        path = directory / f"kolik-catalog-{version}.{FILE_EXTENSION}"
+        os.replace(output.name, path)
+    except BaseException:
+        os.unlink(output.name)
+        raise
+    exported = open(path, "rb")
+
+    for stale in directory.glob(f"kolik-catalog-*.{FILE_EXTENSION}"):
+        stale_version = stale.stem.removeprefix("kolik-catalog-")
+        if stale_version.isdigit() and int(stale_version) < version:
+            stale.unlink(missing_ok=True)
+    return exported
+
+
+class ColumnarCatalog:
+    """
+    Read access to a columnar catalog file held in a buffer (bytes or mmap).
+
+    Numeric columns are returned as zero-copy memoryviews on little-endian
+    machines; string columns are decoded through their dictionary.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = memoryview(buffer)
+        try:
+            magic, format_version, header_length = PRELUDE.unpack_from(self._buffer)
+        except struct.error:
+            raise CatalogFormatError("File is too short to be a columnar catalog.") from None
+        if magic != MAGIC:
+            raise CatalogFormatError("Not a columnar catalog file.")
+        if format_version != FORMAT_VERSION:
+            raise CatalogFormatError(f"Unsupported catalog format version {format_version}.")
+
+        header_end = PRELUDE.size + header_length
+        try:
+            self.header = json.loads(bytes(self._buffer[PRELUDE.size:header_end]))
+        except ValueError:
+            raise CatalogFormatError("Catalog header is not valid JSON.") from None
+        self._data_start = header_end + (-header_end % ALIGNMENT)
+
+    @classmethod
+    def open(cls, path):
+        """
+        Memory-maps a catalog file (read-only).
+        """
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:  # mmap cannot map an empty file
+                raise CatalogFormatError("File is too short to be a columnar catalog.")
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @property
+    def catalog_version(self):
+        return self.header["catalog_version"]
+
+    def rows(self, table):
+        return self.header["tables"][table]["rows"]
+
+    def _buffer_of(self, entry):
+        start = self._data_start + entry["offset"]
+        return self._buffer[start:start + entry["size"]]
+
+    def _array(self, entry):
+        typecode = TYPECODES[entry["type"]]
+        data = self._buffer_of(entry)
+        if sys.byteorder == "little":
+            return data.cast(typecode)
+        values = array(typecode, bytes(data))
+        values.byteswap()
+        return values
+
+    def column(self, table, name):
+        """
+        Returns the stored integers of a column (string columns: their codes).
+        """
+        return self._array(self.header["tables"][table]["columns"][name])
+
+    def dictionary(self, table, name):
+        """
+        Returns the distinct values of a string column, indexed by code.
+        """
+        entry = self.header["tables"][table]["columns"][name]["dictionary"]
+        offsets = self._array(entry["offsets"])
+        data = bytes(self._buffer_of(entry["data"]))
+        return [data[offsets[i]:offsets[i + 1]].decode() for i in range(len(offsets) - 1)]
+
+    def values(self, table, name):
+        """
+        Returns a column as Python values (str, int, Decimal or datetime; None for nulls).
+        """
+        entry = self.header["tables"][table]["columns"][name]
+        stored = self.column(table, name)
+        kind = entry["kind"]
+        if kind == "str":
+            strings = self.dictionary(table, name)
+            return [None if code == NULL_CODE else strings[code] for code in stored]
+        if kind == "cents":
+            return [None if value == -1 else from_halere(value) for value in stored]
+        if kind == "time":
+            return [None if value == -1 else EPOCH + value * MICROSECOND for value in stored]
+        return list(stored)
+
+
+def import_catalog(catalog, chunk_size=INGEST_CHUNK_SIZE):
+    """
+    Upserts the variant prices of a columnar catalog through the bulk
+    ingestion path.
+
+    Variants are grouped by supermarket and matched to this database's
+    supermarkets by name; supermarkets missing here are skipped. Rows of
+    unknown generic products are rejected like in a price feed.
+
+    Returns:
+        dict: {supermarket name: IngestReport}
+    """
+    names = dict(zip(catalog.column("supermarkets", "id"), catalog.values("supermarkets", "name")))
+    supermarkets = {supermarket.name: supermarket for supermarket in Supermarket.objects.filter(name__in=names.values())}
+
+    by_supermarket = {}
+    for index, supermarket_id in enumerate(catalog.column("variants", "supermarket_id")):
+        by_supermarket.setdefault(supermarket_id, []).append(index)
+
+    product_ids = catalog.column("variants", "generic_product_id")
+    variant_names = catalog.values("variants", "name")
+    prices = catalog.values("variants", "price")
+
+    reports = {}
+    for supermarket_id, indexes in by_supermarket.items():
+        supermarket = supermarkets.get(names.get(supermarket_id))
+        if supermarket is None:
+            continue
+        rows = (
+            (index + 1, {"generic_product_id": product_ids[index], "name": variant_names[index], "price": prices[index]})
+            for index in indexes
+        )
+        reports[supermarket.name] = ingest_price_feed(supermarket, rows, chunk_size)
+    return reports
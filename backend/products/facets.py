@@ -0,0 +1,166 @@
+"""
+Filters and facet counts for the product listings.
+
+Filters (query string, comma-separated lists allowed):
+- ?category=1,2: products of these categories
+- ?supermarket=3: products with a variant in these supermarkets
+- ?min_price= / ?max_price=: products with a variant in the price range
+  (in the selected supermarkets, if any)
+- ?unit=g,kg: products sold in these units
+
+Facet counts (?facets=true) tell how many products each value of each
+facet would give. They are disjunctive, as in most shop filters: the
+counts of a facet apply all the other filters but not its own, so a
+client can offer the alternatives of a choice it already made. All
+counts come from a single query with one conditional
+COUNT(DISTINCT ...) FILTER (WHERE ...) per facet value.
+"""
+
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Exists, OuterRef, Q
+
+from products.models import Category, GenericProduct, ProductVariant, Supermarket
+
+ProductFilters = namedtuple("ProductFilters", ["categories", "supermarkets", "units", "min_price", "max_price"])
+
+UNITS = [unit for unit, _ in GenericProduct.UNIT_CHOICES]
+
+
+def _id_list(value):
+    return [int(part) for part in value.split(",") if part.strip()] if value else []
+
+
+def _price(value):
+    if not value:
+        return None
+    price = Decimal(value)
+    if not price.is_finite() or price < 0:
+        raise ValueError
+    return price
+
+
+def parse_filters(params):
+    """
+    Reads the listing filters from the query string.
+
+    Raises:
+        ValueError: With a message for the client.
+    """
+    try:
+        categories = _id_list(params.get("category"))
+        supermarkets = _id_list(params.get("supermarket"))
+        min_price = _price(params.get("min_price"))
+        max_price = _price(params.get("max_price"))
+    except (ValueError, InvalidOperation):
+        raise ValueError("Category and supermarket must be ids; prices must be non-negative numbers.") from None
+
+    units = [unit for unit in params.get("unit", "").split(",") if unit]
+    if any(unit not in UNITS for unit in units):
+        raise ValueError(f"Unit must be one of: {', '.join(UNITS)}.")
+    return ProductFilters(categories, supermarkets, units, min_price, max_price)
+
+
+def has_filters(filters):
+    return any(value not in (None, []) for value in filters)
+
+
+def wants_facets(request):
+    """
+    True if the client asked for facet counts (?facets=true).
+    """
+    return request.GET.get("facets", "").lower() in ("1", "true", "yes")
+
+
+def _variant_conditions(filters, prefix="", supermarkets=None):
+    """
+    Returns the Q a variant (or, with prefix "variants__", a joined variant
+    row) must match for the supermarket and price filters.
+    """
+    supermarkets = filters.supermarkets if supermarkets is None else supermarkets
+    condition = Q()
+    if supermarkets:
+        condition &= Q(**{f"{prefix}supermarket_id__in": supermarkets})
+    if filters.min_price is not None:
+        condition &= Q(**{f"{prefix}price__gte": filters.min_price})
+    if filters.max_price is not None:
+        condition &= Q(**{f"{prefix}price__lte": filters.max_price})
+    return condition
+
+
+def _product_conditions(filters, skip=None):
+    condition = Q()
+    if filters.categories and skip != "category":
+        condition &= Q(category_id__in=filters.categories)
+    if filters.units and skip != "unit":
+        condition &= Q(unit__in=filters.units)
+    return condition
+
+
+def filter_products(products, filters):
+    """
+    Applies the filters to a GenericProduct queryset.
+
+    Variant filters use EXISTS, so a product appears once however many
+    of its variants match.
+    """
+    products = products.filter(_product_conditions(filters))
+    variant_condition = _variant_conditions(filters)
+    if variant_condition:
+        products = products.filter(Exists(
+            ProductVariant.objects.filter(variant_condition, generic_product_id=OuterRef("pk"))
+        ))
+    return products
+
+
+def facet_counts(filters, product_ids=None):
+    """
+    Counts the products for every category, supermarket and unit.
+
+    Args:
+        filters (ProductFilters): Current filters.
+        product_ids (list | None): Restrict counting to these products
+            (e.g. search results).
+
+    Returns:
+        dict: {"category": [{"id", "name", "count"}],
+               "supermarket": [{"id", "name", "count"}],
+               "unit": [{"value", "count"}]}
+    """
+    categories = list(Category.objects.order_by("id").values_list("id", "name"))
+    supermarkets = list(Supermarket.objects.order_by("id").values_list("id", "name"))
+
+    # Products are joined to their variants (LEFT OUTER JOIN) and counted
+    # distinctly; a product counts if any of its rows matches the filter
+    variant_row = _variant_conditions(filters, prefix="variants__")
+    aggregates = {}
+    for category_id, _ in categories:
+        aggregates[f"category_{category_id}"] = Count("id", distinct=True, filter=(
+            Q(category_id=category_id) & _product_conditions(filters, skip="category") & variant_row
+        ))
+    for unit in UNITS:
+        aggregates[f"unit_{unit}"] = Count("id", distinct=True, filter=(
+            Q(unit=unit) & _product_conditions(filters, skip="unit") & variant_row
+        ))
+    for supermarket_id, _ in supermarkets:
+        aggregates[f"supermarket_{supermarket_id}"] = Count("id", distinct=True, filter=(
+            _product_conditions(filters) & _variant_conditions(filters, prefix="variants__", supermarkets=[supermarket_id])
+        ))
+
+    products = GenericProduct.objects.all()
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids)
+    counts = products.aggregate(**aggregates)
+
+    return {
+        "category": [
+            {"id": category_id, "name": name, "count": counts[f"category_{category_id}"]}
+            for category_id, name in categories
+        ],
+        "supermarket": [
+            {"id": supermarket_id, "name": name, "count": counts[f"supermarket_{supermarket_id}"]}
+            for supermarket_id, name in supermarkets
+        ],
+        "unit": [{"value": unit, "count": counts[f"unit_{unit}"]} for unit in UNITS],
+    }
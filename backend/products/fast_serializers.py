@@ -0,0 +1,193 @@
+"""
+Fast serialization of product lists read with `.values_list()`.
+
+DRF ModelSerializers instantiate a model per row and run every field
+through its own to_representation. For long lists that dominates the
+response time. The functions here produce exactly the same JSON shape
+from `.values_list(..., named=True)` rows (joined columns included), so
+a list costs one query and one small dict per row:
+
+    rows = products.values_list(*PRODUCT_VALUES, named=True)
+    data = [product_data(row) for row in rows]
+
+Rows are named tuples, so keyset pagination can still read `row.id` and
+`row.price`; the row functions unpack them positionally.
+
+Formats follow the DRF fields they replace: decimals as strings with the
+field's decimal places, datetimes in the current time zone as ISO 8601
+with "Z" for UTC, image URLs made absolute with the request.
+
+Clients that need only a few fields pass a sparse fieldset
+(?fields=id,name): `parse_fields` validates it against PRODUCT_FIELDS or
+VARIANT_FIELDS, `sparse_columns` gives the columns to read and
+`sparse_data_function` the rows' JSON. Columns that are not asked for
+are not read, and image URLs are only built when image_url is.
+
+Keep these in sync with products/serializers.py; the tests compare both.
+"""
+
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+
+from products.models import ProductVariant
+
+# Columns read for GenericProductSerializer's shape
+PRODUCT_VALUES = ("id", "name", "amount", "unit", "category__name")
+
+# Columns read for ProductVariantSerializer's shape (id for pagination)
+VARIANT_VALUES = (
+    "id", "name", "price", "unit_price", "base_unit", "supermarket__name", "image", "last_updated"
+)
+
+# Sparse fieldsets: output field -> column read for it. Variants also offer
+# "id", which their full shape leaves out.
+PRODUCT_FIELDS = {
+    "id": "id", "name": "name", "amount": "amount", "unit": "unit", "category": "category__name",
+}
+VARIANT_FIELDS = {
+    "id": "id", "variant_name": "name", "price": "price", "unit_price": "unit_price", "base_unit": "base_unit",
+    "supermarket": "supermarket__name", "image_url": "image", "last_updated": "last_updated",
+}
+
+
+def decimal_string(value):
+    """
+    Formats a two-decimal-place DecimalField value like DRF does ("18.90").
+
+    Only for values read from a decimal_places=2 column: the database
+    backends already return those with exactly two places, so DRF's
+    quantizing is skipped.
+    """
+    if value is None:
+        return None
+    return f"{value:f}"
+
+
+def datetime_string(value, time_zone):
+    """
+    Formats a datetime like DRF's DateTimeField (ISO 8601 in `time_zone`,
+    "Z" for UTC).
+    """
+    if not value:
+        return None
+    if timezone.is_aware(value):
+        value = value.astimezone(time_zone)
+    value = value.isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+def product_data(row):
+    """
+    GenericProductSerializer output for a PRODUCT_VALUES row.
+    """
+    product_id, name, amount, unit, category = row
+    return {
+        "id": product_id,
+        "name": name,
+        "amount": decimal_string(amount),
+        "unit": unit,
+        "category": category,
+    }
+
+
+def _image_url_function(request):
+    """
+    Returns name -> URL of a stored variant image, absolute for `request`.
+
+    For files on the local file system the URL is the storage's base URL
+    plus the quoted name, so the absolute prefix is built only once.
+    """
+    storage = ProductVariant._meta.get_field("image").storage
+
+    if isinstance(storage, FileSystemStorage):
+        prefix = request.build_absolute_uri(storage.base_url) if request else storage.base_url
+
+        def image_url(name):
+            return prefix + filepath_to_uri(name).lstrip("/") if name else None
+    else:
+        def image_url(name):
+            if not name:
+                return None
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request else url
+
+    return image_url
+
+
+def variant_data_function(request=None):
+    """
+    Returns a function turning a VARIANT_VALUES row into the
+    ProductVariantSerializer output, with image URLs made absolute for
+    `request`.
+    """
+    image_url = _image_url_function(request)
+    time_zone = timezone.get_current_timezone()
+
+    def variant_data(row):
+        _, name, price, unit_price, base_unit, supermarket, image, last_updated = row
+        return {
+            "variant_name": name,
+            "price": decimal_string(price),
+            "unit_price": decimal_string(unit_price),
+            "base_unit": base_unit,
+            "supermarket": supermarket,
+            "image_url": image_url(image),
+            "last_updated": datetime_string(last_updated, time_zone),
+        }
+
+    return variant_data
+
+
+def parse_fields(request, available):
+    """
+    Reads the sparse fieldset (?fields=id,name) of a request.
+
+    Returns:
+        tuple | None: The requested fields in order, None without ?fields=.
+
+    Raises:
+        ValueError: With a message for the client, for an empty list or
+            a field missing from `available`.
+    """
+    value = request.GET.get("fields")
+    if value is None:
+        return None
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(",") if field.strip()))
+    if not fields or any(field not in available for field in fields):
+        raise ValueError(f"Fields must be some of: {', '.join(available)}.")
+    return fields
+
+
+def sparse_columns(fields, available, keys=("id",)):
+    """
+    Returns the columns to read for a sparse fieldset: the pagination
+    `keys` first (named rows keep `row.id` and `row.price`), then the
+    requested fields' columns.
+    """
+    return tuple(dict.fromkeys((*keys, *(available[field] for field in fields))))
+
+
+def sparse_data_function(fields, available, columns, request=None):
+    """
+    Returns a function turning a `.values_list(*columns)` row into a dict
+    of just `fields`, formatted like the full serializers.
+    """
+    time_zone = timezone.get_current_timezone()
+    converters = {
+        "amount": decimal_string,
+        "price": decimal_string,
+        "unit_price": decimal_string,
+        "last_updated": lambda value: datetime_string(value, time_zone),
+    }
+    if "image_url" in fields:
+        converters["image"] = _image_url_function(request)
+
+    plan = [(field, columns.index(available[field]), converters.get(available[field])) for field in fields]
+
+    def data(row):
+        return {field: convert(row[index]) if convert else row[index] for field, index, convert in plan}
+
+    return data
@@ -0,0 +1,100 @@
+"""
+Range queries over the PriceHistory table.
+
+Series are downsampled in the database to one point per day and
+supermarket (min/avg/max of the prices recorded that day, in the
+Europe/Prague calendar), so a chart over months of history is a few
+hundred small rows.
+
+A point only exists for days on which a price was recorded; the price
+holds until the next point.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db.models import Avg, Max, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from products.models import PriceHistory, Supermarket
+from products.services import from_halere
+
+HISTORY_DEFAULT_DAYS = 90   # Range length if ?from= is missing
+HISTORY_MAX_DAYS = 731      # Longest range one request may ask for
+
+
+def _parse_bound(value, end_of_day=False):
+    """
+    Parses an ISO date or datetime; a bare date means the start (or end) of that day.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError
+        moment = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_time_range(params):
+    """
+    Reads ?from= and ?to= (ISO dates or datetimes, both inclusive).
+
+    Defaults to the last HISTORY_DEFAULT_DAYS days.
+
+    Returns:
+        tuple: (start, end) aware datetimes.
+
+    Raises:
+        ValueError: With a message for the client.
+    """
+    try:
+        end = _parse_bound(params["to"], end_of_day=True) if params.get("to") else timezone.now()
+        start = _parse_bound(params["from"]) if params.get("from") else end - timedelta(days=HISTORY_DEFAULT_DAYS)
+    except ValueError:
+        raise ValueError("Invalid date. Use YYYY-MM-DD or an ISO 8601 datetime.") from None
+
+    if start > end:
+        raise ValueError("'from' must not be after 'to'.")
+    if end - start > timedelta(days=HISTORY_MAX_DAYS):
+        raise ValueError(f"The range must not be longer than {HISTORY_MAX_DAYS} days.")
+    return start, end
+
+
+def daily_price_series(start, end, **filters):
+    """
+    Returns the daily min/avg/max prices of the history rows matching
+    `filters` (e.g. variant_id=5 or generic_product_id=2) between start
+    and end, grouped by supermarket.
+
+    Returns:
+        list: [{"supermarket": "Billa", "points": [{"date": date(2025, 5, 1),
+                "min": Decimal("18.90"), "avg": Decimal("19.40"),
+                "max": Decimal("21.90")}, ...]}, ...] ordered by supermarket name.
+    """
+    rows = (
+        PriceHistory.objects
+        .filter(recorded_at__range=(start, end), **filters)
+        .annotate(day=TruncDate("recorded_at"))
+        .values("supermarket_id", "day")
+        .annotate(low=Min("price_halere"), mean=Avg("price_halere"), high=Max("price_halere"))
+        .order_by("supermarket_id", "day")
+    )
+
+    points = {}
+    for row in rows:
+        points.setdefault(row["supermarket_id"], []).append({
+            "date": row["day"],
+            "min": from_halere(row["low"]),
+            "avg": from_halere(round(row["mean"])),
+            "max": from_halere(row["high"]),
+        })
+
+    names = dict(Supermarket.objects.filter(id__in=points).values_list("id", "name"))
+    return sorted(
+        ({"supermarket": names.get(supermarket_id), "points": series} for supermarket_id, series in points.items()),
+        key=lambda series: series["supermarket"] or "",
+    )
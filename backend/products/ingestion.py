@@ -0,0 +1,225 @@
+"""
+Bulk price feed ingestion.
+
+A price feed is a list of offers of one supermarket, one per row, as CSV
+(with a header line) or NDJSON (one JSON object per line):
+
+    generic_product_id,name,price
+    1,Madeta Jihočeské máslo,69.90
+
+    {"generic_product_id": 1, "name": "Madeta Jihočeské máslo", "price": "69.90"}
+
+Rows are matched to existing variants by (supermarket, generic product,
+name) and upserted in chunks with a single `bulk_create(update_conflicts=True)`
+per chunk, so a 50k-row feed is a few dozen queries instead of 100k. Rows
+whose price did not change are not written at all; new and changed prices
+are appended to PriceHistory.
+
+Bulk writes bypass model signals, so `variants_bulk_changed` is sent once
+at the end; its receivers refresh best prices, in-memory indexes and the
+catalog version.
+"""
+
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from products.models import GenericProduct, ProductVariant
+from products.services import record_price_changes
+from products.signals import variants_bulk_changed
+
+INGEST_CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 20  # Rejected rows beyond this are only counted
+
+FEED_FORMATS = ("csv", "ndjson")
+
+
+class FeedError(ValueError):
+    """
+    Raised for a feed that cannot be read at all (unknown format, bad header).
+    """
+
+
+def parse_csv(lines):
+    """
+    Yields (line_number, row dict) from CSV text lines with a header.
+    """
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None or not {"generic_product_id", "name", "price"} <= set(reader.fieldnames):
+        raise FeedError("CSV header must contain generic_product_id, name and price.")
+    for row in reader:
+        yield reader.line_num, row
+
+
+def parse_ndjson(lines):
+    """
+    Yields (line_number, row dict) from NDJSON text lines; blank lines are skipped.
+    Malformed lines are yielded as strings so they can be reported.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = line
+        yield line_number, row
+
+
+def parse_feed(lines, feed_format):
+    if feed_format == "csv":
+        return parse_csv(lines)
+    if feed_format == "ndjson":
+        return parse_ndjson(lines)
+    raise FeedError(f"Unknown feed format: {feed_format}. Use one of: {', '.join(FEED_FORMATS)}.")
+
+
+def _clean_row(row):
+    """
+    Returns (generic_product_id, name, price) for a feed row or raises ValueError.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("not a JSON object")
+    try:
+        generic_product_id = int(row["generic_product_id"])
+        name = str(row["name"]).strip()
+        price = Decimal(str(row["price"])).quantize(Decimal("0.01"))
+    except KeyError as error:
+        raise ValueError(f"missing field {error}") from None
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError("invalid generic_product_id or price") from None
+    if not name or len(name) > ProductVariant._meta.get_field("name").max_length:
+        raise ValueError("invalid name")
+    if not Decimal("0") <= price < Decimal("10000"):
+        raise ValueError("price out of range")
+    return generic_product_id, name, price
+
+
+class IngestReport:
+    """
+    Counts of what an ingestion did with the feed rows.
+    """
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.rejected = 0
+        self.errors = []
+        self.product_ids = set()  # Generic products with new or changed variants
+
+    def reject(self, line_number, reason):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"Line {line_number}: {reason}")
+
+    def as_dict(self):
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+
+def _ingest_chunk(supermarket, chunk, report):
+    # Validate rows; later rows win over earlier ones with the same key
+    offers = {}
+    for line_number, row in chunk:
+        try:
+            generic_product_id, name, price = _clean_row(row)
+        except ValueError as error:
+            report.reject(line_number, error)
+            continue
+        offers[(generic_product_id, name)] = (line_number, price)
+
+    known_products = GenericProduct.objects.only("id", "amount", "unit", "category").in_bulk(
+        {key[0] for key in offers}
+    )
+    for key, (line_number, _) in list(offers.items()):
+        if key[0] not in known_products:
+            report.reject(line_number, f"unknown generic_product_id {key[0]}")
+            del offers[key]
+    if not offers:
+        return
+
+    existing = {
+        (generic_product_id, name): price
+        for generic_product_id, name, price in ProductVariant.objects.filter(
+            supermarket=supermarket,
+            generic_product_id__in={key[0] for key in offers},
+            name__in={key[1] for key in offers},
+        ).values_list("generic_product_id", "name", "price")
+    }
+
+    now = timezone.now()
+    changed = []
+    for (generic_product_id, name), (_, price) in offers.items():
+        previous = existing.get((generic_product_id, name))
+        if previous is None:
+            report.inserted += 1
+        elif previous != price:
+            report.updated += 1
+        else:
+            report.unchanged += 1
+            continue
+        variant = ProductVariant(
+            supermarket=supermarket, generic_product_id=generic_product_id, name=name, price=price, last_updated=now
+        )
+        variant.set_unit_price(known_products[generic_product_id])
+        changed.append(variant)
+        report.product_ids.add(generic_product_id)
+
+    ProductVariant.objects.bulk_create(
+        changed,
+        update_conflicts=True,
+        unique_fields=["supermarket", "generic_product", "name"],
+        update_fields=["price", "last_updated", *ProductVariant.UNIT_PRICE_FIELDS],
+    )
+    if any(variant.pk is None for variant in changed):
+        # Backends that cannot return ids from an upsert (MySQL): look them up
+        ids = {
+            (generic_product_id, name): variant_id
+            for variant_id, generic_product_id, name in ProductVariant.objects.filter(
+                supermarket=supermarket,
+                generic_product_id__in={variant.generic_product_id for variant in changed},
+                name__in={variant.name for variant in changed},
+            ).values_list("id", "generic_product_id", "name")
+        }
+        for variant in changed:
+            variant.pk = ids[(variant.generic_product_id, variant.name)]
+    record_price_changes(changed, recorded_at=now)
+
+
+def ingest_price_feed(supermarket, rows, chunk_size=INGEST_CHUNK_SIZE):
+    """
+    Upserts a supermarket's price feed into ProductVariant.
+
+    Args:
+        supermarket (Supermarket): Store the feed belongs to.
+        rows (iterable): (line_number, row dict) pairs, e.g. from `parse_feed`.
+        chunk_size (int): Rows validated and written per batch.
+
+    Returns:
+        IngestReport: inserted/updated/unchanged/rejected counts.
+
+    The whole feed is applied in one transaction, which stays open while
+    `rows` is read: pass rows from a local file, not a request stream.
+    """
+    report = IngestReport()
+    rows = iter(rows)
+    with transaction.atomic():
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            _ingest_chunk(supermarket, chunk, report)
+
+        if report.product_ids:
+            variants_bulk_changed.send(sender=ProductVariant, product_ids=report.product_ids)
+    return report
@@ -0,0 +1,34 @@
+"""
+Exports the whole catalog to a compact columnar file.
+
+Usage:
+    python manage.py export_catalog exports/catalog.kcol
+
+See products/columnar.py for the file format.
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.columnar import export_catalog
+
+
+class Command(BaseCommand):
+    help = "Writes categories, supermarkets, products and variants to a columnar catalog file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to write.")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        try:
+            with path.open("wb") as output:
+                header = export_catalog(output)
+        except OSError as error:
+            raise CommandError(str(error))
+
+        counts = ", ".join(f"{table['rows']} {name}" for name, table in header["tables"].items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported catalog version {header['catalog_version']} ({counts}) to {path}."
+        ))
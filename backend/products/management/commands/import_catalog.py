@@ -0,0 +1,41 @@
+"""
+Imports the variant prices of a columnar catalog file.
+
+Usage:
+    python manage.py import_catalog exports/catalog.kcol
+
+Prices are upserted through the price feed ingestion path, one feed per
+supermarket (matched by name); generic products are matched by id. See
+products/columnar.py for the file format.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.columnar import CatalogFormatError, ColumnarCatalog, import_catalog
+from products.ingestion import INGEST_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Upserts variant prices from a columnar catalog file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Catalog file written by export_catalog.")
+        parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE, help="Rows written per batch.")
+
+    def handle(self, *args, **options):
+        try:
+            catalog = ColumnarCatalog.open(options["path"])
+        except (OSError, CatalogFormatError) as error:
+            raise CommandError(str(error))
+
+        reports = import_catalog(catalog, options["chunk_size"])
+        if not reports:
+            raise CommandError("None of the file's supermarkets exist in the database.")
+
+        for name, report in reports.items():
+            for error in report.errors:
+                self.stderr.write(f"{name}: {error}")
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: {report.inserted} inserted, {report.updated} updated, "
+                f"{report.unchanged} unchanged, {report.rejected} rejected."
+            ))
@@ -0,0 +1,57 @@
+"""
+Imports a supermarket's price feed file into ProductVariant.
+
+Usage:
+    python manage.py import_prices Tesco feeds/tesco.csv
+    python manage.py import_prices 2 feeds/billa.ndjson --format ndjson --chunk-size 5000
+
+Rows are upserted by (supermarket, generic product, variant name); see
+products/ingestion.py for the feed format.
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.ingestion import FEED_FORMATS, INGEST_CHUNK_SIZE, FeedError, ingest_price_feed, parse_feed
+from products.models import Supermarket
+
+
+class Command(BaseCommand):
+    help = "Upserts variant prices of one supermarket from a CSV or NDJSON feed file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("supermarket", help="Supermarket id or name.")
+        parser.add_argument("path", help="Feed file (UTF-8).")
+        parser.add_argument(
+            "--format", choices=FEED_FORMATS, dest="feed_format",
+            help="Feed format; guessed from the file extension if omitted.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE, help="Rows written per batch.")
+
+    def handle(self, *args, **options):
+        supermarket = self._get_supermarket(options["supermarket"])
+        path = Path(options["path"])
+        feed_format = options["feed_format"] or path.suffix.lstrip(".").lower()
+        if feed_format not in FEED_FORMATS:
+            raise CommandError(f"Cannot tell the feed format of {path}; pass --format.")
+
+        try:
+            with path.open(encoding="utf-8-sig", newline="") as feed:
+                report = ingest_price_feed(supermarket, parse_feed(feed, feed_format), options["chunk_size"])
+        except (OSError, FeedError, UnicodeDecodeError) as error:
+            raise CommandError(str(error))
+
+        for error in report.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.inserted} inserted, {report.updated} updated, "
+            f"{report.unchanged} unchanged, {report.rejected} rejected."
+        ))
+
+    def _get_supermarket(self, value):
+        lookup = {"id": int(value)} if value.isdigit() else {"name__iexact": value}
+        try:
+            return Supermarket.objects.get(**lookup)
+        except Supermarket.DoesNotExist:
+            raise CommandError(f"Supermarket {value} not found.")
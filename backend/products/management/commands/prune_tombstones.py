@@ -0,0 +1,22 @@
+"""
+Deletes variant tombstones older than the delta sync retention.
+
+Usage:
+    python manage.py prune_tombstones
+
+Meant to run daily (e.g. from cron). Clients whose last sync is older
+than the retention get a full-sync answer anyway, so older tombstones
+are never read.
+"""
+
+from django.core.management.base import BaseCommand
+
+from products.sync import DELTA_SYNC_RETENTION_DAYS, prune_variant_tombstones
+
+
+class Command(BaseCommand):
+    help = f"Deletes variant tombstones older than {DELTA_SYNC_RETENTION_DAYS} days."
+
+    def handle(self, *args, **options):
+        deleted = prune_variant_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones."))
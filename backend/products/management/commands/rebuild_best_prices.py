@@ -0,0 +1,28 @@
+"""
+Rebuilds the BestPrice table from the current product variants.
+
+Usage:
+    python manage.py rebuild_best_prices
+    python manage.py rebuild_best_prices --product 3 --product 7
+
+Meant for recovery, e.g. after variants were changed with raw SQL or the
+table got out of sync for any other reason.
+"""
+
+from django.core.management.base import BaseCommand
+
+from products.services import refresh_best_prices
+
+
+class Command(BaseCommand):
+    help = "Recomputes the cheapest variant of every generic product (or only the given ones)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--product", type=int, action="append", dest="product_ids",
+            help="Only rebuild this generic product id (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        written = refresh_best_prices(options["product_ids"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} best price rows."))
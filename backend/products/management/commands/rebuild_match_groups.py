@@ -0,0 +1,28 @@
+"""
+Regroups the variants that are the same item in different supermarkets.
+
+Usage:
+    python manage.py rebuild_match_groups
+    python manage.py rebuild_match_groups --product 3 --product 7
+
+Groups are kept current on every variant write; this is for recovery
+and after changing the matching parameters in products/matching.py.
+"""
+
+from django.core.management.base import BaseCommand
+
+from products.services import refresh_match_groups
+
+
+class Command(BaseCommand):
+    help = "Recomputes the same-item match groups of all variants (or of the given generic products)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--product", type=int, action="append", dest="product_ids",
+            help="Only regroup the variants of this generic product id (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        changed = refresh_match_groups(options["product_ids"])
+        self.stdout.write(self.style.SUCCESS(f"Updated the match group of {changed} variants."))
@@ -0,0 +1,37 @@
+"""
+Scrapes current prices of the known variants from the supermarket shops.
+
+Usage:
+    python manage.py scrape_prices
+    python manage.py scrape_prices --supermarket Tesco --supermarket Billa
+
+Shop URLs, concurrency, rate limits and retries are configured with the
+SCRAPER_* settings.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.scrapers import SCRAPERS, run_scrapers
+
+
+class Command(BaseCommand):
+    help = "Updates variant prices from the supermarket web shops."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--supermarket", action="append", dest="supermarkets", choices=sorted(SCRAPERS),
+            help="Only scrape this supermarket (can be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        results = run_scrapers(options["supermarkets"])
+        if not results:
+            raise CommandError("None of the supermarkets to scrape exist in the database.")
+
+        for name, (scrape_report, ingest_report) in results.items():
+            for error in scrape_report.errors:
+                self.stderr.write(f"{name}: {error}")
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: {ingest_report.updated} updated, {ingest_report.unchanged} unchanged, "
+                f"{scrape_report.not_found} not found, {scrape_report.failed} failed."
+            ))
@@ -0,0 +1,131 @@
+"""
+Groups the variants that are the same item sold in different supermarkets.
+
+"Madeta Jihočeské máslo" at Billa and "MADETA Jihočeské máslo" at Tesco
+get the same ProductVariant.match_group (the lowest variant id of the
+group), so offers can be compared like for like.
+
+Names are folded like the search index and cut into character shingles.
+Comparing every pair of names would be quadratic, so candidates come
+from locality-sensitive hashing:
+- a MinHash signature of MINHASH_PERMUTATIONS values estimates the
+  Jaccard similarity of two shingle sets
+- the signature is split into LSH_BANDS bands; names sharing any band
+  (within one generic product) land in the same bucket
+- candidates in a bucket are confirmed with the exact Jaccard similarity
+  (>= MATCH_THRESHOLD) and merged with union-find
+
+Buckets are keyed by generic product, so a product's groups depend only
+on its own variants and can be refreshed per product after writes.
+"""
+
+import hashlib
+import sys
+from array import array
+
+from products.search import tokenize
+
+SHINGLE_SIZE = 3
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16  # 16 bands of 4 rows: pairs above ~0.5 similarity become candidates, above 0.8 almost surely
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+MATCH_THRESHOLD = 0.8  # Lower values start merging different brands ("Tatra" / "Tatra Swift")
+
+_HASH_BYTES = 4 * MINHASH_PERMUTATIONS
+
+
+def shingles(name):
+    """
+    Returns the set of character shingles of a folded name
+    ("Máslo 82%" -> {" ma", "mas", "asl", ..., "82 "}).
+    """
+    text = f" {' '.join(tokenize(name))} "
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def _shingle_hashes(shingle):
+    """
+    Returns MINHASH_PERMUTATIONS independent 32-bit hashes of a shingle.
+
+    One SHAKE-128 digest stands in for MINHASH_PERMUTATIONS hash
+    functions. Unlike hash(), it is the same in every process.
+    """
+    hashes = array("I", hashlib.shake_128(shingle.encode()).digest(_HASH_BYTES))
+    if sys.byteorder != "little":
+        hashes.byteswap()
+    return tuple(hashes)
+
+
+def minhash(shingle_set, hash_cache=None):
+    """
+    Returns the MinHash signature (tuple of MINHASH_PERMUTATIONS ints) of a shingle set.
+
+    `hash_cache` ({shingle: hashes}) saves rehashing shingles shared by many names.
+    """
+    if hash_cache is None:
+        hash_cache = {}
+    rows = []
+    for shingle in shingle_set:
+        hashes = hash_cache.get(shingle)
+        if hashes is None:
+            hashes = hash_cache[shingle] = _shingle_hashes(shingle)
+        rows.append(hashes)
+    if len(rows) == 1:
+        return rows[0]
+    return tuple(map(min, *rows))
+
+
+def jaccard(first, second):
+    return len(first & second) / len(first | second)
+
+
+def match_groups(variants):
+    """
+    Clusters variants into same-item groups.
+
+    Args:
+        variants (iterable): (variant_id, generic_product_id, name) tuples.
+
+    Returns:
+        dict: {variant_id: match group} where the group is the lowest
+        variant id in it; unmatched variants are their own group.
+    """
+    parent = {}
+    shingle_sets = {}
+    buckets = {}
+    hash_cache = {}
+    signatures = {}  # Folded name -> (shingles, signature); names repeat across supermarkets
+
+    for variant_id, generic_product_id, name in variants:
+        parent[variant_id] = variant_id
+        folded = " ".join(tokenize(name))
+        if folded not in signatures:
+            shingle_set = shingles(folded)
+            signatures[folded] = (shingle_set, minhash(shingle_set, hash_cache))
+        shingle_sets[variant_id], signature = signatures[folded]
+        for band in range(LSH_BANDS):
+            key = (generic_product_id, band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+            buckets.setdefault(key, []).append(variant_id)
+
+    def find(variant_id):
+        while parent[variant_id] != variant_id:
+            parent[variant_id] = parent[parent[variant_id]]
+            variant_id = parent[variant_id]
+        return variant_id
+
+    checked = set()
+    for members in buckets.values():
+        # Every pair of a bucket is a candidate; pairs already in one group
+        # (e.g. the same name in several supermarkets) skip the comparison
+        for index, current in enumerate(members):
+            for previous in members[:index]:
+                first, second = sorted((find(previous), find(current)))
+                if first == second or (previous, current) in checked:
+                    continue
+                checked.add((previous, current))
+                if jaccard(shingle_sets[previous], shingle_sets[current]) >= MATCH_THRESHOLD:
+                    parent[second] = first
+
+    return {variant_id: find(variant_id) for variant_id in parent}
@@ -0,0 +1,45 @@
+# Generated by Django 5.2 on 2026-10-17 19:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_best_prices(apps, schema_editor):
+    """
+    Fills BestPrice for the variants that already exist.
+    """
+    GenericProduct = apps.get_model('products', 'GenericProduct')
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+    BestPrice = apps.get_model('products', 'BestPrice')
+
+    cheapest = ProductVariant.objects.filter(generic_product=OuterRef('pk')).order_by('price', 'id')
+    rows = GenericProduct.objects.annotate(
+        cheapest_variant_id=Subquery(cheapest.values('id')[:1]),
+        cheapest_price=Subquery(cheapest.values('price')[:1]),
+    ).filter(cheapest_variant_id__isnull=False).values_list('id', 'cheapest_variant_id', 'cheapest_price')
+
+    BestPrice.objects.bulk_create(
+        [BestPrice(generic_product_id=product_id, variant_id=variant_id, price=price) for product_id, variant_id, price in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BestPrice',
+            fields=[
+                ('generic_product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='best_price', serialize=False, to='products.genericproduct')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.productvariant')),
+            ],
+        ),
+        migrations.RunPython(populate_best_prices, migrations.RunPython.noop),
+    ]
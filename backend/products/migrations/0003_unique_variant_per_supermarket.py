@@ -0,0 +1,82 @@
+# Generated by Django 5.2 on 2026-10-17 19:57
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+
+
+def remove_duplicate_variants(apps, schema_editor):
+    """
+    Keeps only the newest variant (highest id) of every supermarket,
+    generic product and name combination, then refreshes the best prices
+    of the products that lost variants.
+
+    Rows pointing at a removed duplicate (e.g. BestPrice) are moved to the
+    kept variant first, so only the duplicate variant rows themselves are
+    lost. Each removed variant is printed; they cannot be restored by
+    reversing the migration.
+    """
+    GenericProduct = apps.get_model('products', 'GenericProduct')
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+    BestPrice = apps.get_model('products', 'BestPrice')
+
+    # Foreign keys to ProductVariant in the migration state (any app)
+    dependants = [
+        (relation.related_model, relation.field.name)
+        for relation in ProductVariant._meta.related_objects
+        if relation.many_to_one or relation.one_to_one
+    ]
+
+    duplicates = (
+        ProductVariant.objects
+        .values('supermarket_id', 'generic_product_id', 'name')
+        .annotate(keep_id=Max('id'), copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    affected_products = set()
+    removed = 0
+    for group in list(duplicates):
+        copies = ProductVariant.objects.filter(
+            supermarket_id=group['supermarket_id'],
+            generic_product_id=group['generic_product_id'],
+            name=group['name'],
+        ).exclude(id=group['keep_id'])
+        drop = list(copies.values_list('id', 'price'))
+        drop_ids = [variant_id for variant_id, _ in drop]
+        for model, field in dependants:
+            model.objects.filter(**{f'{field}__in': drop_ids}).update(**{field: group['keep_id']})
+        for variant_id, price in drop:
+            print(
+                f"\n  Removed duplicate variant {variant_id} ({group['name']!r}, {price} Kč, "
+                f"supermarket {group['supermarket_id']}), kept {group['keep_id']}",
+                end='',
+            )
+        copies.delete()
+        removed += len(drop)
+        affected_products.add(group['generic_product_id'])
+    if removed:
+        print(f"\n  Removed {removed} duplicate variants of {len(affected_products)} products", end='')
+
+    cheapest = ProductVariant.objects.filter(generic_product=OuterRef('pk')).order_by('price', 'id')
+    rows = GenericProduct.objects.filter(id__in=affected_products).annotate(
+        cheapest_variant_id=Subquery(cheapest.values('id')[:1]),
+        cheapest_price=Subquery(cheapest.values('price')[:1]),
+    ).filter(cheapest_variant_id__isnull=False).values_list('id', 'cheapest_variant_id', 'cheapest_price')
+    for product_id, variant_id, price in rows:
+        BestPrice.objects.update_or_create(
+            generic_product_id=product_id, defaults={'variant_id': variant_id, 'price': price}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_bestprice'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_variants, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='productvariant',
+            constraint=models.UniqueConstraint(fields=('supermarket', 'generic_product', 'name'), name='unique_variant_per_supermarket'),
+        ),
+    ]
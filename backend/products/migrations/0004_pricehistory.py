@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-17 20:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def record_current_prices(apps, schema_editor):
+    """
+    Starts the history with the current price of every variant.
+    """
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+    PriceHistory = apps.get_model('products', 'PriceHistory')
+
+    variants = ProductVariant.objects.values_list('id', 'generic_product_id', 'supermarket_id', 'price', 'last_updated')
+    PriceHistory.objects.bulk_create(
+        (
+            PriceHistory(
+                variant_id=variant_id,
+                generic_product_id=product_id,
+                supermarket_id=supermarket_id,
+                price_halere=int(price * 100),
+                recorded_at=last_updated,
+            )
+            for variant_id, product_id, supermarket_id, price, last_updated in variants.iterator(chunk_size=1000)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_unique_variant_per_supermarket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('supermarket_id', models.PositiveSmallIntegerField()),
+                ('price_halere', models.PositiveIntegerField()),
+                ('recorded_at', models.DateTimeField()),
+                ('generic_product', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.genericproduct')),
+                ('variant', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.productvariant')),
+            ],
+            options={
+                'verbose_name_plural': 'Price history',
+                'indexes': [models.Index(fields=['variant', 'recorded_at'], name='pricehistory_variant_time'), models.Index(fields=['generic_product', 'recorded_at'], name='pricehistory_product_time')],
+            },
+        ),
+        migrations.RunPython(record_current_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2 on 2026-10-17 20:04
+
+from decimal import Decimal, InvalidOperation
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of products.units as of this migration, so later changes
+# there do not change what this migration writes
+UNIT_BASES = {
+    "kg": ("kg", Decimal("1")),
+    "g": ("kg", Decimal("0.001")),
+    "L": ("L", Decimal("1")),
+    "ml": ("L", Decimal("0.001")),
+    "pcs": ("pcs", Decimal("1")),
+    "ks": ("pcs", Decimal("1")),
+}
+
+
+def unit_price(price, amount, unit):
+    if unit not in UNIT_BASES or price is None or amount is None:
+        return None, None
+    base_unit, factor = UNIT_BASES[unit]
+    try:
+        quantity = Decimal(str(amount)) * factor
+        if quantity <= 0:
+            return None, None
+        return base_unit, (Decimal(str(price)) / quantity).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return None, None
+
+
+def fill_unit_prices(apps, schema_editor):
+    """
+    Computes unit_price, base_unit and category of the existing variants.
+    """
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+
+    variants = list(ProductVariant.objects.select_related('generic_product'))
+    for variant in variants:
+        product = variant.generic_product
+        variant.base_unit, variant.unit_price = unit_price(variant.price, product.amount, product.unit)
+        variant.category_id = product.category_id
+    ProductVariant.objects.bulk_update(variants, ['unit_price', 'base_unit', 'category'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_pricehistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productvariant',
+            name='base_unit',
+            field=models.CharField(choices=[('kg', 'Per kilogram'), ('L', 'Per litre'), ('pcs', 'Per piece')], editable=False, max_length=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='productvariant',
+            name='category',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.category'),
+        ),
+        migrations.AddField(
+            model_name='productvariant',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.RunPython(fill_unit_prices, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='productvariant',
+            index=models.Index(fields=['category', 'base_unit', 'unit_price'], name='variant_category_unit_price'),
+        ),
+    ]
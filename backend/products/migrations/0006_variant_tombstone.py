@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-17 20:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_variant_unit_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VariantTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variant_id', models.PositiveIntegerField()),
+                ('generic_product_id', models.PositiveIntegerField()),
+                ('supermarket_id', models.PositiveSmallIntegerField()),
+                ('deleted_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='productvariant',
+            index=models.Index(fields=['last_updated', 'id'], name='variant_last_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='varianttombstone',
+            index=models.Index(fields=['deleted_at'], name='tombstone_deleted_at'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-17 20:19
+
+from django.db import migrations, models
+
+# Schema only: existing variants are grouped by `manage.py rebuild_match_groups`,
+# so this migration does not depend on the live matching code
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_variant_tombstone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productvariant',
+            name='match_group',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='productvariant',
+            index=models.Index(fields=['generic_product', 'match_group'], name='variant_product_match_group'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_variant_match_group'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productvariant',
+            index=models.Index(fields=['category', 'price', 'id'], name='variant_category_price'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-17 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_variant_category_price'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='genericproduct',
+            index=models.Index(fields=['category', 'id'], name='product_category_id'),
+        ),
+        migrations.AddIndex(
+            model_name='productvariant',
+            index=models.Index(fields=['supermarket', 'price'], name='variant_supermarket_price'),
+        ),
+    ]
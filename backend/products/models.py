@@ -1,5 +1,7 @@
 from django.db import models
 
+from products.units import BASE_UNIT_CHOICES, unit_price
+
 # Category groups products by type (e.g. Dairy, Bakery, Vegetables...)
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -27,6 +29,12 @@ class GenericProduct(models.Model):
     unit = models.CharField(max_length=10, choices=UNIT_CHOICES)  # Unit dropdown in admin
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
 
+    class Meta:
+        indexes = [
+            # Category-filtered product lists, paginated by id (see products/facets.py)
+            models.Index(fields=['category', 'id'], name='product_category_id'),
+        ]
+
     def __str__(self):
         return f"{self.name} – {self.amount} {self.unit}"
 
@@ -49,5 +57,112 @@ class ProductVariant(models.Model):
     last_updated = models.DateTimeField(auto_now=True)  # Auto-updates on save
     image = models.ImageField(upload_to='product_images/', blank=True, null=True)  # Optional product photo
 
+    # Derived from price and the generic product's amount/unit (see products/units.py);
+    # category is copied from the generic product so the per-unit ranking of a
+    # category is a single index range scan
+    unit_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, editable=False)  # CZK per base unit
+    base_unit = models.CharField(max_length=3, choices=BASE_UNIT_CHOICES, null=True, editable=False)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, editable=False, related_name='+')
+
+    # Lowest variant id of the group of variants that are the same item in
+    # different supermarkets (see products/matching.py)
+    match_group = models.PositiveIntegerField(null=True, editable=False)
+
+    # Fields set by set_unit_price()
+    UNIT_PRICE_FIELDS = ['unit_price', 'base_unit', 'category']
+
+    class Meta:
+        constraints = [
+            # Natural key used by price feed imports (upserts)
+            models.UniqueConstraint(
+                fields=['supermarket', 'generic_product', 'name'], name='unique_variant_per_supermarket'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['category', 'base_unit', 'unit_price'], name='variant_category_unit_price'),
+            # Delta sync reads the variants changed since a time (see products/sync.py)
+            models.Index(fields=['last_updated', 'id'], name='variant_last_updated'),
+            models.Index(fields=['generic_product', 'match_group'], name='variant_product_match_group'),
+            # Cheapest variants per category (ROW_NUMBER() OVER (PARTITION BY category ORDER BY price, id))
+            models.Index(fields=['category', 'price', 'id'], name='variant_category_price'),
+            # Supermarket and price filters of the product listings
+            models.Index(fields=['supermarket', 'price'], name='variant_supermarket_price'),
+        ]
+
     def __str__(self):
         return f"{self.name} at {self.supermarket.name} – {self.price} Kč"
+
+    def set_unit_price(self, product=None):
+        """
+        Recomputes the per-base-unit price and copies the category from
+        the generic product (the given one, or self.generic_product).
+        """
+        product = product or self.generic_product
+        self.base_unit, self.unit_price = unit_price(self.price, product.amount, product.unit)
+        self.category_id = product.category_id
+
+    def save(self, *args, **kwargs):
+        self.set_unit_price()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # last_updated feeds delta sync, so every write must stamp it
+            kwargs['update_fields'] = set(update_fields) | set(self.UNIT_PRICE_FIELDS) | {'last_updated'}
+        super().save(*args, **kwargs)
+
+
+# BestPrice is a denormalized copy of the cheapest variant of each generic product.
+# It is kept current on every variant write (see products/signals.py) and in bulk
+# after imports, so the best-deal lookup is a single indexed row fetch.
+class BestPrice(models.Model):
+    generic_product = models.OneToOneField(
+        GenericProduct, on_delete=models.CASCADE, primary_key=True, related_name='best_price'
+    )
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='+')
+    price = models.DecimalField(max_digits=6, decimal_places=2)  # Copy of variant.price
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Best price for {self.generic_product.name}: {self.price} Kč"
+
+
+# PriceHistory is an append-only log of variant prices, one row per price change.
+# Kept compact for range scans: integer haléře, small-int supermarket id, and no
+# foreign key constraints, so the history outlives deleted variants and products.
+class PriceHistory(models.Model):
+    variant = models.ForeignKey(
+        ProductVariant, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    generic_product = models.ForeignKey(
+        GenericProduct, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    supermarket_id = models.PositiveSmallIntegerField()
+    price_halere = models.PositiveIntegerField()  # Price in haléře (1 Kč = 100)
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = "Price history"
+        indexes = [
+            models.Index(fields=['variant', 'recorded_at'], name='pricehistory_variant_time'),
+            models.Index(fields=['generic_product', 'recorded_at'], name='pricehistory_product_time'),
+        ]
+
+    def __str__(self):
+        return f"Variant {self.variant_id} at {self.recorded_at:%Y-%m-%d %H:%M}: {self.price_halere / 100:.2f} Kč"
+
+
+# VariantTombstone records a deleted ProductVariant, so delta sync clients
+# (see products/sync.py) learn about deletes as well as changes. Written by
+# a post_delete handler; rows older than the sync retention can be pruned.
+class VariantTombstone(models.Model):
+    variant_id = models.PositiveIntegerField()  # Id of the deleted variant (the row is gone)
+    generic_product_id = models.PositiveIntegerField()
+    supermarket_id = models.PositiveSmallIntegerField()
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_at'),
+        ]
+
+    def __str__(self):
+        return f"Variant {self.variant_id} deleted at {self.deleted_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,133 @@
+"""
+Keyset (cursor) pagination for the catalog list endpoints.
+
+Instead of OFFSET, every page continues after the sort key of the last row
+of the previous page, so fetching page 1000 costs the same as page 1 and
+rows inserted meanwhile never shift pages. Supported orderings:
+
+- "id":    ORDER BY id
+- "price": ORDER BY price, id   (product variants only)
+
+Cursors are opaque to clients: URL-safe base64 of the ordering name and
+the last sort key. Query parameters understood by `paginate`:
+
+- cursor:    value of "next_cursor" from the previous page
+- page_size: rows per page (default settings.CATALOG_PAGE_SIZE)
+- all:       "true" returns the whole unpaginated list (legacy behavior)
+"""
+
+import base64
+import json
+from bisect import bisect_right
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+
+ORDERINGS = {
+    "id": ("id",),
+    "price": ("price", "id"),
+}
+
+
+class InvalidPageRequest(ValueError):
+    """
+    Raised for malformed cursors, orderings or page sizes.
+    """
+
+
+def encode_cursor(ordering, key):
+    payload = json.dumps([ordering, [str(value) for value in key]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, ordering):
+    """
+    Returns the sort key stored in a cursor created for `ordering`.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_ordering, key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if cursor_ordering != ordering or len(key) != len(ORDERINGS[ordering]):
+            raise InvalidPageRequest("Cursor does not match the requested ordering.")
+        if ordering == "price":
+            price = Decimal(key[0])
+            if not price.is_finite():  # "NaN", "Infinity", "sNaN"
+                raise InvalidPageRequest("Invalid cursor.")
+            return price, int(key[1])
+        return (int(key[0]),)
+    except InvalidPageRequest:
+        raise
+    except (ValueError, TypeError, InvalidOperation, KeyError):
+        raise InvalidPageRequest("Invalid cursor.") from None
+
+
+def wants_all(request):
+    """
+    True if the client asked for the legacy unpaginated list (?all=true).
+    """
+    return request.GET.get("all", "").lower() in ("1", "true", "yes")
+
+
+def get_page_size(request):
+    try:
+        page_size = int(request.GET.get("page_size", settings.CATALOG_PAGE_SIZE))
+    except ValueError:
+        raise InvalidPageRequest("Page size must be a number.")
+    if page_size < 1:
+        raise InvalidPageRequest("Page size must be at least 1.")
+    return min(page_size, settings.CATALOG_MAX_PAGE_SIZE)
+
+
+def get_ordering(request, allowed=("id",)):
+    ordering = request.GET.get("ordering", allowed[0])
+    if ordering not in allowed:
+        raise InvalidPageRequest(f"Ordering must be one of: {', '.join(allowed)}.")
+    return ordering
+
+
+def paginate(queryset, request, ordering="id"):
+    """
+    Returns one page of `queryset` and the cursor of the next page.
+
+    Args:
+        queryset: Unordered queryset (of models or named `.values_list()`
+            rows) to page through, or an in-memory sequence of model
+            instances in id order (e.g. from the catalog snapshot).
+        request: The API request (reads ?cursor= and ?page_size=).
+        ordering (str): Key of ORDERINGS.
+
+    Returns:
+        tuple: (list of rows, next cursor or None on the last page)
+
+    Raises:
+        InvalidPageRequest: For a malformed cursor or page size.
+    """
+    fields = ORDERINGS[ordering]
+    page_size = get_page_size(request)
+    cursor = request.GET.get("cursor")
+    key = decode_cursor(cursor, ordering) if cursor else None
+
+    # One extra row tells whether there is a next page
+    if isinstance(queryset, QuerySet):
+        queryset = queryset.order_by(*fields)
+        if key and ordering == "price":
+            price, last_id = key
+            queryset = queryset.filter(Q(price__gt=price) | Q(price=price, id__gt=last_id))
+        elif key:
+            queryset = queryset.filter(id__gt=key[0])
+        rows = list(queryset[:page_size + 1])
+    else:
+        def sort_key(row):
+            return tuple(getattr(row, field) for field in fields)
+
+        ordered = queryset if ordering == "id" else sorted(queryset, key=sort_key)
+        start = bisect_right(ordered, key, key=sort_key) if key else 0
+        rows = ordered[start:start + page_size + 1]
+
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(ordering, [getattr(last, field) for field in fields])
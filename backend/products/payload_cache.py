@@ -0,0 +1,115 @@
+"""
+Pre-compressed response bodies of the busiest catalog views.
+
+`cached_json_response` renders a view's data to JSON once per catalog
+version, language and URL, compresses it with gzip (and brotli if the
+`brotli` package is installed), and stores all encodings in Django's
+cache. Later requests get the encoding they accept as stored bytes; no
+serializer or compressor runs.
+
+Entries are keyed by catalog version, so a catalog write makes them
+unreachable at once; they then expire after
+settings.CATALOG_PAYLOAD_CACHE_TIMEOUT seconds.
+
+Compressed responses carry a weak ETag (same value as the view's
+strong one), as Django's GZipMiddleware does: the bytes differ per
+encoding, but If-None-Match still matches.
+"""
+
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import translation
+from django.utils.cache import patch_vary_headers
+from django.utils.http import quote_etag
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from products.versioning import get_catalog_version, versioned_etag
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip only without it
+    brotli = None
+
+GZIP_LEVEL = 9       # Bodies are compressed once per catalog version, so use the best ratio
+BROTLI_QUALITY = 9   # 10-11 are much slower for a few percent smaller bodies
+
+IDENTITY = "identity"
+GZIP = "gzip"
+BROTLI = "br"
+
+# Preferred first when the client accepts several equally
+ENCODING_PREFERENCE = (BROTLI, GZIP, IDENTITY)
+
+
+def compress_payload(body):
+    """
+    Returns {encoding: bytes} for a rendered body.
+    """
+    payload = {IDENTITY: body, GZIP: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        payload[BROTLI] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return payload
+
+
+def choose_encoding(accept_encoding, available):
+    """
+    Picks the available content coding the Accept-Encoding header ranks
+    highest ("gzip, br;q=0.8" -> "gzip"); identity if none is accepted.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding:
+            weights[coding] = weight
+
+    best, best_weight = IDENTITY, 0.0
+    for coding in ENCODING_PREFERENCE:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if coding in available and coding != IDENTITY and weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def cached_json_response(request, build):
+    """
+    Returns the JSON response of a catalog view from the payload cache,
+    calling `build()` for the response data on a miss.
+
+    Exceptions raised by `build` propagate and nothing is cached, so
+    views keep handling their errors themselves. Requests for another
+    renderer (the browsable API) bypass the cache.
+    """
+    if request.accepted_renderer.format != "json":
+        return Response(build())
+
+    version = get_catalog_version()
+    url_hash = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+    key = f"products:payload:{version}:{translation.get_language()}:{url_hash}"
+
+    payload = cache.get(key)
+    if payload is None:
+        payload = compress_payload(JSONRenderer().render(build()))
+        cache.set(key, payload, timeout=settings.CATALOG_PAYLOAD_CACHE_TIMEOUT)
+
+    encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""), payload)
+    response = HttpResponse(payload[encoding], content_type="application/json")
+    response.headers["Content-Length"] = str(len(payload[encoding]))
+    if encoding != IDENTITY:
+        response.headers["Content-Encoding"] = encoding
+        response.headers["ETag"] = "W/" + quote_etag(versioned_etag(version, request))
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
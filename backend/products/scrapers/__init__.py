@@ -0,0 +1,10 @@
+"""
+Supermarket price scrapers, one adapter per shop.
+
+See `products.scrapers.base` for the shared HTTP handling and
+`products.scrapers.runner` for how a scrape run is stored.
+"""
+
+from products.scrapers.runner import SCRAPERS, run_scrapers
+
+__all__ = ["SCRAPERS", "run_scrapers"]
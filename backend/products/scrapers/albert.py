@@ -0,0 +1,20 @@
+"""
+Albert (albert.cz) adapter.
+
+Search response: {"data": {"search": {"products": [{"name": ..., "price": {"value": 23.9}}, ...]}}}
+"""
+
+from products.scrapers.base import Scraper, items_at
+
+
+class AlbertScraper(Scraper):
+    supermarket = "Albert"
+    search_path = "/api/v1/search"
+
+    def search_params(self, query):
+        return {"q": query, "pageSize": 20}
+
+    def parse_results(self, payload):
+        for item in items_at(payload, "data", "search", "products"):
+            if isinstance(item, dict) and item.get("name") and isinstance(item.get("price"), dict):
+                yield item["name"], item["price"].get("value")
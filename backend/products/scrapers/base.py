@@ -0,0 +1,194 @@
+"""
+Building blocks shared by the supermarket scrapers.
+
+A scraper looks up the variants a supermarket already sells by name in
+the shop's search and reads their current prices. All HTTP goes through
+`Scraper.get_json`, which:
+- limits concurrent requests and request rate per host (`HostThrottle`)
+- retries timeouts, connection errors, 429 and 5xx responses with
+  exponential backoff, honouring a numeric Retry-After header
+
+Scrapers run inside an asyncio event loop and never touch the database;
+`products.scrapers.runner` loads their targets before and writes the
+results after the loop.
+"""
+
+import asyncio
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+import aiohttp
+
+from products.ingestion import MAX_REPORTED_ERRORS
+from products.search import fold
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 60  # Seconds; longer Retry-After values are capped
+
+# One price read from a shop, for an existing (generic product, variant name) pair
+ScrapedOffer = namedtuple("ScrapedOffer", ["generic_product_id", "name", "price"])
+
+
+class ScraperError(Exception):
+    """
+    Raised when a shop request fails for good (after all retries).
+    """
+
+
+class HostThrottle:
+    """
+    Async context manager limiting requests to one host: at most
+    `max_concurrency` in flight, and request starts at least
+    `min_interval` seconds apart.
+    """
+
+    def __init__(self, max_concurrency, min_interval):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = asyncio.Lock()
+        self._min_interval = min_interval
+        self._next_start = 0.0
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        try:
+            async with self._lock:
+                loop = asyncio.get_running_loop()
+                delay = self._next_start - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._next_start = loop.time() + self._min_interval
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._semaphore.release()
+
+
+class ScrapeReport:
+    """
+    Outcome of scraping one supermarket.
+    """
+
+    def __init__(self):
+        self.offers = []     # ScrapedOffer list
+        self.not_found = 0   # Variants the shop search did not return
+        self.failed = 0      # Variants whose search request failed
+        self.errors = []     # Up to MAX_REPORTED_ERRORS failure messages
+
+    def fail(self, name, error):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"{name}: {error}")
+
+
+class Scraper:
+    """
+    Base class of the per-supermarket adapters.
+
+    Subclasses set `supermarket` (Supermarket.name) and `search_path`, and
+    implement `search_params` and `parse_results` for their shop's search
+    API.
+    """
+
+    supermarket = None
+    search_path = None
+
+    def __init__(self, base_url, throttle, retries=3, retry_backoff=1.0):
+        self.base_url = base_url.rstrip("/")
+        self.throttle = throttle
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+
+    def search_params(self, query):
+        """
+        Returns the query string parameters of a search for `query`.
+        """
+        raise NotImplementedError
+
+    def parse_results(self, payload):
+        """
+        Yields (name, price) pairs from a decoded search response.
+        """
+        raise NotImplementedError
+
+    async def get_json(self, session, url, params=None):
+        """
+        GETs a JSON document, retrying transient failures.
+        """
+        for attempt in range(self.retries + 1):
+            delay = self.retry_backoff * 2 ** attempt
+            try:
+                async with self.throttle:
+                    async with session.get(url, params=params) as response:
+                        if response.status not in RETRY_STATUSES:
+                            response.raise_for_status()
+                            return await response.json(content_type=None)
+                        error = f"HTTP {response.status}"
+                        retry_after = response.headers.get("Retry-After", "")
+                        if retry_after.isdigit():
+                            delay = min(int(retry_after), MAX_RETRY_AFTER)
+            except aiohttp.ClientResponseError as exception:
+                raise ScraperError(f"HTTP {exception.status}") from exception
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as exception:
+                error = str(exception) or type(exception).__name__
+
+            if attempt < self.retries:
+                await asyncio.sleep(delay)
+        raise ScraperError(f"{error} (after {self.retries + 1} attempts)")
+
+    async def search(self, session, query):
+        """
+        Returns [(name, Decimal price)] found by the shop search for `query`.
+        """
+        payload = await self.get_json(session, self.base_url + self.search_path, self.search_params(query))
+        results = []
+        for name, price in self.parse_results(payload):
+            try:
+                results.append((name, Decimal(str(price)).quantize(Decimal("0.01"))))
+            except (InvalidOperation, TypeError, ValueError):
+                continue  # Item without a usable price
+        return results
+
+    async def scrape(self, session, targets):
+        """
+        Reads the current price of every target variant.
+
+        Args:
+            session (aiohttp.ClientSession): Shared HTTP session.
+            targets (list): (generic_product_id, variant name) pairs sold by
+                this supermarket.
+
+        Returns:
+            ScrapeReport
+        """
+        report = ScrapeReport()
+
+        async def scrape_one(generic_product_id, name):
+            try:
+                results = await self.search(session, name)
+            except ScraperError as error:
+                report.fail(name, error)
+                return
+            wanted = fold(name)
+            for found_name, price in results:
+                if fold(found_name) == wanted:
+                    report.offers.append(ScrapedOffer(generic_product_id, name, price))
+                    return
+            report.not_found += 1
+
+        await asyncio.gather(*(scrape_one(*target) for target in targets))
+        return report
+
+
+def items_at(payload, *path):
+    """
+    Returns the list found at a key path of a JSON payload, or [] if any
+    step is missing ("items_at(data, 'data', 'products')").
+    """
+    for key in path:
+        if not isinstance(payload, dict):
+            return []
+        payload = payload.get(key)
+    return payload if isinstance(payload, list) else []
@@ -0,0 +1,26 @@
+"""
+Billa (shop.billa.cz) adapter.
+
+Search response: {"results": [{"name": ..., "price": {"regular": {"value": 3490}}}, ...]},
+prices in haléře.
+"""
+
+from decimal import Decimal
+
+from products.scrapers.base import Scraper, items_at
+
+
+class BillaScraper(Scraper):
+    supermarket = "Billa"
+    search_path = "/api/products"
+
+    def search_params(self, query):
+        return {"search": query, "pageSize": 30}
+
+    def parse_results(self, payload):
+        for item in items_at(payload, "results"):
+            if not isinstance(item, dict) or not item.get("name"):
+                continue
+            value = ((item.get("price") or {}).get("regular") or {}).get("value")
+            if isinstance(value, int):
+                yield item["name"], Decimal(value).scaleb(-2)
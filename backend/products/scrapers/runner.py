@@ -0,0 +1,74 @@
+"""
+Runs the supermarket scrapers and stores what they found.
+
+`run_scrapers` is synchronous: it reads the variants to look up from the
+database, scrapes every supermarket concurrently in one event loop (one
+HTTP session, one throttle per host), then upserts the prices through the
+bulk ingestion path.
+"""
+
+import asyncio
+from urllib.parse import urlsplit
+
+import aiohttp
+from django.conf import settings
+
+from products.ingestion import ingest_price_feed
+from products.models import ProductVariant, Supermarket
+from products.scrapers.albert import AlbertScraper
+from products.scrapers.base import HostThrottle
+from products.scrapers.billa import BillaScraper
+from products.scrapers.tesco import TescoScraper
+
+# Adapter classes by Supermarket.name
+SCRAPERS = {scraper.supermarket: scraper for scraper in (TescoScraper, BillaScraper, AlbertScraper)}
+
+
+async def _scrape_all(jobs):
+    throttles = {}
+    scrapers = []
+    for scraper_class, base_url, _ in jobs:
+        host = urlsplit(base_url).netloc
+        if host not in throttles:
+            throttles[host] = HostThrottle(settings.SCRAPER_MAX_CONCURRENCY_PER_HOST, settings.SCRAPER_MIN_INTERVAL)
+        scrapers.append(scraper_class(
+            base_url, throttles[host], retries=settings.SCRAPER_RETRIES, retry_backoff=settings.SCRAPER_RETRY_BACKOFF
+        ))
+
+    timeout = aiohttp.ClientTimeout(total=settings.SCRAPER_TIMEOUT)
+    async with aiohttp.ClientSession(timeout=timeout, headers={"Accept": "application/json"}) as session:
+        return await asyncio.gather(*(
+            scraper.scrape(session, targets) for scraper, (_, _, targets) in zip(scrapers, jobs)
+        ))
+
+
+def run_scrapers(supermarket_names=None):
+    """
+    Scrapes current prices of the known variants and upserts them.
+
+    Args:
+        supermarket_names (iterable): Supermarkets to scrape; all with an
+            adapter if omitted.
+
+    Returns:
+        dict: {supermarket name: (ScrapeReport, IngestReport)}
+    """
+    names = set(SCRAPERS) if supermarket_names is None else set(supermarket_names) & set(SCRAPERS)
+    supermarkets = list(Supermarket.objects.filter(name__in=names).order_by("name"))
+
+    jobs = []
+    for supermarket in supermarkets:
+        targets = list(
+            ProductVariant.objects.filter(supermarket=supermarket).values_list("generic_product_id", "name")
+        )
+        jobs.append((SCRAPERS[supermarket.name], settings.SCRAPER_BASE_URLS[supermarket.name], targets))
+    if not jobs:
+        return {}
+
+    scrape_reports = asyncio.run(_scrape_all(jobs))
+
+    results = {}
+    for supermarket, scrape_report in zip(supermarkets, scrape_reports):
+        rows = enumerate((offer._asdict() for offer in scrape_report.offers), start=1)
+        results[supermarket.name] = (scrape_report, ingest_price_feed(supermarket, rows))
+    return results
@@ -0,0 +1,21 @@
+"""
+Tesco (nakup.itesco.cz) adapter.
+
+Search response: {"productItems": [{"product": {"title": ..., "price": 24.9}}, ...]}
+"""
+
+from products.scrapers.base import Scraper, items_at
+
+
+class TescoScraper(Scraper):
+    supermarket = "Tesco"
+    search_path = "/groceries/cs-CZ/search"
+
+    def search_params(self, query):
+        return {"query": query, "count": 48}
+
+    def parse_results(self, payload):
+        for item in items_at(payload, "productItems"):
+            product = item.get("product") if isinstance(item, dict) else None
+            if isinstance(product, dict) and product.get("title"):
+                yield product["title"], product.get("price")
@@ -0,0 +1,376 @@
+"""
+In-process product search index.
+
+Indexes the names of GenericProducts together with the names of their
+ProductVariants, so "madeta" finds every product sold under that brand.
+Text is folded before indexing and querying (lowercased, Czech diacritics
+stripped), which lets "mleko" match "Mléko".
+
+Layout:
+- postings: token -> {product_id: fields}, where fields is a bit mask of
+  where the token occurs (product name and/or variant name)
+- vocabulary: sorted list of all tokens, so prefix lookups are a bisect
+- trigrams: trigram -> array of interned token ids, used by the typo
+  tolerant `fuzzy_search` to find tokens close to a misspelled term
+
+The index is built lazily on first use and patched per product by the
+signal handlers in `products.signals` after each committed catalog write,
+which also moves the index to the version that write produced. Writes
+from other processes (other workers, management commands) only bump the
+shared catalog version, so every query first compares the index's
+version and rebuilds when another write moved it.
+"""
+
+import heapq
+import re
+import sys
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+
+from products.models import GenericProduct, ProductVariant
+from products.versioning import get_catalog_version
+
+# Bits of the `fields` mask in the postings
+IN_PRODUCT_NAME = 1
+IN_VARIANT_NAME = 2
+
+# Score of one query term, by where and how it matched
+SCORE_PRODUCT_EXACT = 8
+SCORE_PRODUCT_PREFIX = 4
+SCORE_VARIANT_EXACT = 2
+SCORE_VARIANT_PREFIX = 1
+
+# Shorter terms only match whole tokens; a one-letter prefix would match
+# a large share of the catalog and make ranking the slowest part of a query
+MIN_PREFIX_LENGTH = 2
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Fuzzy search: terms of up to this many characters may have one typo, longer ones two
+FUZZY_ONE_TYPO_MAX_LENGTH = 5
+FUZZY_MAX_DISTANCE = 2
+# Fuzzy matches in the product name weigh more than matches in variant names
+FUZZY_PRODUCT_NAME_WEIGHT = 2.0
+FUZZY_VARIANT_NAME_WEIGHT = 1.0
+
+
+def fold(text):
+    """
+    Lowercases text and strips diacritics ("Jihočeské Mléko" -> "jihoceske mleko").
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(text):
+    """
+    Splits text into folded word tokens.
+    """
+    return TOKEN_PATTERN.findall(fold(text))
+
+
+def trigrams(token):
+    """
+    Returns the set of trigrams of a token, padded so that short tokens and
+    word starts get trigrams too ("mleko" -> "  m", " ml", "mle", ..., "ko ").
+    """
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance between a and b (insertions,
+    deletions, substitutions and swaps of adjacent characters).
+
+    Stops early and returns limit + 1 once the distance is known to be
+    larger than `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class SearchIndex:
+    """
+    Inverted index from folded name tokens to generic product ids.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._version = None    # catalog version the index is current at
+        self._postings = {}     # token -> {product_id: fields}
+        self._vocabulary = []   # sorted tokens
+        self._documents = {}    # product_id -> {token: fields}, for incremental removal
+        self._names = {}        # product_id -> folded product name, for tie-breaking
+        self._token_ids = {}    # token -> interned token id
+        self._tokens = []       # token id -> token
+        self._trigrams = {}     # trigram -> array('I') of token ids
+
+    # ------------------------------------------------------------------
+    # Building and patching
+    # ------------------------------------------------------------------
+
+    def invalidate(self):
+        """
+        Drops the index; it is rebuilt from the database on next use.
+        """
+        with self._lock:
+            self._built = False
+            self._postings = {}
+            self._vocabulary = []
+            self._documents = {}
+            self._names = {}
+            self._token_ids = {}
+            self._tokens = []
+            self._trigrams = {}
+
+    def _load_documents(self, product_ids=None):
+        """
+        Reads product and variant names and returns {product_id: (name, {token: fields})}.
+        """
+        products = GenericProduct.objects.all()
+        variants = ProductVariant.objects.all()
+        if product_ids is not None:
+            products = products.filter(id__in=product_ids)
+            variants = variants.filter(generic_product_id__in=product_ids)
+
+        documents = {}
+        for product_id, name in products.values_list("id", "name").iterator(chunk_size=2000):
+            documents[product_id] = (fold(name), {token: IN_PRODUCT_NAME for token in tokenize(name)})
+
+        for product_id, name in variants.values_list("generic_product_id", "name").iterator(chunk_size=2000):
+            if product_id not in documents:
+                continue  # Product deleted in between the two queries
+            tokens = documents[product_id][1]
+            for token in tokenize(name):
+                tokens[token] = tokens.get(token, 0) | IN_VARIANT_NAME
+
+        return documents
+
+    def _add(self, product_id, name, tokens):
+        self._documents[product_id] = tokens
+        self._names[product_id] = name
+        for token, fields in tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                if self._built:
+                    insort(self._vocabulary, token)
+                self._intern(token)
+            postings[product_id] = fields
+
+    def _intern(self, token):
+        # Token ids are never reused; ids of tokens that disappear from the
+        # postings simply stop matching
+        if token in self._token_ids:
+            return
+        token = sys.intern(token)
+        token_id = len(self._tokens)
+        self._token_ids[token] = token_id
+        self._tokens.append(token)
+        for trigram in trigrams(token):
+            self._trigrams.setdefault(trigram, array('I')).append(token_id)
+
+    def _remove(self, product_id):
+        tokens = self._documents.pop(product_id, {})
+        self._names.pop(product_id, None)
+        for token in tokens:
+            postings = self._postings[token]
+            del postings[product_id]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def _build(self):
+        # Read the version before the data: a concurrent write can only
+        # make the index newer than its label
+        self._version = get_catalog_version()
+        self._postings = {}
+        self._documents = {}
+        self._names = {}
+        self._token_ids = {}
+        self._tokens = []
+        self._trigrams = {}
+        for product_id, (name, tokens) in self._load_documents().items():
+            self._add(product_id, name, tokens)
+        self._vocabulary = sorted(self._postings)
+        self._built = True
+
+    def _ensure_current(self):
+        if not self._built or self._version != get_catalog_version():
+            self._build()
+
+    def refresh_products(self, product_ids, version=None):
+        """
+        Re-indexes the given generic products (new, changed or deleted).
+
+        `version` is the catalog version the write produced. If the index
+        was exactly one version behind it, this write was the only change
+        and the index is current at `version`; otherwise the next query
+        rebuilds it.
+        """
+        product_ids = {product_id for product_id in product_ids if product_id is not None}
+        with self._lock:
+            if not self._built:
+                return  # Nothing cached yet; the next build picks it up
+
+            if product_ids:
+                documents = self._load_documents(product_ids)
+                for product_id in product_ids:
+                    self._remove(product_id)
+                    if product_id in documents:
+                        self._add(product_id, *documents[product_id])
+            if version is not None and self._version == version - 1:
+                self._version = version
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def _expand(self, term):
+        """
+        Returns the indexed tokens starting with `term`.
+        """
+        if len(term) < MIN_PREFIX_LENGTH:
+            return [term] if term in self._postings else []
+        start = bisect_left(self._vocabulary, term)
+        end = bisect_left(self._vocabulary, term + "\U0010ffff")
+        return self._vocabulary[start:end]
+
+    def _term_scores(self, term):
+        scores = {}
+        for token in self._expand(term):
+            exact = token == term
+            for product_id, fields in self._postings[token].items():
+                score = 0
+                if fields & IN_PRODUCT_NAME:
+                    score = SCORE_PRODUCT_EXACT if exact else SCORE_PRODUCT_PREFIX
+                elif fields & IN_VARIANT_NAME:
+                    score = SCORE_VARIANT_EXACT if exact else SCORE_VARIANT_PREFIX
+                if score > scores.get(product_id, 0):
+                    scores[product_id] = score
+        return scores
+
+    def search(self, query):
+        """
+        Returns the ids of the generic products matching every query term,
+        best match first.
+
+        Each term matches indexed tokens it equals or (if at least
+        MIN_PREFIX_LENGTH characters long) is a prefix of. Matches
+        in the product name rank above matches in variant names, and exact
+        matches above prefix matches. Ties are ordered by product name.
+        """
+        terms = sorted(set(tokenize(query)), key=len, reverse=True)  # Most selective first
+        if not terms:
+            return []
+
+        with self._lock:
+            self._ensure_current()
+            scores = None
+            for term in terms:
+                term_scores = self._term_scores(term)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {
+                        product_id: score + term_scores[product_id]
+                        for product_id, score in scores.items()
+                        if product_id in term_scores
+                    }
+                if not scores:
+                    return []
+
+            return sorted(scores, key=lambda product_id: (-scores[product_id], self._names[product_id], product_id))
+
+    def _similar_tokens(self, term):
+        """
+        Returns {token: distance} for the indexed tokens within the allowed
+        edit distance of `term`.
+
+        Candidates are tokens sharing enough trigrams with the term; one
+        typo changes at most four trigrams. Only those are compared with
+        the (bounded) edit distance.
+        """
+        limit = 1 if len(term) <= FUZZY_ONE_TYPO_MAX_LENGTH else FUZZY_MAX_DISTANCE
+        term_trigrams = trigrams(term)
+        required = max(1, len(term_trigrams) - 4 * limit)
+
+        shared = {}
+        for trigram in term_trigrams:
+            for token_id in self._trigrams.get(trigram, ()):
+                shared[token_id] = shared.get(token_id, 0) + 1
+
+        similar = {}
+        for token_id, count in shared.items():
+            if count < required:
+                continue
+            token = self._tokens[token_id]
+            if abs(len(token) - len(term)) > limit or token not in self._postings:
+                continue  # Too long/short, or no longer in the catalog
+            distance = edit_distance(term, token, limit)
+            if distance <= limit:
+                similar[token] = distance
+        return similar
+
+    def fuzzy_search(self, query, limit=10):
+        """
+        Returns the ids of up to `limit` generic products best matching the
+        query, tolerating a typo or two per term ("rohlk", "okruka").
+
+        Every term must be close to some token of the product or of its
+        variants. A term scores by how close its best token is, weighted
+        higher for tokens in the product name.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            self._ensure_current()
+            scores = None
+            for term in terms:
+                term_scores = {}
+                for token, distance in self._similar_tokens(term).items():
+                    similarity = 1 - distance / max(len(term), len(token))
+                    for product_id, fields in self._postings[token].items():
+                        weight = FUZZY_PRODUCT_NAME_WEIGHT if fields & IN_PRODUCT_NAME else FUZZY_VARIANT_NAME_WEIGHT
+                        score = similarity * weight
+                        if score > term_scores.get(product_id, 0):
+                            term_scores[product_id] = score
+
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {
+                        product_id: score + term_scores[product_id]
+                        for product_id, score in scores.items()
+                        if product_id in term_scores
+                    }
+                if not scores:
+                    return []
+
+            return heapq.nsmallest(
+                limit, scores, key=lambda product_id: (-scores[product_id], self._names[product_id], product_id)
+            )
+
+
+# Shared instance used by the search view and kept current by signals
+search_index = SearchIndex()
@@ -8,6 +8,7 @@ Included serializers:
 - CategorySerializer: Returns product category info
 - GenericProductSerializer: Shows generic products users compare
 - ProductVariantSerializer: Shows specific product offers in supermarkets
+- BestDealsRequestSerializer: Validates the product ids of a batch best-deal lookup
 """
 
 from rest_framework import serializers
@@ -38,14 +39,15 @@ class GenericProductSerializer(serializers.ModelSerializer):
 class ProductVariantSerializer(serializers.ModelSerializer):
     """
     Serializes specific supermarket product variants (e.g., 'Olma milk at Tesco').
-    Includes product name, price, store, image, and last updated time.
+    Includes product name, price, price per base unit (kg, L or piece), store,
+    image, and last updated time.
     """
     supermarket = serializers.CharField(source='supermarket.name')  # Displays readable supermarket name
     image_url = serializers.SerializerMethodField()  # Custom logic to build image URL
 
     class Meta:
         model = ProductVariant
-        fields = ['variant_name', 'price', 'supermarket', 'image_url', 'last_updated']
+        fields = ['variant_name', 'price', 'unit_price', 'base_unit', 'supermarket', 'image_url', 'last_updated']
         extra_kwargs = {
             'variant_name': {'source': 'name'}  # Maps 'name' to 'variant_name' in the API
         }
@@ -57,4 +59,17 @@ class ProductVariantSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if obj.image and hasattr(obj.image, 'url'):
             return request.build_absolute_uri(obj.image.url) if request else obj.image.url
-        return None
\ No newline at end of file
+        return None
+
+
+# Most product ids accepted by one batch best-deal request
+BEST_DEALS_MAX_IDS = 2000
+
+
+class BestDealsRequestSerializer(serializers.Serializer):
+    """
+    Validates {"ids": [1, 2, ...]} for the batch best-deal endpoint.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=BEST_DEALS_MAX_IDS
+    )
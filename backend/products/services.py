@@ -1,3 +1,30 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Min, OuterRef, Subquery, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from products.matching import match_groups
+from products.models import BestPrice, GenericProduct, PriceHistory, ProductVariant, Supermarket
+
+BEST_PRICE_BATCH_SIZE = 1000
+
+
+def to_halere(price):
+    """
+    Converts a Kč amount (Decimal, float or str) to integer haléře.
+    """
+    return int((Decimal(price) * 100).to_integral_value())
+
+
+def from_halere(amount):
+    """
+    Converts integer haléře back to a Kč Decimal with two decimal places.
+    """
+    return Decimal(amount).scaleb(-2)
+
+
 def get_best_variant(variants):
     """
     Returns the product variant with the lowest price.
@@ -5,4 +32,197 @@ def get_best_variant(variants):
     """
     if not variants:
         return None
-    return min(variants, key=lambda x: x.price)
\ No newline at end of file
+    return min(variants, key=lambda x: x.price)
+
+
+def refresh_best_prices(product_ids=None):
+    """
+    Recomputes the BestPrice rows of the given generic products.
+
+    The cheapest variant of each product (lowest price, then lowest id) is
+    picked in the database and upserted into BestPrice; products left
+    without variants lose their row. Runs in batches inside one transaction.
+
+    Args:
+        product_ids (iterable | None): Generic product ids to refresh,
+            or None to rebuild the whole table.
+
+    Returns:
+        int: Number of BestPrice rows written.
+    """
+    if product_ids is None:
+        product_ids = GenericProduct.objects.order_by("id").values_list("id", flat=True)
+    product_ids = sorted({product_id for product_id in product_ids if product_id is not None})
+
+    cheapest = ProductVariant.objects.filter(generic_product=OuterRef("pk")).order_by("price", "id")
+    written = 0
+
+    with transaction.atomic():
+        for start in range(0, len(product_ids), BEST_PRICE_BATCH_SIZE):
+            batch = product_ids[start:start + BEST_PRICE_BATCH_SIZE]
+            rows = (
+                GenericProduct.objects
+                .filter(id__in=batch)
+                .annotate(
+                    cheapest_variant_id=Subquery(cheapest.values("id")[:1]),
+                    cheapest_price=Subquery(cheapest.values("price")[:1]),
+                )
+                .values_list("id", "cheapest_variant_id", "cheapest_price")
+            )
+
+            best_prices = [
+                BestPrice(generic_product_id=product_id, variant_id=variant_id, price=price)
+                for product_id, variant_id, price in rows
+                if variant_id is not None
+            ]
+            priced_ids = {best.generic_product_id for best in best_prices}
+
+            BestPrice.objects.filter(generic_product_id__in=batch).exclude(generic_product_id__in=priced_ids).delete()
+            BestPrice.objects.bulk_create(
+                best_prices,
+                update_conflicts=True,
+                unique_fields=["generic_product"],
+                update_fields=["variant", "price", "updated_at"],
+            )
+            written += len(best_prices)
+
+    return written
+
+
+def record_price_changes(variants, recorded_at=None):
+    """
+    Appends the current price of the given (saved) variants to PriceHistory.
+
+    Callers pass only variants that are new or whose price changed.
+
+    Args:
+        variants (iterable): ProductVariant instances with a primary key.
+        recorded_at (datetime | None): Time of the change; now by default.
+    """
+    recorded_at = recorded_at or timezone.now()
+    PriceHistory.objects.bulk_create(
+        [
+            PriceHistory(
+                variant_id=variant.pk,
+                generic_product_id=variant.generic_product_id,
+                supermarket_id=variant.supermarket_id,
+                price_halere=to_halere(variant.price),
+                recorded_at=recorded_at,
+            )
+            for variant in variants
+        ],
+        batch_size=BEST_PRICE_BATCH_SIZE,
+    )
+
+
+def refresh_unit_prices(product_ids):
+    """
+    Recomputes unit_price, base_unit and category of every variant of the
+    given generic products (after their amount, unit or category changed).
+
+    Returns:
+        int: Number of variants updated.
+    """
+    variants = list(
+        ProductVariant.objects.filter(generic_product_id__in=product_ids).select_related("generic_product")
+    )
+    now = timezone.now()
+    for variant in variants:
+        variant.set_unit_price()
+        variant.last_updated = now  # bulk_update skips auto_now; delta sync needs the change
+    ProductVariant.objects.bulk_update(
+        variants, [*ProductVariant.UNIT_PRICE_FIELDS, "last_updated"], batch_size=BEST_PRICE_BATCH_SIZE
+    )
+    return len(variants)
+
+
+def refresh_match_groups(product_ids=None):
+    """
+    Recomputes ProductVariant.match_group of the variants of the given
+    generic products (all products if None).
+
+    Returns:
+        int: Number of variants whose group changed.
+    """
+    variants = ProductVariant.objects.all()
+    if product_ids is not None:
+        variants = variants.filter(generic_product_id__in=product_ids)
+
+    rows = list(variants.values_list("id", "generic_product_id", "name", "match_group"))
+    groups = match_groups((variant_id, product_id, name) for variant_id, product_id, name, _ in rows)
+    changed = [
+        ProductVariant(id=variant_id, match_group=groups[variant_id])
+        for variant_id, _, _, match_group in rows
+        if match_group != groups[variant_id]
+    ]
+    ProductVariant.objects.bulk_update(changed, ["match_group"], batch_size=BEST_PRICE_BATCH_SIZE)
+    return len(changed)
+
+
+def price_comparison_matrix(product_ids, **variant_filters):
+    """
+    Builds the product x supermarket comparison matrix.
+
+    Every cell holds the lowest price and the number of variants of one
+    product in one supermarket, all computed by a single
+    GROUP BY generic_product, supermarket aggregate.
+
+    Args:
+        product_ids (list): Row order of the matrix.
+        **variant_filters: Narrow the aggregated variants to those rows
+            (e.g. category_id=3 or generic_product_id__in=[...]).
+
+    Returns:
+        tuple: ([(supermarket_id, name)] column order,
+                {product_id: [(min_price, count) or None per column]})
+    """
+    supermarkets = list(Supermarket.objects.order_by("id").values_list("id", "name"))
+    columns = {supermarket_id: column for column, (supermarket_id, _) in enumerate(supermarkets)}
+    cells = {product_id: [None] * len(supermarkets) for product_id in product_ids}
+
+    aggregates = (
+        ProductVariant.objects
+        .filter(**variant_filters)
+        .values("generic_product_id", "supermarket_id")
+        .annotate(min_price=Min("price"), variants=Count("id"))
+        .order_by()
+        .values_list("generic_product_id", "supermarket_id", "min_price", "variants")
+    )
+    for product_id, supermarket_id, min_price, variants in aggregates:
+        row = cells.get(product_id)
+        column = columns.get(supermarket_id)
+        if row is not None and column is not None:  # Skip rows/columns added in between the queries
+            # SQLite returns MIN() of a decimal column with extra digits; round trip to 2 places
+            row[column] = (from_halere(to_halere(min_price)), variants)
+
+    return supermarkets, cells
+
+
+def cheapest_variants_by_category(limit, per_supermarket=False, category_id=None, values=()):
+    """
+    Returns the `limit` cheapest variants of every category (or of every
+    category and supermarket), ranked in the database with
+    ROW_NUMBER() OVER (PARTITION BY category[, supermarket] ORDER BY price, id).
+
+    Args:
+        limit (int): Variants kept per partition.
+        per_supermarket (bool): Partition by supermarket too.
+        category_id (int | None): Only this category.
+        values (tuple): Extra values_list() fields of each row.
+
+    Returns:
+        QuerySet: Named rows (category_id, category__name, supermarket_id,
+        *values), ordered by category[, supermarket], price and id.
+    """
+    partition = [F("category_id"), F("supermarket_id")] if per_supermarket else [F("category_id")]
+    variants = ProductVariant.objects.filter(category__isnull=False)
+    if category_id is not None:
+        variants = variants.filter(category_id=category_id)
+
+    return (
+        variants
+        .annotate(rank=Window(RowNumber(), partition_by=partition, order_by=[F("price").asc(), F("id").asc()]))
+        .filter(rank__lte=limit)
+        .order_by(*partition, "price", "id")
+        .values_list("category_id", "category__name", "supermarket_id", *values, named=True)
+    )
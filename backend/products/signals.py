@@ -0,0 +1,132 @@
+"""
+Signals and signal handlers for the 'products' app.
+
+- variants_bulk_changed: Sent after bulk imports that bypass model save()
+  (e.g. bulk_create/update). Receivers get `product_ids`, the generic
+  products whose variants were touched.
+- catalog_changed: Sent after a catalog write committed and bumped the
+  catalog version. Receivers get `product_ids` (the generic products whose
+  rows changed; empty for category and supermarket writes) and `version`,
+  the version that write produced. In-process caches patch themselves and
+  move to `version` if they were exactly one version behind; any other
+  gap means another process wrote too, and they rebuild.
+
+Handlers in this module keep the BestPrice table in line with
+ProductVariant writes, append price changes to PriceHistory, keep
+the variants' unit prices in line with their generic product, leave
+a VariantTombstone for every deleted variant (for delta sync), and
+regroup the same-item variants of the touched products. They run
+inside the writing transaction, so the best price is always consistent
+with the committed variants.
+
+They also bump the catalog version and patch the in-process search and
+autocomplete indexes. Those updates are deferred with
+`transaction.on_commit`, so a rolled-back write never shows up in search
+results or invalidates cached responses for nothing.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from products.autocomplete import autocomplete
+from products.models import Category, GenericProduct, ProductVariant, Supermarket, VariantTombstone
+from products.search import search_index
+from products.services import record_price_changes, refresh_best_prices, refresh_match_groups, refresh_unit_prices
+from products.versioning import bump_catalog_version
+
+variants_bulk_changed = Signal()
+catalog_changed = Signal()
+
+
+@receiver(pre_save, sender=ProductVariant)
+def remember_previous_product(sender, instance, **kwargs):
+    # A variant moved to another generic product must also refresh the old one,
+    # and only a changed price goes into the price history
+    instance._previous_generic_product_id = None
+    instance._previous_price = None
+    if instance.pk:
+        previous = ProductVariant.objects.filter(pk=instance.pk).values_list("generic_product_id", "price").first()
+        if previous is not None:
+            instance._previous_generic_product_id, instance._previous_price = previous
+
+
+@receiver(post_save, sender=ProductVariant)
+def record_variant_price(sender, instance, created, **kwargs):
+    previous_price = getattr(instance, "_previous_price", None)
+    if created or previous_price is None or previous_price != Decimal(str(instance.price)):
+        record_price_changes([instance])
+
+
+@receiver(post_delete, sender=ProductVariant)
+def record_variant_tombstone(sender, instance, **kwargs):
+    VariantTombstone.objects.create(
+        variant_id=instance.pk,
+        generic_product_id=instance.generic_product_id,
+        supermarket_id=instance.supermarket_id,
+        deleted_at=timezone.now(),
+    )
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def refresh_variant_best_price(sender, instance, **kwargs):
+    product_ids = [instance.generic_product_id, getattr(instance, "_previous_generic_product_id", None)]
+    refresh_best_prices(product_ids)
+    refresh_match_groups({product_id for product_id in product_ids if product_id is not None})
+
+
+@receiver(post_save, sender=GenericProduct)
+def refresh_product_unit_prices(sender, instance, created, **kwargs):
+    # Variants store a price per kg/L/piece and the category derived from the product
+    if not created:
+        refresh_unit_prices([instance.pk])
+
+
+@receiver(variants_bulk_changed)
+def refresh_bulk_best_prices(sender, product_ids, **kwargs):
+    refresh_best_prices(product_ids)
+    refresh_match_groups(product_ids)
+
+
+def _commit_catalog_write(sender, product_ids):
+    # Bump first, so catalog_changed receivers learn the version this write produced
+    product_ids = {product_id for product_id in product_ids if product_id is not None}
+
+    def committed():
+        version = bump_catalog_version()
+        catalog_changed.send(sender=sender, product_ids=product_ids, version=version)
+
+    transaction.on_commit(committed)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=GenericProduct)
+@receiver(post_delete, sender=GenericProduct)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=Supermarket)
+@receiver(post_delete, sender=Supermarket)
+def bump_version_on_catalog_write(sender, instance, **kwargs):
+    if sender is ProductVariant:
+        product_ids = [instance.generic_product_id, getattr(instance, "_previous_generic_product_id", None)]
+    elif sender is GenericProduct:
+        product_ids = [instance.pk]
+    else:
+        product_ids = []
+    _commit_catalog_write(sender, product_ids)
+
+
+@receiver(variants_bulk_changed)
+def bump_version_on_bulk_change(sender, product_ids, **kwargs):
+    _commit_catalog_write(sender, product_ids)
+
+
+@receiver(catalog_changed)
+def patch_search_indexes(sender, product_ids, version, **kwargs):
+    search_index.refresh_products(product_ids, version)
+    autocomplete.refresh_products(product_ids, version)
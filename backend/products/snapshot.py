@@ -0,0 +1,109 @@
+"""
+Per-worker, read-only snapshot of the whole catalog.
+
+A snapshot holds every category, generic product and variant (with their
+supermarkets) as already-loaded model instances in tuples and read-only
+mappings, tagged with the catalog version it was built at. Views can
+serve from it without touching the database; the existing serializers
+work on it unchanged because all related objects are preloaded.
+
+`get_catalog_snapshot()` returns the snapshot for the current catalog
+version, rebuilding it lazily after a version bump. Rebuilds are
+single-flight: one thread rebuilds while the others keep serving the
+previous snapshot, and only the very first build makes callers wait.
+
+Snapshot instances must be treated as immutable; never save or modify
+the model instances they contain.
+"""
+
+import threading
+from types import MappingProxyType
+
+from products.models import Category, GenericProduct, ProductVariant
+from products.versioning import get_catalog_version
+
+
+class CatalogSnapshot:
+    """
+    Immutable catalog at one catalog version.
+
+    Attributes:
+    - version: Catalog version the snapshot was built at.
+    - categories: All categories, by id.
+    - categories_by_id: {category_id: Category}
+    - products: All generic products (category preloaded), by id.
+    - products_by_id: {product_id: GenericProduct}
+    - products_by_category: {category_id: (GenericProduct, ...)}, by id.
+    - variants_by_product: {product_id: (ProductVariant, ...)} (supermarket preloaded), by id.
+    - best_variants: {product_id: cheapest ProductVariant} (lowest price, then lowest id).
+    """
+
+    def __init__(self, version, categories, products, variants):
+        self.version = version
+        self.categories = tuple(categories)
+        self.categories_by_id = MappingProxyType({category.id: category for category in self.categories})
+        self.products = tuple(products)
+        self.products_by_id = MappingProxyType({product.id: product for product in self.products})
+
+        by_category = {}
+        for product in self.products:
+            by_category.setdefault(product.category_id, []).append(product)
+        self.products_by_category = MappingProxyType({key: tuple(value) for key, value in by_category.items()})
+
+        by_product = {}
+        best = {}
+        for variant in variants:
+            by_product.setdefault(variant.generic_product_id, []).append(variant)
+            current = best.get(variant.generic_product_id)
+            if current is None or (variant.price, variant.id) < (current.price, current.id):
+                best[variant.generic_product_id] = variant
+        self.variants_by_product = MappingProxyType({key: tuple(value) for key, value in by_product.items()})
+        self.best_variants = MappingProxyType(best)
+
+    @classmethod
+    def load(cls, version):
+        """
+        Reads the whole catalog from the database (three queries).
+        """
+        categories = Category.objects.order_by("id")
+        products = GenericProduct.objects.select_related("category").order_by("id")
+        variants = ProductVariant.objects.select_related("supermarket").order_by("id")
+        return cls(version, categories, products.iterator(chunk_size=2000), variants.iterator(chunk_size=2000))
+
+
+_snapshot = None
+_rebuild_lock = threading.Lock()
+
+
+def get_catalog_snapshot():
+    """
+    Returns the snapshot for the current catalog version.
+    """
+    global _snapshot
+
+    # Read the version before the data: a write landing during the rebuild
+    # then only makes the snapshot newer than its label, never older
+    version = get_catalog_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    # Single-flight: without a snapshot everyone waits for the first build;
+    # with one, threads that lose the race keep serving the old snapshot
+    if not _rebuild_lock.acquire(blocking=snapshot is None):
+        return snapshot
+    try:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = CatalogSnapshot.load(version)
+        return _snapshot
+    finally:
+        _rebuild_lock.release()
+
+
+def clear_catalog_snapshot():
+    """
+    Forgets the current snapshot (mainly for tests).
+    """
+    global _snapshot
+    with _rebuild_lock:
+        _snapshot = None
@@ -0,0 +1,75 @@
+"""
+Incremental JSON output for full-catalog responses.
+
+`streaming_json_list` writes a JSON array chunk by chunk: rows are read
+from a queryset with `.iterator(chunk_size=...)`, serialized one chunk at
+a time and sent as soon as they are encoded. Memory stays flat however
+large the catalog is, and the first bytes go out before the last row is
+read.
+
+The bytes are identical to what DRF's JSONRenderer produces for the same
+serializer data (compact separators, UTF-8 without escaping).
+"""
+
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_CHUNK_SIZE = 500
+
+
+def wants_stream(request):
+    """
+    True if the client asked for a streamed full list (?stream=true).
+    """
+    return request.GET.get("stream", "").lower() in ("1", "true", "yes")
+
+
+def _encoder():
+    separators = (",", ":") if api_settings.COMPACT_JSON else (", ", ": ")
+    return JSONEncoder(
+        ensure_ascii=not api_settings.UNICODE_JSON, allow_nan=not api_settings.STRICT_JSON, separators=separators
+    )
+
+
+def _chunks(rows, chunk_size):
+    if isinstance(rows, QuerySet):
+        rows = rows.iterator(chunk_size=chunk_size)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _encode_list(rows, serialize, chunk_size):
+    encoder = _encoder()
+    separator = b""
+    yield b"["
+    for chunk in _chunks(rows, chunk_size):
+        for item in serialize(chunk):
+            # Like JSONRenderer: escape the two line separators JavaScript does not allow in strings
+            text = encoder.encode(item).replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+            yield separator + text.encode("utf-8")
+            separator = b","
+    yield b"]"
+
+
+def streaming_json_list(rows, serialize, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Returns a StreamingHttpResponse with the JSON list of the serialized rows.
+
+    Args:
+        rows (QuerySet | iterable): Rows to serialize, in output order.
+        serialize (callable): Turns a list of rows into a list of JSON-ready
+            dicts, e.g. `lambda chunk: MySerializer(chunk, many=True).data`.
+        chunk_size (int): Rows read from the database and serialized at a time.
+    """
+    return StreamingHttpResponse(
+        _encode_list(rows, serialize, chunk_size),
+        content_type="application/json",
+    )
@@ -0,0 +1,111 @@
+"""
+Delta sync: the variants created, updated or deleted since a point in time.
+
+Clients keep a local copy of the catalog and ask for `?since=<timestamp>`
+instead of downloading it again. The answer is read from two indexed
+change logs:
+- ProductVariant.last_updated (index on last_updated, id) for new and
+  changed variants
+- VariantTombstone.deleted_at for deleted ones
+
+Every response carries `next_since`, the time of the newest change it
+contains, to pass on the next call. A client starts from the time it
+downloaded the full catalog.
+
+`last_updated` is set when a row is written, not when its transaction
+commits, so a long write (e.g. a large price feed) can commit rows
+stamped before a `next_since` already handed out. Each query therefore
+reaches DELTA_SYNC_OVERLAP further back. A few changes are sent twice;
+applying them is idempotent.
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from products.fast_serializers import VARIANT_VALUES, variant_data_function
+from products.models import ProductVariant, VariantTombstone
+
+DELTA_SYNC_OVERLAP = timedelta(minutes=5)
+DELTA_SYNC_RETENTION_DAYS = 30   # Tombstones are kept (and deltas served) this long
+DELTA_SYNC_MAX_CHANGES = 5000    # More changes than this: download the full catalog instead
+
+
+class FullSyncRequired(Exception):
+    """
+    Raised when a delta cannot be served and the client must download
+    the full catalog (too old a `since`, or too many changes).
+    """
+
+
+def parse_since(value):
+    """
+    Parses ?since= (ISO 8601 datetime; naive values are in the current time zone).
+
+    Raises:
+        ValueError: With a message for the client.
+    """
+    moment = parse_datetime(value or "")
+    if moment is None:
+        raise ValueError("Give ?since= as an ISO 8601 datetime.")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def variant_changes(since, request=None):
+    """
+    Returns the variant changes after `since`.
+
+    Returns:
+        dict: {"changed": [variant data + "id", "generic_product_id"],
+               "deleted": [variant ids], "next_since": datetime}
+
+    Raises:
+        FullSyncRequired: `since` is older than the tombstone retention, or
+            more than DELTA_SYNC_MAX_CHANGES variants changed.
+    """
+    if since < timezone.now() - timedelta(days=DELTA_SYNC_RETENTION_DAYS):
+        raise FullSyncRequired(f"Deltas are kept for {DELTA_SYNC_RETENTION_DAYS} days; download the full catalog.")
+
+    start = since - DELTA_SYNC_OVERLAP
+    changed = list(
+        ProductVariant.objects
+        .filter(last_updated__gt=start)
+        .order_by("last_updated", "id")
+        .values_list("generic_product_id", *VARIANT_VALUES, named=True)[:DELTA_SYNC_MAX_CHANGES + 1]
+    )
+    deleted = list(
+        VariantTombstone.objects
+        .filter(deleted_at__gt=start)
+        .order_by("deleted_at", "id")
+        .values_list("variant_id", "deleted_at")[:DELTA_SYNC_MAX_CHANGES + 1]
+    )
+    if len(changed) + len(deleted) > DELTA_SYNC_MAX_CHANGES:
+        raise FullSyncRequired("Too many changes; download the full catalog.")
+
+    next_since = max(
+        [since] + [row.last_updated for row in changed[-1:]] + [deleted_at for _, deleted_at in deleted[-1:]]
+    )
+    variant_data = variant_data_function(request)
+    return {
+        "changed": [
+            {"id": row.id, "generic_product_id": row.generic_product_id, **variant_data(row[1:])}
+            for row in changed
+        ],
+        "deleted": list(dict.fromkeys(variant_id for variant_id, _ in deleted)),
+        "next_since": next_since,
+    }
+
+
+def prune_variant_tombstones(now=None):
+    """
+    Deletes tombstones older than the delta sync retention.
+
+    Returns:
+        int: Number of tombstones deleted.
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=DELTA_SYNC_RETENTION_DAYS)
+    deleted, _ = VariantTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
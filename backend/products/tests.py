@@ -1,3 +1,1310 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import patch
 
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone, translation
+from aiohttp import web
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIRequestFactory, force_authenticate
 
+from products.models import BestPrice, Category, GenericProduct, PriceHistory, ProductVariant, Supermarket, VariantTombstone
+from products import views
+from products.autocomplete import Autocomplete, autocomplete
+from products.columnar import CatalogFormatError, ColumnarCatalog, export_catalog, import_catalog
+from products.ingestion import ingest_price_feed, parse_feed
+from products.matching import MINHASH_PERMUTATIONS, match_groups
+from products.pagination import encode_cursor
+from products.payload_cache import choose_encoding
+from products.scrapers import run_scrapers
+from products.search import edit_distance, fold, search_index
+from products.fast_serializers import PRODUCT_VALUES, VARIANT_VALUES, product_data, variant_data_function
+from products.serializers import GenericProductSerializer, ProductVariantSerializer
+from products.streaming import streaming_json_list
+from products.sync import DELTA_SYNC_RETENTION_DAYS, prune_variant_tombstones
+from products.units import unit_price
+from products import snapshot as snapshot_module
+from products.snapshot import clear_catalog_snapshot, get_catalog_snapshot
+from products.versioning import bump_catalog_version, get_catalog_version
+
+
+class CatalogTestData(TestCase):
+    """
+    Small catalog shared by the product tests.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tesco = Supermarket.objects.create(name="Tesco")
+        cls.billa = Supermarket.objects.create(name="Billa")
+        cls.albert = Supermarket.objects.create(name="Albert")
+        cls.dairy = Category.objects.create(name="Dairy")
+        cls.bakery = Category.objects.create(name="Bakery")
+
+        cls.milk = GenericProduct.objects.create(name="Whole milk", amount=1, unit="L", category=cls.dairy)
+        cls.butter = GenericProduct.objects.create(name="Butter", amount=250, unit="g", category=cls.dairy)
+        cls.rohlik = GenericProduct.objects.create(name="Rohlik", amount=1, unit="pcs", category=cls.bakery)
+        cls.cream = GenericProduct.objects.create(name="Cream", amount=200, unit="ml", category=cls.dairy)
+
+        cls.variants = {}
+        for product, market, name, price in [
+            (cls.milk, cls.billa, "Madeta Jihočeské trvanlivé mléko plnotučné 3,5%", "18.90"),
+            (cls.milk, cls.tesco, "Tesco Mléko UHT plnotučné 3,5%", "24.90"),
+            (cls.milk, cls.albert, "Albert Mléko plnotučné trvanlivé", "23.90"),
+            (cls.butter, cls.billa, "Madeta Jihočeské máslo", "69.90"),
+            (cls.butter, cls.tesco, "Madeta Jihočeské máslo", "69.90"),
+            (cls.butter, cls.albert, "Milkpol Máslo 82%", "39.90"),
+            (cls.rohlik, cls.albert, "Rohlík", "2.90"),
+            (cls.rohlik, cls.tesco, "Rohlík tukový", "2.80"),
+        ]:
+            cls.variants[(product.name, market.name)] = ProductVariant.objects.create(
+                generic_product=product, supermarket=market, name=name, price=Decimal(price)
+            )
+
+    def setUp(self):
+        # In-process indexes and the cache are shared by the whole test run; start each test fresh
+        search_index.invalidate()
+        autocomplete.invalidate()
+        cache.clear()
+
+    def get(self, view, path, *args, **params):
+        request = APIRequestFactory().get(path, params)
+        return view(request, *args)
+
+    @staticmethod
+    def data(response):
+        """
+        Response data of a DRF Response or of a cached JSON payload.
+        """
+        return response.data if hasattr(response, "data") else json.loads(response.content)
+
+
+class TestBestDeal(CatalogTestData):
+    def test_best_deal_returns_cheapest_variant(self):
+        response = self.get(views.best_deal_by_id, "/api/products/best-deal/", self.milk.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["product"], "Whole milk")
+        self.assertEqual(response.data["best_variant"]["supermarket"], "Billa")
+        self.assertEqual(response.data["best_variant"]["price"], "18.90")
+
+    def test_best_deal_is_a_single_row_fetch(self):
+        with self.assertNumQueries(1):
+            self.get(views.best_deal_by_id, "/api/products/best-deal/", self.milk.id)
+
+    def test_best_deal_follows_price_changes(self):
+        variant = self.variants[("Whole milk", "Tesco")]
+        variant.price = Decimal("9.90")
+        variant.save()
+
+        response = self.get(views.best_deal_by_id, "/api/products/best-deal/", self.milk.id)
+        self.assertEqual(response.data["best_variant"]["supermarket"], "Tesco")
+
+        variant.delete()
+
+        response = self.get(views.best_deal_by_id, "/api/products/best-deal/", self.milk.id)
+        self.assertEqual(response.data["best_variant"]["supermarket"], "Billa")
+
+    def test_best_deal_follows_variant_moved_to_other_product(self):
+        variant = self.variants[("Rohlik", "Albert")]
+        variant.generic_product = self.cream
+        variant.save()
+
+        self.assertEqual(BestPrice.objects.get(generic_product=self.cream).variant, variant)
+        self.assertEqual(BestPrice.objects.get(generic_product=self.rohlik).price, Decimal("2.80"))
+
+    def test_best_deal_without_variants_or_product(self):
+        response = self.get(views.best_deal_by_id, "/api/products/best-deal/", self.cream.id)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data, {"error": "No variants found."})
+
+        response = self.get(views.best_deal_by_id, "/api/products/best-deal/", 999999)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data, {"error": "Product not found."})
+
+    def test_rebuild_command_restores_table(self):
+        BestPrice.objects.all().delete()
+
+        call_command("rebuild_best_prices", stdout=open("/dev/null", "w"))
+
+        self.assertEqual(BestPrice.objects.count(), 3)
+        self.variants[("Butter", "Albert")].refresh_from_db()
+        self.assertEqual(self.variants[("Butter", "Albert")].price, Decimal("39.90"))
+
+
+class TestBestDeals(CatalogTestData):
+    def post(self, data):
+        request = APIRequestFactory().post("/api/products/best-deals/", data, format="json")
+        return views.best_deals_by_ids(request)
+
+    def test_returns_best_deal_per_id_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.post({"ids": [self.butter.id, self.milk.id, self.cream.id, 999999, self.milk.id]})
+
+        self.assertEqual(response.status_code, 200)
+        deals = response.data["best_deals"]
+        self.assertEqual(list(deals), [self.butter.id, self.milk.id, self.cream.id, 999999])
+        self.assertEqual(deals[self.milk.id]["best_variant"]["supermarket"], "Billa")
+        self.assertEqual(deals[self.butter.id]["best_variant"]["price"], "39.90")
+        self.assertIsNone(deals[self.cream.id])
+        self.assertIsNone(deals[999999])
+
+    def test_snapshot_gives_same_answer(self):
+        ids = [self.milk.id, self.rohlik.id, self.cream.id]
+        expected = self.post({"ids": ids}).data
+        clear_catalog_snapshot()
+
+        with self.settings(CATALOG_SNAPSHOT_ENABLED=True), self.assertNumQueries(3):
+            self.assertEqual(self.post({"ids": ids}).data, expected)
+
+    def test_rejects_empty_and_oversized_batches(self):
+        self.assertEqual(self.post({"ids": []}).status_code, 400)
+        self.assertEqual(self.post({"ids": list(range(1, 2002))}).status_code, 400)
+        self.assertEqual(self.post({"ids": ["milk"]}).status_code, 400)
+
+
+class TestSearch(CatalogTestData):
+    def search(self, query):
+        response = self.get(views.search_products, "/api/products/search/", q=query)
+        return [product["name"] for product in response.data]
+
+    def test_fold_strips_czech_diacritics(self):
+        self.assertEqual(fold("Jihočeské MÁSLO Rohlík"), "jihoceske maslo rohlik")
+
+    def test_search_matches_without_diacritics(self):
+        self.assertEqual(self.search("mleko"), ["Whole milk"])
+        self.assertEqual(self.search("rohlík"), ["Rohlik"])
+
+    def test_search_matches_variant_names(self):
+        self.assertEqual(self.search("Madeta"), ["Butter", "Whole milk"])
+        self.assertEqual(self.search("madeta maslo"), ["Butter"])
+
+    def test_search_matches_prefixes_and_ranks_product_names_first(self):
+        self.assertEqual(self.search("but"), ["Butter"])
+        self.assertEqual(self.search("mi"), ["Whole milk", "Butter"])
+        self.assertEqual(self.search("m"), [])
+
+    def test_search_without_results_and_empty_query(self):
+        self.assertEqual(self.search("chleba"), [])
+        self.assertEqual(self.search("!!!"), [])
+
+        response = self.get(views.search_products, "/api/products/search/", q="  ")
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_index_follows_catalog_changes(self):
+        self.assertEqual(self.search("kefir"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            kefir = GenericProduct.objects.create(name="Kefír", unit="ml", amount=500, category=self.dairy)
+            ProductVariant.objects.create(generic_product=kefir, supermarket=self.billa, name="Olma Kefír", price=Decimal("24.90"))
+        self.assertEqual(self.search("kefir"), ["Kefír"])
+        self.assertEqual(self.search("olma"), ["Kefír"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            kefir.delete()
+        self.assertEqual(self.search("kefir"), [])
+        self.assertEqual(self.search("olma"), [])
+
+    def test_local_writes_patch_the_index_without_a_rebuild(self):
+        self.assertEqual(self.search("olma"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            milk = self.variants[("Whole milk", "Tesco")]
+            milk.name = "Olma Mléko"
+            milk.save()
+
+        # Only the write's own products were re-read; the next query needs no database
+        with self.assertNumQueries(0):
+            matches = search_index.search("olma")
+        self.assertEqual(matches, [self.milk.id])
+
+    def test_search_index_follows_writes_from_other_processes(self):
+        self.assertEqual(self.search("kefir"), [])
+
+        # Another process: rows change without signals here, only the shared version moves
+        GenericProduct.objects.filter(id=self.butter.id).update(name="Kefír")
+        bump_catalog_version()
+
+        self.assertEqual(self.search("kefir"), ["Kefír"])
+
+
+class TestFuzzySearch(CatalogTestData):
+    def search(self, query, **params):
+        response = self.get(views.fuzzy_search_products, "/api/products/search/fuzzy/", q=query, **params)
+        return [product["name"] for product in response.data]
+
+    def test_edit_distance_counts_swaps_as_one_typo(self):
+        self.assertEqual(edit_distance("okruka", "okurka", 2), 1)
+        self.assertEqual(edit_distance("rohlk", "rohlik", 2), 1)
+        self.assertEqual(edit_distance("mleko", "chleba", 1), 2)  # Capped at limit + 1
+
+    def test_fuzzy_search_tolerates_typos(self):
+        self.assertEqual(self.search("rohlk"), ["Rohlik"])
+        self.assertEqual(self.search("buttr"), ["Butter"])
+        self.assertEqual(self.search("mlecko"), ["Whole milk"])
+
+    def test_fuzzy_search_ranks_product_names_first(self):
+        self.assertEqual(self.search("madeta"), ["Butter", "Whole milk"])
+        self.assertEqual(self.search("madeta", limit=1), ["Butter"])
+
+    def test_fuzzy_search_rejects_distant_terms(self):
+        self.assertEqual(self.search("chleba"), [])
+
+    def test_fuzzy_search_validates_input(self):
+        response = self.get(views.fuzzy_search_products, "/api/products/search/fuzzy/", q="")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.get(views.fuzzy_search_products, "/api/products/search/fuzzy/", q="mleko", limit="x")
+        self.assertEqual(response.status_code, 400)
+
+
+class TestAutocomplete(CatalogTestData):
+    def complete(self, prefix, **params):
+        response = self.get(views.autocomplete_products, "/api/products/autocomplete/", q=prefix, **params)
+        return [(item["type"], item["text"]) for item in response.data]
+
+    def test_completes_product_then_variant_names(self):
+        self.assertEqual(self.complete("roh"), [
+            ("product", "Rohlik"),
+            ("variant", "Rohlík tukový"),
+            ("variant", "Rohlík"),
+        ])
+
+    def test_completes_from_any_word_start(self):
+        self.assertEqual(self.complete("jihoc"), [
+            ("variant", "Madeta Jihočeské trvanlivé mléko plnotučné 3,5%"),
+            ("variant", "Madeta Jihočeské máslo"),
+        ])
+
+    def test_merges_variant_names_across_supermarkets(self):
+        response = self.get(views.autocomplete_products, "/api/products/autocomplete/", q="madeta jihoceske mas")
+
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["price"], Decimal("69.90"))
+        self.assertEqual(response.data[0]["product_id"], self.butter.id)
+
+    def test_respects_limit_and_word_boundaries(self):
+        self.assertEqual(len(self.complete("m", limit=1)), 1)
+        self.assertEqual(self.complete("rohlik "), [("variant", "Rohlík tukový")])
+        self.assertEqual(self.complete(""), [])
+
+    def test_follows_catalog_changes(self):
+        self.complete("kef")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            kefir = GenericProduct.objects.create(name="Kefír", unit="ml", amount=500, category=self.dairy)
+        self.assertEqual(self.complete("kef"), [("product", "Kefír")])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            kefir.delete()
+        self.assertEqual(self.complete("kef"), [])
+
+    def test_follows_writes_from_other_processes(self):
+        self.assertEqual(self.complete("kef"), [])
+
+        # Another process: rows change without signals here, only the shared version moves
+        GenericProduct.objects.filter(id=self.butter.id).update(name="Kefír")
+        bump_catalog_version()
+
+        self.assertEqual(self.complete("kef"), [("product", "Kefír")])
+
+    def test_local_writes_patch_without_a_rebuild(self):
+        self.complete("kef")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            GenericProduct.objects.create(name="Kefír", unit="ml", amount=500, category=self.dairy)
+
+        with self.assertNumQueries(0):
+            completions = autocomplete.complete("kef")
+        self.assertEqual([item["text"] for item in completions], ["Kefír"])
+
+    def test_short_prefixes_rank_every_match(self):
+        names = [(f"Mléko {i:04}", "50") for i in range(1100)] + [("Mz akce", "1")]
+        ProductVariant.objects.bulk_create(
+            ProductVariant(generic_product=self.milk, supermarket=self.tesco, name=name, price=Decimal(price))
+            for name, price in names
+        )
+        autocomplete.invalidate()
+
+        # "Mz akce" sorts after every "mleko ..." key but is the cheapest variant
+        self.assertEqual(self.complete("m", limit=2), [("product", "Whole milk"), ("variant", "Mz akce")])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mint = GenericProduct.objects.create(name="Máta", unit="g", amount=30, category=self.bakery)
+            ProductVariant.objects.create(generic_product=mint, supermarket=self.billa, name="Máta čerstvá", price=Decimal("5"))
+        self.assertEqual(self.complete("m", limit=2), [("product", "Máta"), ("product", "Whole milk")])
+
+    def test_patches_match_a_fresh_build(self):
+        def contents(index):
+            return sorted((key, index._entries[entry_id]) for key, entry_id in zip(index._keys, index._key_entries))
+
+        self.complete("m")
+        entries = len(autocomplete._entries)
+        for price in ("17.90", "16.90"):
+            with self.captureOnCommitCallbacks(execute=True):
+                milk = self.variants[("Whole milk", "Billa")]
+                milk.name, milk.price = "Madeta Mléko Farmářské", Decimal(price)
+                milk.save()
+
+        fresh = Autocomplete()
+        fresh.complete("m")
+        self.assertEqual(contents(autocomplete), contents(fresh))
+        self.assertEqual(list(autocomplete._keys), sorted(autocomplete._keys))
+        # Patched ranked lists give the same completions as freshly ranked ones
+        for prefix in ("m", "ma", "madeta ", "madeta m", "w", "whole m"):
+            self.assertEqual(autocomplete.complete(prefix, limit=20), fresh.complete(prefix, limit=20))
+        # Replaced entries are dropped, not left behind
+        self.assertEqual(len(autocomplete._entries), entries)
+
+
+class TestKeysetPagination(CatalogTestData):
+    def walk(self, view, path, *args, key="results", **params):
+        """
+        Follows next_cursor until the last page; returns all rows and the page count.
+        """
+        rows, pages, cursor = [], 0, None
+        while True:
+            query = dict(params, **({"cursor": cursor} if cursor else {}))
+            response = self.get(view, path, *args, **query)
+            self.assertEqual(response.status_code, 200)
+            rows.extend(self.data(response)[key])
+            pages += 1
+            cursor = self.data(response)["next_cursor"]
+            if cursor is None:
+                return rows, pages
+
+    def test_all_products_pages_by_id(self):
+        rows, pages = self.walk(views.list_all_products, "/api/products/all-products/", page_size=3)
+
+        self.assertEqual(pages, 2)
+        self.assertEqual([row["id"] for row in rows], sorted(GenericProduct.objects.values_list("id", flat=True)))
+
+    def test_variants_page_by_price_then_id(self):
+        rows, pages = self.walk(
+            views.all_variants_by_product, "/api/products/all-variants/", self.butter.id,
+            key="variants", page_size=1, ordering="price",
+        )
+
+        self.assertEqual(pages, 3)
+        self.assertEqual([row["price"] for row in rows], ["39.90", "69.90", "69.90"])
+        self.assertEqual({row["supermarket"] for row in rows[1:]}, {"Billa", "Tesco"})
+
+    def test_products_by_category_pages(self):
+        rows, pages = self.walk(
+            views.products_by_category, "/api/products/products-by-category/", self.dairy.id,
+            key="products", page_size=2,
+        )
+
+        self.assertEqual(pages, 2)
+        self.assertEqual([row["name"] for row in rows], ["Whole milk", "Butter", "Cream"])
+
+    def test_all_flag_keeps_unpaginated_response(self):
+        response = self.get(views.list_all_products, "/api/products/all-products/", all="true")
+
+        self.assertIsInstance(self.data(response), list)
+        self.assertEqual(len(self.data(response)), 4)
+
+    def test_invalid_requests_are_rejected(self):
+        price_cursor = self.get(
+            views.all_variants_by_product, "/api/products/all-variants/", self.milk.id, page_size=1, ordering="price"
+        ).data["next_cursor"]
+
+        for params in [{"cursor": "garbage"}, {"page_size": "0"}, {"page_size": "x"}, {"cursor": price_cursor}]:
+            response = self.get(views.list_all_products, "/api/products/all-products/", **params)
+            self.assertEqual(response.status_code, 400, params)
+
+        response = self.get(views.all_variants_by_product, "/api/products/all-variants/", self.milk.id, ordering="name")
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_finite_price_cursors_are_rejected(self):
+        for price in ("NaN", "Infinity", "-Infinity", "sNaN"):
+            response = self.get(
+                views.all_variants_by_product, "/api/products/all-variants/", self.milk.id,
+                ordering="price", cursor=encode_cursor("price", [price, 1]),
+            )
+            self.assertEqual(response.status_code, 400, price)
+
+
+class TestStreamingLists(CatalogTestData):
+    def test_stream_matches_unpaginated_list(self):
+        expected = self.get(views.list_all_products, "/api/products/all-products/", all="true").content
+
+        response = self.get(views.list_all_products, "/api/products/all-products/", stream="true")
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("ETag", response)
+        self.assertEqual(b"".join(response.streaming_content), expected)
+
+    def test_stream_serializes_in_chunks(self):
+        products = GenericProduct.objects.select_related("category").order_by("id")
+        response = streaming_json_list(products, lambda chunk: GenericProductSerializer(chunk, many=True).data, chunk_size=3)
+
+        with self.assertNumQueries(1):
+            body = b"".join(response.streaming_content)
+        self.assertEqual([row["name"] for row in json.loads(body)], ["Whole milk", "Butter", "Rohlik", "Cream"])
+
+    def test_stream_of_empty_catalog(self):
+        response = streaming_json_list(GenericProduct.objects.none(), list)
+
+        self.assertEqual(b"".join(response.streaming_content), b"[]")
+
+
+class TestFastSerializers(CatalogTestData):
+    def test_product_rows_match_model_serializer(self):
+        products = GenericProduct.objects.order_by("id")
+
+        self.assertEqual(
+            [product_data(row) for row in products.values_list(*PRODUCT_VALUES, named=True)],
+            GenericProductSerializer(products.select_related("category"), many=True).data,
+        )
+
+    def test_variant_rows_match_model_serializer(self):
+        ProductVariant.objects.filter(pk=self.variants[("Butter", "Albert")].pk).update(image="product_images/máslo 82%.jpg")
+        request = APIRequestFactory().get("/api/products/all-variants/")
+        variants = ProductVariant.objects.order_by("id")
+
+        for time_zone in ("Europe/Prague", "UTC"):
+            with self.subTest(time_zone=time_zone), timezone.override(time_zone):
+                variant_data = variant_data_function(request)
+                self.assertEqual(
+                    [variant_data(row) for row in variants.values_list(*VARIANT_VALUES, named=True)],
+                    ProductVariantSerializer(
+                        variants.select_related("supermarket"), many=True, context={"request": request}
+                    ).data,
+                )
+
+
+class TestCatalogETags(CatalogTestData):
+    def test_repeat_request_gets_304_without_queries(self):
+        response = self.get(views.list_categories, "/api/products/categories/")
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('"') and not etag.startswith("W/"))
+
+        request = APIRequestFactory().get("/api/products/categories/", HTTP_IF_NONE_MATCH=etag)
+        with self.assertNumQueries(0):
+            response = views.list_categories(request)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_differs_per_url(self):
+        first = self.get(views.best_deal_by_id, f"/api/products/best-deal/{self.milk.id}/", self.milk.id)
+        second = self.get(views.best_deal_by_id, f"/api/products/best-deal/{self.butter.id}/", self.butter.id)
+
+        self.assertNotEqual(first["ETag"], second["ETag"])
+
+    def test_etag_differs_per_language(self):
+        english = self.get(views.list_categories, "/api/products/categories/")
+        with translation.override("cs"):
+            czech = self.get(views.list_categories, "/api/products/categories/")
+
+            request = APIRequestFactory().get("/api/products/categories/", HTTP_IF_NONE_MATCH=english["ETag"])
+            self.assertEqual(views.list_categories(request).status_code, 200)
+
+        self.assertNotEqual(english["ETag"], czech["ETag"])
+        self.assertIn("Accept-Language", english["Vary"])
+
+    def test_only_successful_responses_are_tagged(self):
+        self.assertNotIn("ETag", self.get(views.best_deal_by_id, "/api/products/best-deal/999999/", 999999))
+        self.assertNotIn("ETag", self.get(views.search_products, "/api/products/search/", q=" "))
+
+    def test_time_dependent_views_are_not_tagged(self):
+        history = self.get(views.product_price_history, "/api/products/price-history/", self.milk.id)
+        changes = self.get(views.variant_changes_since, "/api/products/changes/", since=timezone.now().isoformat())
+
+        self.assertEqual((history.status_code, changes.status_code), (200, 200))
+        self.assertNotIn("ETag", history)
+        self.assertNotIn("ETag", changes)
+
+    def test_catalog_write_changes_etag(self):
+        etag = self.get(views.list_categories, "/api/products/categories/")["ETag"]
+        version = get_catalog_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Vegetables")
+
+        self.assertGreater(get_catalog_version(), version)
+        request = APIRequestFactory().get("/api/products/categories/", HTTP_IF_NONE_MATCH=etag)
+        response = views.list_categories(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.data(response)), 3)
+
+    def test_rolled_back_write_keeps_version(self):
+        version = get_catalog_version()
+
+        with self.captureOnCommitCallbacks(execute=False):
+            Supermarket.objects.create(name="Lidl")
+
+        self.assertEqual(get_catalog_version(), version)
+
+
+@override_settings(CATALOG_SNAPSHOT_ENABLED=True)
+class TestCatalogSnapshot(CatalogTestData):
+    def setUp(self):
+        super().setUp()
+        clear_catalog_snapshot()
+
+    def test_views_serve_from_snapshot_without_queries(self):
+        get_catalog_snapshot()  # Build once (three queries)
+        search_index.search("warm up")  # The search index is built separately
+
+        with self.assertNumQueries(0):
+            best = self.get(views.best_deal_by_id, "/api/products/best-deal/", self.milk.id)
+            variants = self.get(
+                views.all_variants_by_product, "/api/products/all-variants/", self.butter.id, ordering="price"
+            )
+            categories = self.get(views.list_categories, "/api/products/categories/")
+            by_category = self.get(views.products_by_category, "/api/products/products-by-category/", self.dairy.id)
+            products = self.get(views.list_all_products, "/api/products/all-products/", page_size=2)
+            found = self.get(views.search_products, "/api/products/search/", q="mleko")
+
+        self.assertEqual(best.data["best_variant"]["supermarket"], "Billa")
+        self.assertEqual([row["price"] for row in variants.data["variants"]], ["39.90", "69.90", "69.90"])
+        self.assertEqual([row["name"] for row in self.data(categories)], ["Dairy", "Bakery"])
+        self.assertEqual([row["name"] for row in self.data(by_category)["products"]], ["Whole milk", "Butter", "Cream"])
+        self.assertEqual([row["name"] for row in self.data(products)["results"]], ["Whole milk", "Butter"])
+        self.assertEqual([row["name"] for row in found.data], ["Whole milk"])
+
+    def test_snapshot_responses_match_database_responses(self):
+        requests = [
+            (views.best_deal_by_id, "/api/products/best-deal/", (self.butter.id,), {}),
+            (views.all_variants_by_product, "/api/products/all-variants/", (self.milk.id,), {"page_size": 2}),
+            (views.products_by_category, "/api/products/products-by-category/", (self.bakery.id,), {}),
+            (views.list_all_products, "/api/products/all-products/", (), {"all": "true"}),
+        ]
+        for view, path, args, params in requests:
+            from_snapshot = self.data(self.get(view, path, *args, **params))
+            cache.clear()  # Do not answer the database request from the payload cache
+            with self.settings(CATALOG_SNAPSHOT_ENABLED=False):
+                from_database = self.data(self.get(view, path, *args, **params))
+            self.assertEqual(from_snapshot, from_database, path)
+
+    def test_missing_rows_return_404(self):
+        self.assertEqual(self.get(views.best_deal_by_id, "/api/products/best-deal/", self.cream.id).status_code, 404)
+        self.assertEqual(self.get(views.best_deal_by_id, "/api/products/best-deal/", 999999).status_code, 404)
+        self.assertEqual(
+            self.get(views.all_variants_by_product, "/api/products/all-variants/", self.cream.id).status_code, 404
+        )
+        self.assertEqual(
+            self.get(views.products_by_category, "/api/products/products-by-category/", 999999).status_code, 404
+        )
+
+    def test_snapshot_is_rebuilt_after_version_bump(self):
+        snapshot = get_catalog_snapshot()
+        self.assertIs(get_catalog_snapshot(), snapshot)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Vegetables")
+
+        rebuilt = get_catalog_snapshot()
+        self.assertIsNot(rebuilt, snapshot)
+        self.assertEqual(len(rebuilt.categories), 3)
+
+    def test_stale_snapshot_is_served_while_another_thread_rebuilds(self):
+        snapshot = get_catalog_snapshot()
+        bump_catalog_version()
+
+        with snapshot_module._rebuild_lock:  # Another thread is rebuilding
+            with self.assertNumQueries(0):
+                self.assertIs(get_catalog_snapshot(), snapshot)
+
+
+class TestPriceIngestion(CatalogTestData):
+    def ingest(self, text, feed_format="csv", **kwargs):
+        return ingest_price_feed(self.billa, parse_feed(text.splitlines(keepends=True), feed_format), **kwargs)
+
+    def test_upserts_by_product_and_name(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            report = self.ingest(
+                "generic_product_id,name,price\n"
+                f'{self.milk.id},"Madeta Jihočeské trvanlivé mléko plnotučné 3,5%",15.90\n'
+                f"{self.butter.id},Madeta Jihočeské máslo,69.90\n"
+                f"{self.cream.id},Smetana ke šlehání 31%,29.90\n",
+                chunk_size=2,
+            )
+
+        self.assertEqual(report.as_dict(), {"inserted": 1, "updated": 1, "unchanged": 1, "rejected": 0, "errors": []})
+        self.assertEqual(ProductVariant.objects.filter(supermarket=self.billa).count(), 3)
+        self.assertEqual(BestPrice.objects.get(generic_product=self.milk).price, Decimal("15.90"))
+        self.assertEqual(BestPrice.objects.get(generic_product=self.cream).price, Decimal("29.90"))
+        self.assertEqual(search_index.search("smetana"), [self.cream.id])
+
+    def test_rejects_invalid_rows_and_keeps_the_rest(self):
+        report = self.ingest(
+            f'{{"generic_product_id": {self.milk.id}, "name": "Billa Mléko", "price": "21.90"}}\n'
+            "not json\n"
+            '{"generic_product_id": 999999, "name": "Ghost", "price": "1.00"}\n'
+            f'{{"generic_product_id": {self.milk.id}, "name": "Billa Mléko", "price": "-1"}}\n'
+            f'{{"generic_product_id": {self.milk.id}, "price": "1.00"}}\n',
+            feed_format="ndjson",
+        )
+
+        self.assertEqual(report.inserted, 1)
+        self.assertEqual(report.rejected, 4)
+        self.assertEqual(len(report.errors), 4)
+        self.assertTrue(ProductVariant.objects.filter(supermarket=self.billa, name="Billa Mléko").exists())
+
+    def test_query_count_does_not_grow_with_feed_size(self):
+        def count_queries(size):
+            lines = ["generic_product_id,name,price\n"] + [
+                f"{self.milk.id},Mléko {size}-{i},{20 + i}.00\n" for i in range(size)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                report = ingest_price_feed(self.billa, parse_feed(lines, "csv"), chunk_size=500)
+            self.assertEqual(report.inserted, size)
+            return len(queries)
+
+        self.assertEqual(count_queries(10), count_queries(80))  # 80 rows still fit one SQLite INSERT
+
+    def test_endpoint_requires_admin_and_reads_csv(self):
+        body = f"generic_product_id,name,price\n{self.rohlik.id},Rohlík,3.20\n".encode()
+        request = APIRequestFactory().post("/api/products/ingest/", body, content_type="text/csv")
+
+        response = views.ingest_prices(request, self.billa.id)
+        self.assertIn(response.status_code, (401, 403))
+
+        admin = get_user_model().objects.create_superuser(email="admin@example.com", password="x" * 12)
+        request = APIRequestFactory().post("/api/products/ingest/", body, content_type="text/csv")
+        force_authenticate(request, user=admin)
+        response = views.ingest_prices(request, self.billa.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["inserted"], 1)
+
+        request = APIRequestFactory().post("/api/products/ingest/", body, content_type="text/plain")
+        force_authenticate(request, user=admin)
+        self.assertEqual(views.ingest_prices(request, self.billa.id).status_code, 415)
+
+    def test_import_command_reads_feed_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "albert.ndjson"
+            path.write_text(
+                f'{{"generic_product_id": {self.butter.id}, "name": "Milkpol Máslo 82%", "price": 35.9}}\n',
+                encoding="utf-8",
+            )
+            call_command("import_prices", "albert", str(path), stdout=io.StringIO())
+
+        self.assertEqual(ProductVariant.objects.get(pk=self.variants[("Butter", "Albert")].pk).price, Decimal("35.90"))
+
+
+class FixtureShop:
+    """
+    Local aiohttp server standing in for the supermarket web shops, run in
+    a background thread so tests never touch the network.
+    """
+
+    def __init__(self, routes):
+        self.app = web.Application()
+        self.app.add_routes(routes)
+        self.url = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        self._runner = web.AppRunner(self.app)
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    async def _start(self):
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    def __exit__(self, *exc_info):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+@override_settings(SCRAPER_MIN_INTERVAL=0, SCRAPER_RETRY_BACKOFF=0, SCRAPER_MAX_CONCURRENCY_PER_HOST=2)
+class TestScrapers(CatalogTestData):
+    def setUp(self):
+        super().setUp()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.billa_attempts = 0
+
+    async def tesco_search(self, request):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        prices = {"Tesco Mléko UHT plnotučné 3,5%": 21.9, "Madeta Jihočeské máslo": 69.9, "Rohlík tukový": 2.8}
+        query = request.query["query"]
+        items = [{"product": {"title": query, "price": prices[query]}}] if query in prices else []
+        return web.json_response({"productItems": items + [{"product": {"title": "Something else", "price": 1}}]})
+
+    async def billa_search(self, request):
+        self.billa_attempts += 1
+        if self.billa_attempts <= 2:
+            return web.Response(status=503)  # Transient failures are retried
+        return web.json_response({"results": [{"name": request.query["search"], "price": {"regular": {"value": 1590}}}]})
+
+    async def albert_search(self, request):
+        return web.Response(status=404)
+
+    def scrape(self, *names):
+        routes = [
+            web.get("/groceries/cs-CZ/search", self.tesco_search),
+            web.get("/api/products", self.billa_search),
+            web.get("/api/v1/search", self.albert_search),
+        ]
+        with FixtureShop(routes) as shop:
+            urls = {"Tesco": shop.url, "Billa": shop.url, "Albert": shop.url}
+            with override_settings(SCRAPER_BASE_URLS=urls):
+                with self.captureOnCommitCallbacks(execute=True):
+                    return run_scrapers(names or None)
+
+    def test_scraped_prices_are_upserted(self):
+        scrape_report, ingest_report = self.scrape("Tesco")["Tesco"]
+
+        self.assertEqual(len(scrape_report.offers), 3)
+        self.assertEqual((ingest_report.updated, ingest_report.unchanged, ingest_report.inserted), (1, 2, 0))
+        self.assertEqual(
+            ProductVariant.objects.get(pk=self.variants[("Whole milk", "Tesco")].pk).price, Decimal("21.90")
+        )
+
+    def test_concurrency_is_bounded_per_host(self):
+        self.scrape("Tesco")
+
+        self.assertEqual(self.max_in_flight, 2)
+
+    def test_transient_errors_are_retried_and_failures_reported(self):
+        results = self.scrape()
+
+        billa_scrape, billa_ingest = results["Billa"]
+        self.assertEqual(billa_scrape.failed, 0)
+        self.assertEqual(billa_ingest.updated, 2)
+        self.assertEqual(BestPrice.objects.get(generic_product=self.milk).price, Decimal("15.90"))
+
+        albert_scrape, albert_ingest = results["Albert"]
+        self.assertEqual(albert_scrape.failed, 3)
+        self.assertIn("HTTP 404", albert_scrape.errors[0])
+        self.assertEqual(albert_ingest.updated, 0)
+
+
+class TestPriceHistory(CatalogTestData):
+    def test_price_changes_are_appended(self):
+        variant = self.variants[("Whole milk", "Tesco")]
+        variant.price = Decimal("21.90")
+        variant.save()
+        variant.name = "Tesco Mléko UHT"
+        variant.save()  # Same price: nothing recorded
+
+        prices = list(
+            PriceHistory.objects.filter(variant_id=variant.id).order_by("id").values_list("price_halere", flat=True)
+        )
+        self.assertEqual(prices, [2490, 2190])
+
+    def test_ingestion_records_changed_prices_only(self):
+        feed = [
+            (1, {"generic_product_id": self.butter.id, "name": "Madeta Jihočeské máslo", "price": "59.90"}),
+            (2, {"generic_product_id": self.rohlik.id, "name": "Rohlík tukový", "price": "2.80"}),
+        ]
+        ingest_price_feed(self.tesco, feed)
+
+        butter = self.variants[("Butter", "Tesco")]
+        self.assertEqual(
+            list(PriceHistory.objects.filter(variant_id=butter.id).order_by("id").values_list("price_halere", flat=True)),
+            [6990, 5990],
+        )
+        self.assertEqual(PriceHistory.objects.filter(variant_id=self.variants[("Rohlik", "Tesco")].id).count(), 1)
+
+    def test_product_series_is_downsampled_per_day(self):
+        PriceHistory.objects.all().delete()
+        day = timezone.make_aware(datetime(2025, 3, 10, 9, 0))
+        for offset, market, price in [
+            (timedelta(0), self.billa, 1890),
+            (timedelta(hours=5), self.billa, 2190),
+            (timedelta(hours=6), self.billa, 2090),
+            (timedelta(days=1), self.billa, 1990),
+            (timedelta(days=1), self.tesco, 2490),
+            (timedelta(days=30), self.tesco, 2290),  # Outside the range
+        ]:
+            PriceHistory.objects.create(
+                variant_id=self.variants[("Whole milk", market.name)].id, generic_product_id=self.milk.id,
+                supermarket_id=market.id, price_halere=price, recorded_at=day + offset,
+            )
+
+        response = self.get(
+            views.product_price_history, "/api/products/price-history/", self.milk.id, **{"from": "2025-03-10", "to": "2025-03-20"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        billa, tesco = response.data["series"]
+        self.assertEqual(billa["supermarket"], "Billa")
+        self.assertEqual(billa["points"][0], {
+            "date": date(2025, 3, 10), "min": Decimal("18.90"), "avg": Decimal("20.57"), "max": Decimal("21.90")
+        })
+        self.assertEqual(len(billa["points"]), 2)
+        self.assertEqual(tesco["points"], [
+            {"date": date(2025, 3, 11), "min": Decimal("24.90"), "avg": Decimal("24.90"), "max": Decimal("24.90")}
+        ])
+
+    def test_variant_series_and_validation(self):
+        variant = self.variants[("Rohlik", "Albert")]
+        response = self.get(views.variant_price_history, "/api/products/price-history/variant/", variant.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["supermarket"], "Albert")
+        self.assertEqual([point["min"] for point in response.data["points"]], [Decimal("2.90")])
+
+        for params in ({"from": "yesterday"}, {"from": "2025-02-01", "to": "2025-01-01"}, {"from": "2020-01-01"}):
+            response = self.get(views.variant_price_history, "/api/products/price-history/variant/", variant.id, **params)
+            self.assertEqual(response.status_code, 400)
+
+        response = self.get(views.variant_price_history, "/api/products/price-history/variant/", 999999)
+        self.assertEqual(response.status_code, 404)
+
+
+class TestUnitPrices(CatalogTestData):
+    def test_unit_price_normalizes_to_base_units(self):
+        self.assertEqual(unit_price(Decimal("69.90"), Decimal("250"), "g"), ("kg", Decimal("279.60")))
+        self.assertEqual(unit_price(Decimal("18.90"), Decimal("500"), "ml"), ("L", Decimal("37.80")))
+        self.assertEqual(unit_price(Decimal("2.90"), Decimal("1"), "ks"), ("pcs", Decimal("2.90")))
+        self.assertEqual(unit_price(Decimal("2.90"), Decimal("0"), "kg"), (None, None))
+
+    def test_variants_store_unit_price_and_follow_product_changes(self):
+        variant = self.variants[("Butter", "Albert")]
+        variant.refresh_from_db()
+        self.assertEqual((variant.unit_price, variant.base_unit, variant.category_id), (Decimal("159.60"), "kg", self.dairy.id))
+
+        self.butter.amount = Decimal("0.5")
+        self.butter.unit = "kg"
+        self.butter.save()
+
+        variant.refresh_from_db()
+        self.assertEqual(variant.unit_price, Decimal("79.80"))
+
+        ingest_price_feed(self.albert, [(1, {"generic_product_id": self.butter.id, "name": variant.name, "price": "49.90"})])
+        variant.refresh_from_db()
+        self.assertEqual(variant.unit_price, Decimal("99.80"))
+
+    def test_cheapest_per_unit_ranks_category_offers(self):
+        response = self.get(views.cheapest_per_unit, "/api/products/cheapest-per-unit/", self.dairy.id, unit="kg")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row["generic_product"], row["supermarket"], row["unit_price"]) for row in response.data["variants"]],
+            [("Butter", "Albert", "159.60"), ("Butter", "Billa", "279.60"), ("Butter", "Tesco", "279.60")],
+        )
+
+        response = self.get(views.cheapest_per_unit, "/api/products/cheapest-per-unit/", self.dairy.id, unit="L", limit=1)
+        self.assertEqual([row["variant_name"] for row in response.data["variants"]], [self.variants[("Whole milk", "Billa")].name])
+
+        response = self.get(views.cheapest_per_unit, "/api/products/cheapest-per-unit/", self.dairy.id, unit="m3")
+        self.assertEqual(response.status_code, 400)
+
+    def test_best_deal_exposes_unit_price(self):
+        response = self.get(views.best_deal_by_id, "/api/products/best-deal/", self.rohlik.id)
+
+        self.assertEqual(response.data["best_variant"]["unit_price"], "2.80")
+        self.assertEqual(response.data["best_variant"]["base_unit"], "pcs")
+
+
+class TestPriceComparison(CatalogTestData):
+    def test_category_matrix_has_a_cell_per_product_and_supermarket(self):
+        ProductVariant.objects.create(
+            generic_product=self.milk, supermarket=self.tesco, name="Olma Mléko", price=Decimal("31.90")
+        )
+
+        with self.assertNumQueries(4):  # Category, products, supermarkets, one GROUP BY
+            response = self.get(views.price_comparison, "/api/products/price-comparison/", category=self.dairy.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([column["name"] for column in response.data["supermarkets"]], ["Tesco", "Billa", "Albert"])
+        rows = {row["name"]: row["cells"] for row in response.data["products"]}
+        self.assertEqual(list(rows), ["Whole milk", "Butter", "Cream"])
+        self.assertEqual(rows["Whole milk"], [
+            {"min_price": "24.90", "variants": 2},
+            {"min_price": "18.90", "variants": 1},
+            {"min_price": "23.90", "variants": 1},
+        ])
+        self.assertEqual(rows["Butter"][2], {"min_price": "39.90", "variants": 1})
+        self.assertEqual(rows["Cream"], [None, None, None])
+
+    def test_ids_keep_requested_order(self):
+        response = self.get(
+            views.price_comparison, "/api/products/price-comparison/", ids=f"{self.rohlik.id},{self.milk.id},999999"
+        )
+
+        self.assertEqual([row["id"] for row in response.data["products"]], [self.rohlik.id, self.milk.id])
+        self.assertEqual(response.data["products"][0]["cells"], [
+            {"min_price": "2.80", "variants": 1}, None, {"min_price": "2.90", "variants": 1},
+        ])
+
+    def test_rejects_bad_requests(self):
+        path = "/api/products/price-comparison/"
+        self.assertEqual(self.get(views.price_comparison, path).status_code, 400)
+        self.assertEqual(self.get(views.price_comparison, path, ids="milk").status_code, 400)
+        self.assertEqual(self.get(views.price_comparison, path, ids=",".join(map(str, range(1, 2002)))).status_code, 400)
+        self.assertEqual(self.get(views.price_comparison, path, category=999999).status_code, 404)
+
+
+class TestDeltaSync(CatalogTestData):
+    def setUp(self):
+        super().setUp()
+        # Age the test data past the overlap window, so only writes made in a test count as changes
+        ProductVariant.objects.update(last_updated=timezone.now() - timedelta(hours=1))
+        self.since = timezone.now()
+
+    def changes(self, since):
+        return self.get(views.variant_changes_since, "/api/products/changes/", since=since.isoformat())
+
+    def test_returns_changed_and_deleted_variants(self):
+        self.assertEqual(self.changes(self.since).data["changed"], [])
+
+        milk = self.variants[("Whole milk", "Tesco")]
+        milk.price = Decimal("21.90")
+        milk.save()
+        rohlik_id = self.variants[("Rohlik", "Albert")].id
+        self.variants[("Rohlik", "Albert")].delete()
+
+        response = self.changes(self.since)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row["id"], row["generic_product_id"], row["price"]) for row in response.data["changed"]],
+            [(milk.id, self.milk.id, "21.90")],
+        )
+        self.assertEqual(response.data["deleted"], [rohlik_id])
+        self.assertGreater(response.data["next_since"], self.since)
+
+    def test_partial_saves_are_changes(self):
+        milk = self.variants[("Whole milk", "Tesco")]
+        milk.price = Decimal("21.90")
+        milk.save(update_fields=["price"])
+
+        changed = self.changes(self.since).data["changed"]
+        self.assertEqual([(row["id"], row["price"]) for row in changed], [(milk.id, "21.90")])
+
+    def test_product_changes_touch_their_variants(self):
+        self.butter.amount = Decimal("500")
+        self.butter.save()
+
+        changed = self.changes(self.since).data["changed"]
+        self.assertEqual([row["generic_product_id"] for row in changed], [self.butter.id] * 3)
+
+    def test_old_or_invalid_since_is_rejected(self):
+        response = self.changes(self.since - timedelta(days=DELTA_SYNC_RETENTION_DAYS + 1))
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.data["full_sync_required"])
+
+        response = self.get(views.variant_changes_since, "/api/products/changes/", since="yesterday")
+        self.assertEqual(response.status_code, 400)
+
+    def test_prune_removes_expired_tombstones(self):
+        self.variants[("Rohlik", "Albert")].delete()
+        VariantTombstone.objects.create(
+            variant_id=999999, generic_product_id=self.rohlik.id, supermarket_id=self.albert.id,
+            deleted_at=timezone.now() - timedelta(days=DELTA_SYNC_RETENTION_DAYS + 1),
+        )
+
+        self.assertEqual(prune_variant_tombstones(), 1)
+        self.assertEqual(VariantTombstone.objects.count(), 1)
+
+
+class TestPayloadCache(CatalogTestData):
+    def get_encoded(self, view, path, *args, accept_encoding="", **params):
+        request = APIRequestFactory().get(path, params, HTTP_ACCEPT_ENCODING=accept_encoding)
+        return view(request, *args)
+
+    def test_serves_gzip_from_cache_without_queries(self):
+        plain = self.get_encoded(views.list_all_products, "/api/products/all-products/", all="true")
+
+        with self.assertNumQueries(0):
+            response = self.get_encoded(
+                views.list_all_products, "/api/products/all-products/", accept_encoding="gzip, deflate", all="true"
+            )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertTrue(response["ETag"].startswith("W/"))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertNotIn("Content-Encoding", plain)
+
+    def test_catalog_write_replaces_cached_payload(self):
+        self.get_encoded(views.list_categories, "/api/products/categories/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Vegetables")
+
+        response = self.get_encoded(views.list_categories, "/api/products/categories/")
+        self.assertEqual([row["name"] for row in json.loads(response.content)], ["Dairy", "Bakery", "Vegetables"])
+
+    def test_errors_are_not_cached(self):
+        path = "/api/products/products-by-category/"
+        self.assertEqual(self.get_encoded(views.products_by_category, path, 999999).status_code, 404)
+        self.assertEqual(self.get_encoded(views.list_all_products, "/api/products/all-products/", cursor="x").status_code, 400)
+
+    def test_choose_encoding(self):
+        available = {"identity": b"", "gzip": b"", "br": b""}
+        self.assertEqual(choose_encoding("gzip, deflate, br", available), "br")
+        self.assertEqual(choose_encoding("gzip, br;q=0.5", available), "gzip")
+        self.assertEqual(choose_encoding("br;q=0, *", available), "gzip")
+        self.assertEqual(choose_encoding("br", {"identity": b"", "gzip": b""}), "identity")
+        self.assertEqual(choose_encoding("", available), "identity")
+
+
+class TestColumnarExport(CatalogTestData):
+    def export(self):
+        output = io.BytesIO()
+        export_catalog(output)
+        return ColumnarCatalog(output.getvalue())
+
+    def test_round_trips_the_catalog(self):
+        catalog = self.export()
+
+        self.assertEqual(catalog.catalog_version, get_catalog_version())
+        self.assertEqual(catalog.values("categories", "name"), ["Dairy", "Bakery"])
+        self.assertEqual(catalog.values("products", "amount")[1], Decimal("250.00"))
+
+        variants = ProductVariant.objects.order_by("id")
+        self.assertEqual(list(catalog.column("variants", "id")), [variant.id for variant in variants])
+        self.assertEqual(catalog.values("variants", "price"), [variant.price for variant in variants])
+        self.assertEqual(catalog.values("variants", "name"), [variant.name for variant in variants])
+        self.assertEqual(catalog.values("variants", "base_unit"), [variant.base_unit for variant in variants])
+        self.assertEqual(catalog.values("variants", "last_updated"), [variant.last_updated for variant in variants])
+
+    def test_strings_are_dictionary_encoded(self):
+        catalog = self.export()
+
+        # "Madeta Jihočeské máslo" is sold by two supermarkets but stored once
+        names = catalog.dictionary("variants", "name")
+        self.assertEqual(len(names), ProductVariant.objects.values("name").distinct().count())
+        self.assertEqual(catalog.dictionary("variants", "base_unit"), ["L", "kg", "pcs"])
+
+    def test_file_can_be_memory_mapped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "catalog.kcol"
+            call_command("export_catalog", str(path), stdout=io.StringIO())
+            catalog = ColumnarCatalog.open(path)
+
+            self.assertEqual(sum(catalog.column("variants", "price")), 25310)  # Haléře
+            del catalog
+
+            path.write_bytes(b"")
+            with self.assertRaisesMessage(CommandError, "too short"):
+                call_command("import_catalog", str(path), stdout=io.StringIO())
+
+    def test_import_reuses_bulk_ingestion(self):
+        catalog = self.export()
+        ProductVariant.objects.filter(supermarket=self.albert).update(price=Decimal("1.00"))
+
+        reports = import_catalog(catalog)
+
+        self.assertEqual(reports["Albert"].updated, 3)
+        self.assertEqual(reports["Tesco"].unchanged, 3)
+        self.variants[("Butter", "Albert")].refresh_from_db()
+        self.assertEqual(self.variants[("Butter", "Albert")].price, Decimal("39.90"))
+
+    def download(self):
+        response = self.get(views.export_catalog_file, "/api/products/export/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content)
+        response.close()
+        self.assertEqual(int(response["Content-Length"]), len(content))
+        return response, content
+
+    def test_endpoint_and_bad_files(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CATALOG_EXPORT_DIR=directory):
+            response, content = self.download()
+            self.assertIn(f"kolik-catalog-{get_catalog_version()}.kcol", response["Content-Disposition"])
+            self.assertEqual(ColumnarCatalog(content).rows("variants"), 8)
+
+            # Served from the stored file until the catalog changes
+            with self.assertNumQueries(0):
+                self.assertEqual(self.download()[1], content)
+
+            bump_catalog_version()
+            response, _ = self.download()
+            self.assertIn(f"kolik-catalog-{get_catalog_version()}.kcol", response["Content-Disposition"])
+            self.assertEqual(os.listdir(directory), [f"kolik-catalog-{get_catalog_version()}.kcol"])
+
+        with self.assertRaises(CatalogFormatError):
+            ColumnarCatalog(b"not a catalog at all")
+
+
+class TestMatchGroups(CatalogTestData):
+    def test_similar_names_of_one_product_are_grouped(self):
+        groups = match_groups([
+            (1, 1, "Madeta Jihočeské máslo"),
+            (2, 1, "MADETA Jihočeské Máslo"),
+            (3, 1, "Madeta Jihočeské máslo nedělní"),
+            (4, 1, "Milkpol Máslo 82%"),
+            (5, 1, "Milkpol máslo 82 %"),
+            (6, 2, "Madeta Jihočeské máslo"),  # Another generic product
+            (7, 1, "President Máslo"),
+        ])
+
+        self.assertEqual(groups, {1: 1, 2: 1, 3: 3, 4: 4, 5: 4, 6: 6, 7: 7})
+
+    def test_every_pair_of_a_bucket_is_compared(self):
+        # One shared signature puts all names in the same buckets, in this order
+        with patch("products.matching.minhash", return_value=(0,) * MINHASH_PERMUTATIONS):
+            groups = match_groups([
+                (1, 1, "Madeta Jihočeské máslo"),
+                (2, 1, "President Máslo"),
+                (3, 1, "MADETA Jihočeské Máslo"),
+            ])
+
+        self.assertEqual(groups, {1: 1, 2: 2, 3: 1})
+
+    def test_groups_follow_variant_writes(self):
+        billa = self.variants[("Butter", "Billa")]
+        tesco = self.variants[("Butter", "Tesco")]
+        albert = self.variants[("Butter", "Albert")]
+        for variant in (billa, tesco, albert):
+            variant.refresh_from_db()
+        self.assertEqual((tesco.match_group, albert.match_group), (billa.match_group, albert.id))
+
+        ingest_price_feed(self.albert, [(1, {"generic_product_id": self.butter.id, "name": "Madeta Jihočeské máslo", "price": "64.90"})])
+
+        response = self.get(views.matched_variants, "/api/products/matches/", self.butter.id)
+        groups = response.data["groups"]
+        self.assertEqual([group["min_price"] for group in groups], ["39.90", "64.90"])
+        self.assertEqual([row["supermarket"] for row in groups[1]["variants"]], ["Albert", "Billa", "Tesco"])
+        self.assertEqual(groups[1]["match_group"], billa.id)
+
+    def test_unknown_product_returns_404(self):
+        self.assertEqual(self.get(views.matched_variants, "/api/products/matches/", 999999).status_code, 404)
+
+
+class TestDealsByCategory(CatalogTestData):
+    def deals(self, **params):
+        return self.get(views.deals_by_category, "/api/products/deals-by-category/", **params)
+
+    def test_cheapest_variants_per_category_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.deals(limit=2)
+
+        self.assertEqual(response.status_code, 200)
+        categories = {category["name"]: category["variants"] for category in response.data["categories"]}
+        self.assertEqual(
+            [(row["generic_product"], row["supermarket"], row["price"]) for row in categories["Dairy"]],
+            [("Whole milk", "Billa", "18.90"), ("Whole milk", "Albert", "23.90")],
+        )
+        self.assertEqual([row["price"] for row in categories["Bakery"]], ["2.80", "2.90"])
+
+    def test_per_supermarket_partitions(self):
+        response = self.deals(limit=1, per_supermarket="true", category=self.dairy.id)
+
+        (dairy,) = response.data["categories"]
+        self.assertEqual(
+            sorted((row["supermarket"], row["price"]) for row in dairy["variants"]),
+            [("Albert", "23.90"), ("Billa", "18.90"), ("Tesco", "24.90")],
+        )
+
+    def test_rejects_bad_parameters(self):
+        self.assertEqual(self.deals(limit="x").status_code, 400)
+        self.assertEqual(self.deals(category="dairy").status_code, 400)
+
+
+class TestFacetedListings(CatalogTestData):
+    def facets(self, response, name):
+        data = self.data(response)["facets"][name]
+        return {row.get("name", row.get("value")): row["count"] for row in data if row["count"]}
+
+    def test_filters_narrow_the_product_list(self):
+        def names(**params):
+            response = self.get(views.list_all_products, "/api/products/all-products/", **params)
+            return [row["name"] for row in self.data(response)["results"]]
+
+        self.assertEqual(names(category=self.dairy.id), ["Whole milk", "Butter", "Cream"])
+        self.assertEqual(names(supermarket=self.albert.id, max_price="25"), ["Whole milk", "Rohlik"])
+        self.assertEqual(names(supermarket=f"{self.tesco.id},{self.billa.id}", min_price="20", max_price="30"), ["Whole milk"])
+        self.assertEqual(names(unit="g,ml"), ["Butter", "Cream"])
+
+    def test_facet_counts_come_from_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(
+                views.list_all_products, "/api/products/all-products/", facets="true", category=self.dairy.id
+            )
+
+        self.assertEqual(len([query for query in queries if "COUNT" in query["sql"]]), 1)
+        # Each facet ignores its own filter, so the other categories still show up
+        self.assertEqual(self.facets(response, "category"), {"Dairy": 3, "Bakery": 1})
+        self.assertEqual(self.facets(response, "supermarket"), {"Tesco": 2, "Billa": 2, "Albert": 2})
+        self.assertEqual(self.facets(response, "unit"), {"L": 1, "g": 1, "ml": 1})
+
+    def test_search_takes_filters_and_facets(self):
+        response = self.get(views.search_products, "/api/products/search/", q="madeta", facets="true", max_price="30")
+
+        self.assertEqual([row["name"] for row in response.data["results"]], ["Whole milk"])
+        self.assertEqual(self.facets(response, "supermarket"), {"Tesco": 1, "Billa": 1, "Albert": 1})
+        self.assertEqual(self.facets(response, "category"), {"Dairy": 1})
+
+    def test_invalid_filters_are_rejected(self):
+        for params in [{"category": "dairy"}, {"min_price": "-1"}, {"max_price": "cheap"}, {"unit": "lb"}]:
+            response = self.get(views.list_all_products, "/api/products/all-products/", **params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class TestSparseFieldsets(CatalogTestData):
+    def test_products_keep_only_the_requested_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(views.list_all_products, "/api/products/all-products/", fields="id,name", page_size=2)
+
+        self.assertEqual(self.data(response)["results"], [
+            {"id": self.milk.id, "name": "Whole milk"},
+            {"id": self.butter.id, "name": "Butter"},
+        ])
+        # Columns that are not asked for are not read (no category join)
+        self.assertNotIn("JOIN", queries[-1]["sql"])
+        self.assertNotIn("amount", queries[-1]["sql"])
+
+        response = self.get(
+            views.list_all_products, "/api/products/all-products/",
+            fields="name", cursor=self.data(response)["next_cursor"], page_size=2,
+        )
+        self.assertEqual(self.data(response)["results"], [{"name": "Rohlik"}, {"name": "Cream"}])
+
+    def test_sparse_fields_match_the_full_output(self):
+        full = self.get(views.products_by_category, "/api/products-by-category/", self.dairy.id, all="true")
+        sparse = self.get(
+            views.products_by_category, "/api/products-by-category/", self.dairy.id, all="true", fields="amount,category"
+        )
+
+        self.assertEqual(
+            self.data(sparse)["products"],
+            [{"amount": row["amount"], "category": row["category"]} for row in self.data(full)["products"]],
+        )
+
+    def test_variants_skip_image_urls_unless_requested(self):
+        with patch("products.fast_serializers._image_url_function") as image_url_function:
+            response = self.get(
+                views.all_variants_by_product, "/api/all-variants/", self.milk.id,
+                fields="id,variant_name,price", ordering="price",
+            )
+
+        image_url_function.assert_not_called()
+        self.assertEqual(response.data["variants"][0], {
+            "id": self.variants[("Whole milk", "Billa")].id,
+            "variant_name": "Madeta Jihočeské trvanlivé mléko plnotučné 3,5%",
+            "price": "18.90",
+        })
+
+    def test_unknown_fields_are_rejected(self):
+        for view, args, fields in [
+            (views.list_all_products, (), "id,price"),
+            (views.products_by_category, (self.dairy.id,), ","),
+            (views.all_variants_by_product, (self.milk.id,), "name"),
+        ]:
+            response = self.get(view, "/api/products/", *args, fields=fields)
+            self.assertEqual(response.status_code, 400, fields)
@@ -0,0 +1,48 @@
+"""
+Normalization of pack prices to a price per base unit.
+
+Generic products come in packs of `amount` `unit` (e.g. 250 g, 1.5 L,
+10 ks). To compare offers across pack sizes, every variant also stores
+its price per base unit: per kilogram, per litre or per piece.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+KILOGRAM = "kg"
+LITRE = "L"
+PIECE = "pcs"
+
+BASE_UNIT_CHOICES = [
+    (KILOGRAM, "Per kilogram"),
+    (LITRE, "Per litre"),
+    (PIECE, "Per piece"),
+]
+
+# GenericProduct.unit -> (base unit, base units per unit)
+UNIT_BASES = {
+    "kg": (KILOGRAM, Decimal("1")),
+    "g": (KILOGRAM, Decimal("0.001")),
+    "L": (LITRE, Decimal("1")),
+    "ml": (LITRE, Decimal("0.001")),
+    "pcs": (PIECE, Decimal("1")),
+    "ks": (PIECE, Decimal("1")),
+}
+
+
+def unit_price(price, amount, unit):
+    """
+    Returns (base_unit, price per base unit) for a pack price, e.g.
+    (69.90 Kč, 250, "g") -> ("kg", Decimal("279.60")).
+
+    Returns (None, None) for unknown units or a zero amount.
+    """
+    if unit not in UNIT_BASES or price is None or amount is None:
+        return None, None
+    base_unit, factor = UNIT_BASES[unit]
+    try:
+        quantity = Decimal(str(amount)) * factor
+        if quantity <= 0:
+            return None, None
+        return base_unit, (Decimal(str(price)) / quantity).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        return None, None
@@ -4,9 +4,18 @@ URL patterns for the 'products' app.
 These endpoints allow users to:
 - Browse product categories
 - View all generic products
-- Search for products
+- Search for products (exact/prefix, or typo-tolerant via search/fuzzy/)
+- Get typeahead completions for the search box
 - View all variants of a product
-- Find the best deal (cheapest offer) for a specific product
+- Find the best deal (cheapest offer) for a specific product, or for many at once
+- Upload a supermarket's price feed (admins only)
+- Chart the price history of a variant or product
+- Rank a category's offers by price per kg, litre or piece
+- Compare the prices of many products across all supermarkets at once
+- Sync only the variants changed or deleted since the last download
+- Download the whole catalog as one compact columnar file
+- Compare the same item across supermarkets
+- List the cheapest deals of every category
 """
 
 from django.urls import path
@@ -14,9 +23,21 @@ from products import views
 
 urlpatterns = [
     path("best-deal/<int:product_id>/", views.best_deal_by_id),
+    path("best-deals/", views.best_deals_by_ids),
     path("all-variants/<int:product_id>/", views.all_variants_by_product),
     path("categories/", views.list_categories),
     path("products-by-category/<int:category_id>/", views.products_by_category),
     path("all-products/", views.list_all_products),
     path("search/", views.search_products),
+    path("search/fuzzy/", views.fuzzy_search_products),
+    path("autocomplete/", views.autocomplete_products),
+    path("ingest/<int:supermarket_id>/", views.ingest_prices),
+    path("price-history/<int:product_id>/", views.product_price_history),
+    path("price-history/variant/<int:variant_id>/", views.variant_price_history),
+    path("cheapest-per-unit/<int:category_id>/", views.cheapest_per_unit),
+    path("price-comparison/", views.price_comparison),
+    path("changes/", views.variant_changes_since),
+    path("export/", views.export_catalog_file),
+    path("matches/<int:product_id>/", views.matched_variants),
+    path("deals-by-category/", views.deals_by_category),
 ]
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""
+Catalog version counter and HTTP validators derived from it.
+
+The catalog version is a single integer that grows on every committed
+write to Category, GenericProduct, ProductVariant or Supermarket (see
+`products.signals`). Anything derived from the catalog can be cached
+under it: as long as the version is the same, the catalog is too.
+
+The counter lives in Django's cache so all workers see the same value
+when a shared backend (Redis, Memcached) is configured. If the cache
+loses it, it restarts from the current time in milliseconds rather than
+from 0, so a version number is never handed out twice.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils import translation
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import etag
+
+CATALOG_VERSION_KEY = "products:catalog_version"
+
+
+def _initial_version():
+    return int(time.time() * 1000)
+
+
+def get_catalog_version():
+    """
+    Returns the current catalog version.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Increments the catalog version and returns the new value.
+    """
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:  # Key missing (first write, or evicted)
+        cache.add(CATALOG_VERSION_KEY, _initial_version(), timeout=None)
+        return cache.incr(CATALOG_VERSION_KEY)
+
+
+def versioned_etag(version, request):
+    """
+    ETag value of the resource at `request`'s URL at a catalog version,
+    in the active language (cached payloads are kept per language).
+    """
+    url_hash = hashlib.sha1(request.get_full_path().encode()).hexdigest()[:12]
+    return f"{version}-{translation.get_language()}-{url_hash}"
+
+
+def catalog_etag(request, *args, **kwargs):
+    """
+    Strong ETag for a catalog response: the catalog version, the active
+    language and a short hash of the full URL, so different resources
+    (or languages) never share an ETag.
+    """
+    return versioned_etag(get_catalog_version(), request)
+
+
+def catalog_conditional(view):
+    """
+    Decorator for read-only catalog views: adds the ETag and answers a
+    matching If-None-Match with 304 before the view (and the ORM) runs.
+
+    Tagged responses vary by Accept-Language, as their ETag does.
+    Only successful responses keep the ETag, so an error is never
+    revalidated into a 304. Not for views whose answer also changes with
+    time (price history over a default window, the delta sync feed): the
+    tag only follows the catalog version.
+    """
+    conditional_view = etag(catalog_etag)(view)
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        if not (200 <= response.status_code < 300 or response.status_code == 304):
+            response.headers.pop("ETag", None)
+        else:
+            patch_vary_headers(response, ["Accept-Language"])
+        return response
+
+    return wrapped
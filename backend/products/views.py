@@ -1,99 +1,690 @@
-from rest_framework.decorators import api_view
+from django.conf import settings
+from django.http import FileResponse
+import codecs
+from decimal import Decimal
+import os
+import shutil
+import tempfile
+
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
-from products.models import GenericProduct, ProductVariant, Category
-from products.services import get_best_variant 
+from products import columnar
+from products.facets import facet_counts, filter_products, has_filters, parse_filters, wants_facets
+from products.history import daily_price_series, parse_time_range
+from products.ingestion import FeedError, ingest_price_feed, parse_feed
+from products.models import BestPrice, GenericProduct, ProductVariant, Category, Supermarket
+from products.payload_cache import cached_json_response
+from products.pagination import InvalidPageRequest, get_ordering, paginate, wants_all
+from products.autocomplete import autocomplete
+from products.fast_serializers import (
+    PRODUCT_FIELDS,
+    PRODUCT_VALUES,
+    VARIANT_FIELDS,
+    VARIANT_VALUES,
+    decimal_string,
+    parse_fields,
+    product_data,
+    sparse_columns,
+    sparse_data_function,
+    variant_data_function,
+)
+from products.search import search_index
+from products.services import cheapest_variants_by_category, price_comparison_matrix
+from products.snapshot import get_catalog_snapshot
+from products.sync import FullSyncRequired, parse_since, variant_changes
+from products.streaming import streaming_json_list, wants_stream
+from products.units import BASE_UNIT_CHOICES, KILOGRAM
+from products.versioning import catalog_conditional, get_catalog_version
 from products.serializers import (
+    BestDealsRequestSerializer,
     CategorySerializer,
     GenericProductSerializer,
     ProductVariantSerializer
 )
 
+# All GET views here are read-only and, except those whose answer also depends on
+# the current time (price history, delta sync), decorated with @catalog_conditional:
+# they send a strong ETag derived from the catalog version with successful responses
+# and answer a matching If-None-Match with 304 Not Modified without running the view.
+# categories, all-products and products-by-category also keep their rendered,
+# pre-compressed JSON per catalog version (see products/payload_cache.py).
+
+# Number of results returned by the fuzzy search (?limit= can change it)
+FUZZY_SEARCH_DEFAULT_LIMIT = 10
+FUZZY_SEARCH_MAX_LIMIT = 50
+
+# Number of completions returned by autocomplete (?limit= can change it)
+AUTOCOMPLETE_DEFAULT_LIMIT = 8
+AUTOCOMPLETE_MAX_LIMIT = 20
+
+# Number of offers returned by the cheapest-per-unit ranking (?limit= can change it)
+CHEAPEST_PER_UNIT_DEFAULT_LIMIT = 10
+CHEAPEST_PER_UNIT_MAX_LIMIT = 100
+
+# Number of deals returned per category (or category and supermarket) (?limit= can change it)
+DEALS_PER_CATEGORY_DEFAULT_LIMIT = 5
+DEALS_PER_CATEGORY_MAX_LIMIT = 50
+
+# Most products in one comparison matrix requested with ?ids=
+PRICE_MATRIX_MAX_IDS = 2000
+
+# Content types accepted by the price feed ingestion endpoint
+FEED_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+}
+
+
+def _catalog_snapshot():
+    """
+    Returns the in-process catalog snapshot if settings.CATALOG_SNAPSHOT_ENABLED
+    is on, otherwise None (views then read from the database).
+    """
+    return get_catalog_snapshot() if settings.CATALOG_SNAPSHOT_ENABLED else None
+
+
+# List views read rows with .values_list() and turn them into the serializers' JSON shape
+# with the functions in products/fast_serializers.py, which is several times
+# faster than the ModelSerializers; snapshot model instances still go through the
+# serializers.
+# With a sparse fieldset (?fields=, see parse_fields) only the requested
+# columns are read, from the database rather than the snapshot.
+
+# Keyset pagination reads these from every row
+PRODUCT_PAGE_KEYS = ("id",)
+VARIANT_PAGE_KEYS = ("id", "price")
+
+
+def _product_values(fields):
+    """
+    Returns the columns to read for product rows: PRODUCT_VALUES, or just
+    those of a sparse fieldset.
+    """
+    return PRODUCT_VALUES if fields is None else sparse_columns(fields, PRODUCT_FIELDS, PRODUCT_PAGE_KEYS)
+
+
+def _variant_values(fields):
+    """
+    Returns the columns to read for variant rows: VARIANT_VALUES, or just
+    those of a sparse fieldset.
+    """
+    return VARIANT_VALUES if fields is None else sparse_columns(fields, VARIANT_FIELDS, VARIANT_PAGE_KEYS)
+
+
+def _product_list_data(rows, snapshot, fields=None):
+    """
+    Serializes generic products: snapshot instances, PRODUCT_VALUES rows
+    or the rows of a sparse fieldset.
+    """
+    if snapshot is not None:
+        return GenericProductSerializer(rows, many=True).data
+    if fields is not None:
+        product_fields = sparse_data_function(fields, PRODUCT_FIELDS, _product_values(fields))
+        return [product_fields(row) for row in rows]
+    return [product_data(row) for row in rows]
+
+
+def _variant_list_data(rows, snapshot, request, fields=None):
+    """
+    Serializes product variants: snapshot instances, VARIANT_VALUES rows
+    or the rows of a sparse fieldset.
+    """
+    if snapshot is not None:
+        return ProductVariantSerializer(rows, many=True, context={"request": request}).data
+    if fields is None:
+        variant_data = variant_data_function(request)
+    else:
+        variant_data = sparse_data_function(fields, VARIANT_FIELDS, _variant_values(fields), request)
+    return [variant_data(row) for row in rows]
+
+
+def _products_in_order(product_ids):
+    """
+    Serializes generic products for a ranked list of ids, keeping the
+    order and skipping ids that no longer exist.
+    """
+    snapshot = _catalog_snapshot()
+    if snapshot is not None:
+        products = snapshot.products_by_id
+    else:
+        rows = GenericProduct.objects.filter(id__in=product_ids).values_list(*PRODUCT_VALUES, named=True)
+        products = {row.id: row for row in rows}
+    return _product_list_data(
+        [products[product_id] for product_id in product_ids if product_id in products], snapshot
+    )
+
+
+def _best_deal_data(product, best_variant, request):
+    """
+    Builds the best-deal payload of one product.
+    """
+    return {
+        "product": product.name,
+        "amount": product.amount,
+        "unit": product.unit,
+        "best_variant": ProductVariantSerializer(best_variant, context={"request": request}).data
+    }
+
 
 # View 1: Get the best (cheapest) variant for a given generic product
+@catalog_conditional
 @api_view(['GET'])
 def best_deal_by_id(request, product_id):
-    try:
-        product = GenericProduct.objects.get(id=product_id)
-        variants = ProductVariant.objects.filter(generic_product=product)
-
-        if not variants.exists():
+    snapshot = _catalog_snapshot()
+    if snapshot is not None:
+        product = snapshot.products_by_id.get(product_id)
+        best_variant = snapshot.best_variants.get(product_id)
+        if product is None:
+            return Response({"error": "Product not found."}, status=404)
+        if best_variant is None:
             return Response({"error": "No variants found."}, status=404)
+    else:
+        # Served from the denormalized BestPrice table: one indexed row fetch
+        try:
+            best = BestPrice.objects.select_related('generic_product', 'variant__supermarket').get(
+                generic_product_id=product_id
+            )
+        except BestPrice.DoesNotExist:
+            if GenericProduct.objects.filter(id=product_id).exists():
+                return Response({"error": "No variants found."}, status=404)
+            return Response({"error": "Product not found."}, status=404)
+        product, best_variant = best.generic_product, best.variant
 
-        best_variant = get_best_variant(variants)
-        serializer = ProductVariantSerializer(best_variant, context={"request": request})
-
-        return Response({
-            "product": product.name,
-            "amount": product.amount,
-            "unit": product.unit,
-            "best_variant": serializer.data
-        })
-    except GenericProduct.DoesNotExist:
-        return Response({"error": "Product not found."}, status=404)
+    return Response(_best_deal_data(product, best_variant, request))
 
 
 # View 2: List all variants for a specific generic product
+# (paginated, ?ordering=id|price, ?all=true for the full list, ?fields= for some fields only)
+@catalog_conditional
 @api_view(['GET'])
 def all_variants_by_product(request, product_id):
     try:
-        product = GenericProduct.objects.get(id=product_id)
-        variants = ProductVariant.objects.filter(generic_product=product)
+        fields = parse_fields(request, VARIANT_FIELDS)
+    except ValueError as error:
+        return Response({"error": str(error)}, status=400)
 
-        if not variants.exists():
+    try:
+        snapshot = None if fields else _catalog_snapshot()
+        if snapshot is not None:
+            if product_id not in snapshot.products_by_id:
+                raise GenericProduct.DoesNotExist
+            product = snapshot.products_by_id[product_id]
+            variants = snapshot.variants_by_product.get(product_id, ())
+        else:
+            product = GenericProduct.objects.get(id=product_id)
+            variants = ProductVariant.objects.filter(generic_product=product).values_list(
+                *_variant_values(fields), named=True
+            )
+
+        has_variants = bool(variants) if snapshot is not None else variants.exists()
+        if not has_variants:
             return Response({"error": "No variants found for this product."}, status=404)
 
-        serializer = ProductVariantSerializer(variants, many=True, context={"request": request})
+        if wants_all(request):
+            page, next_cursor = variants, None
+        else:
+            ordering = get_ordering(request, allowed=("id", "price"))
+            page, next_cursor = paginate(variants, request, ordering)
 
-        return Response({
+        response = {
             "generic_product": product.name,
             "amount": product.amount,
             "unit": product.unit,
-            "variants": serializer.data
-        })
+            "variants": _variant_list_data(page, snapshot, request, fields)
+        }
+        if not wants_all(request):
+            response["next_cursor"] = next_cursor
+        return Response(response)
     except GenericProduct.DoesNotExist:
         return Response({"error": "Product not found."}, status=404)
+    except InvalidPageRequest as error:
+        return Response({"error": str(error)}, status=400)
 
 
 # View 3: List all product categories
+@catalog_conditional
 @api_view(['GET'])
 def list_categories(request):
-    categories = Category.objects.all()
-    serializer = CategorySerializer(categories, many=True)
-    return Response(serializer.data)
+    def build():
+        snapshot = _catalog_snapshot()
+        categories = snapshot.categories if snapshot is not None else Category.objects.all()
+        return CategorySerializer(categories, many=True).data
 
+    return cached_json_response(request, build)
 
-# View 4: List all generic products in a category
+
+# View 4: List all generic products in a category (paginated, ?all=true for the full list,
+# ?fields= for some fields only)
+@catalog_conditional
 @api_view(['GET'])
 def products_by_category(request, category_id):
     try:
-        category = Category.objects.get(id=category_id)
-        products = GenericProduct.objects.filter(category=category)
-        serializer = GenericProductSerializer(products, many=True)
+        fields = parse_fields(request, PRODUCT_FIELDS)
+    except ValueError as error:
+        return Response({"error": str(error)}, status=400)
 
-        return Response({
+    def build():
+        snapshot = None if fields else _catalog_snapshot()
+        if snapshot is not None:
+            if category_id not in snapshot.categories_by_id:
+                raise Category.DoesNotExist
+            category = snapshot.categories_by_id[category_id]
+            products = snapshot.products_by_category.get(category_id, ())
+        else:
+            category = Category.objects.get(id=category_id)
+            products = GenericProduct.objects.filter(category=category).values_list(*_product_values(fields), named=True)
+
+        if wants_all(request):
+            page, next_cursor = products, None
+        else:
+            page, next_cursor = paginate(products, request)
+
+        response = {
             "category": category.name,
-            "products": serializer.data
-        })
+            "products": _product_list_data(page, snapshot, fields)
+        }
+        if not wants_all(request):
+            response["next_cursor"] = next_cursor
+        return response
+
+    try:
+        return cached_json_response(request, build)
     except Category.DoesNotExist:
         return Response({"error": "Category not found"}, status=404)
+    except InvalidPageRequest as error:
+        return Response({"error": str(error)}, status=400)
 
 
-# View 5: List all generic products
+# View 5: List all generic products (paginated, ?all=true for the full list,
+# ?stream=true for the full list written incrementally)
+# Filters: ?category=, ?supermarket=, ?min_price=, ?max_price=, ?unit=;
+# ?facets=true adds facet counts (see products/facets.py); ?fields= for some fields only
+@catalog_conditional
 @api_view(['GET'])
 def list_all_products(request):
-    products = GenericProduct.objects.select_related('category').all()
-    serializer = GenericProductSerializer(products, many=True)
-    return Response(serializer.data)
+    try:
+        filters = parse_filters(request.GET)
+        fields = parse_fields(request, PRODUCT_FIELDS)
+    except ValueError as error:
+        return Response({"error": str(error)}, status=400)
+
+    def all_products():
+        # The snapshot is not indexed for filtering; filtered lists come from the database
+        snapshot = None if has_filters(filters) or fields else _catalog_snapshot()
+        if snapshot is not None:
+            return snapshot, snapshot.products
+        products = filter_products(GenericProduct.objects.order_by('id'), filters)
+        return None, products.values_list(*_product_values(fields), named=True)
 
+    if wants_stream(request):
+        snapshot, products = all_products()
+        return streaming_json_list(products, lambda chunk: _product_list_data(chunk, snapshot, fields))
 
-# View 6: Search products by name
+    def build():
+        snapshot, products = all_products()
+        if wants_all(request):
+            results = _product_list_data(products, snapshot, fields)
+            return {"results": results, "facets": facet_counts(filters)} if wants_facets(request) else results
+        page, next_cursor = paginate(products, request)
+        response = {"results": _product_list_data(page, snapshot, fields), "next_cursor": next_cursor}
+        if wants_facets(request):
+            response["facets"] = facet_counts(filters)
+        return response
+
+    try:
+        return cached_json_response(request, build)
+    except InvalidPageRequest as error:
+        return Response({"error": str(error)}, status=400)
+
+
+# View 6: Search products by name (and by the names of their variants)
+# Takes the same filters and ?facets=true as View 5
+@catalog_conditional
 @api_view(['GET'])
 def search_products(request):
     query = request.GET.get('q', '').strip()
 
     if not query:
         return Response({"error": "Search query cannot be empty."}, status=400)
+    try:
+        filters = parse_filters(request.GET)
+    except ValueError as error:
+        return Response({"error": str(error)}, status=400)
+
+    # Ranked ids come from the in-process index; one query (or the snapshot) loads the rows
+    matches = search_index.search(query)
+    product_ids = matches
+    if has_filters(filters):
+        allowed = set(filter_products(GenericProduct.objects.filter(id__in=matches), filters).values_list('id', flat=True))
+        product_ids = [product_id for product_id in matches if product_id in allowed]
+
+    results = _products_in_order(product_ids)
+    if wants_facets(request):
+        return Response({"results": results, "facets": facet_counts(filters, product_ids=matches)})
+    return Response(results)
+
+
+# View 7: Typo-tolerant search ("rohlk" -> Rohlik, "okruka" -> Okurka)
+@catalog_conditional
+@api_view(['GET'])
+def fuzzy_search_products(request):
+    query = request.GET.get('q', '').strip()
+
+    if not query:
+        return Response({"error": "Search query cannot be empty."}, status=400)
+
+    try:
+        limit = min(max(int(request.GET.get('limit', FUZZY_SEARCH_DEFAULT_LIMIT)), 1), FUZZY_SEARCH_MAX_LIMIT)
+    except ValueError:
+        return Response({"error": "Limit must be a number."}, status=400)
+
+    return Response(_products_in_order(search_index.fuzzy_search(query, limit=limit)))
+
+
+# View 8: Typeahead completions for the search box
+@catalog_conditional
+@api_view(['GET'])
+def autocomplete_products(request):
+    prefix = request.GET.get('q', '')
+
+    try:
+        limit = min(max(int(request.GET.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT)), 1), AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        return Response({"error": "Limit must be a number."}, status=400)
+
+    # An empty box simply has no suggestions (not an error while typing)
+    return Response(autocomplete.complete(prefix, limit=limit))
+
+
+# View 9: Bulk price feed upload for one supermarket (admins only)
+# Body is CSV (text/csv) or NDJSON (application/x-ndjson), see products/ingestion.py
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def ingest_prices(request, supermarket_id):
+    content_type = request.content_type.split(";")[0].strip().lower()
+    feed_format = FEED_CONTENT_TYPES.get(content_type)
+    if feed_format is None:
+        return Response(
+            {"error": f"Unsupported content type. Use one of: {', '.join(FEED_CONTENT_TYPES)}."}, status=415
+        )
+
+    try:
+        supermarket = Supermarket.objects.get(id=supermarket_id)
+    except Supermarket.DoesNotExist:
+        return Response({"error": "Supermarket not found."}, status=404)
+
+    # Spool the upload to disk first: the feed is applied in one transaction,
+    # which must not stay open while a slow client is still sending rows
+    with tempfile.TemporaryFile() as spool:
+        stream = request.stream  # None for an empty body
+        if stream is not None:
+            shutil.copyfileobj(stream, spool)
+        spool.seek(0)
+        lines = codecs.iterdecode(iter(spool.readline, b""), "utf-8-sig")
+        try:
+            report = ingest_price_feed(supermarket, parse_feed(lines, feed_format))
+        except (FeedError, UnicodeDecodeError) as error:
+            return Response({"error": str(error)}, status=400)
+
+    return Response(report.as_dict())
+
+
+# View 10: Daily price history of one variant (?from=&to=, ISO dates)
+@api_view(['GET'])
+def variant_price_history(request, variant_id):
+    try:
+        variant = ProductVariant.objects.select_related('supermarket').get(id=variant_id)
+        start, end = parse_time_range(request.GET)
+    except ProductVariant.DoesNotExist:
+        return Response({"error": "Variant not found."}, status=404)
+    except ValueError as error:
+        return Response({"error": str(error)}, status=400)
+
+    series = daily_price_series(start, end, variant_id=variant.id)
+
+    return Response({
+        "variant_name": variant.name,
+        "supermarket": variant.supermarket.name,
+        "from": start,
+        "to": end,
+        "points": series[0]["points"] if series else []
+    })
+
+
+# View 11: Daily price history of a generic product, one series per supermarket
+@api_view(['GET'])
+def product_price_history(request, product_id):
+    try:
+        product = GenericProduct.objects.get(id=product_id)
+        start, end = parse_time_range(request.GET)
+    except GenericProduct.DoesNotExist:
+        return Response({"error": "Product not found."}, status=404)
+    except ValueError as error:
+        return Response({"error": str(error)}, status=400)
+
+    return Response({
+        "generic_product": product.name,
+        "from": start,
+        "to": end,
+        "series": daily_price_series(start, end, generic_product_id=product.id)
+    })
+
+
+# View 12: Cheapest offers of a category per kg, litre or piece (?unit=kg|L|pcs)
+@catalog_conditional
+@api_view(['GET'])
+def cheapest_per_unit(request, category_id):
+    base_unit = request.GET.get('unit', KILOGRAM)
+    if base_unit not in dict(BASE_UNIT_CHOICES):
+        return Response({"error": f"Unit must be one of: {', '.join(dict(BASE_UNIT_CHOICES))}."}, status=400)
+
+    try:
+        limit = min(max(int(request.GET.get('limit', CHEAPEST_PER_UNIT_DEFAULT_LIMIT)), 1), CHEAPEST_PER_UNIT_MAX_LIMIT)
+    except ValueError:
+        return Response({"error": "Limit must be a number."}, status=400)
+
+    try:
+        category = Category.objects.get(id=category_id)
+    except Category.DoesNotExist:
+        return Response({"error": "Category not found"}, status=404)
+
+    # One range scan of the (category, base_unit, unit_price) index
+    variants = (
+        ProductVariant.objects
+        .filter(category_id=category_id, base_unit=base_unit)
+        .select_related('supermarket', 'generic_product')
+        .order_by('unit_price', 'id')[:limit]
+    )
+
+    serializer = ProductVariantSerializer(variants, many=True, context={"request": request})
+
+    return Response({
+        "category": category.name,
+        "unit": base_unit,
+        "variants": [
+            {"generic_product": variant.generic_product.name, **data}
+            for variant, data in zip(variants, serializer.data)
+        ]
+    })
+
+
+# View 13: Best deals of many products at once: {"ids": [...]} -> {"best_deals": {id: deal or null}}
+# Products that do not exist or have no variants map to null.
+@api_view(['POST'])
+def best_deals_by_ids(request):
+    serializer = BestDealsRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+    product_ids = list(dict.fromkeys(serializer.validated_data["ids"]))  # Unique, in request order
+
+    snapshot = _catalog_snapshot()
+    if snapshot is not None:
+        found = {
+            product_id: (snapshot.products_by_id[product_id], snapshot.best_variants[product_id])
+            for product_id in product_ids
+            if product_id in snapshot.best_variants
+        }
+    else:
+        # One query against the BestPrice table for the whole batch
+        found = {
+            best.generic_product_id: (best.generic_product, best.variant)
+            for best in BestPrice.objects.filter(generic_product_id__in=product_ids).select_related(
+                'generic_product', 'variant__supermarket'
+            )
+        }
+
+    return Response({
+        "best_deals": {
+            product_id: _best_deal_data(*found[product_id], request) if product_id in found else None
+            for product_id in product_ids
+        }
+    })
+
+
+# View 14: Product x supermarket comparison matrix of a category (?category=<id>)
+# or of a list of products (?ids=1,2,3). Each row is a generic product with one
+# cell per supermarket: {"min_price", "variants"}, or null if it is not sold there.
+@catalog_conditional
+@api_view(['GET'])
+def price_comparison(request):
+    products = GenericProduct.objects.all()
+    category_id = request.GET.get('category')
+    ids = request.GET.get('ids')
+    try:
+        if category_id is not None:
+            category = Category.objects.get(id=int(category_id))
+            products = products.filter(category_id=category.id).order_by('id')
+            variant_filters = {"category_id": category.id}
+        elif ids is not None:
+            product_ids = list(dict.fromkeys(int(product_id) for product_id in ids.split(',') if product_id.strip()))
+            if not product_ids or len(product_ids) > PRICE_MATRIX_MAX_IDS:
+                return Response({"error": f"Give between 1 and {PRICE_MATRIX_MAX_IDS} product ids."}, status=400)
+            products = products.filter(id__in=product_ids)
+            variant_filters = {"generic_product_id__in": product_ids}
+        else:
+            return Response({"error": "Give a category or a list of product ids."}, status=400)
+    except ValueError:
+        return Response({"error": "Category and product ids must be numbers."}, status=400)
+    except Category.DoesNotExist:
+        return Response({"error": "Category not found"}, status=404)
+
+    rows = list(products.values_list(*PRODUCT_VALUES, named=True))
+    if ids is not None:
+        position = {product_id: index for index, product_id in enumerate(product_ids)}
+        rows.sort(key=lambda row: position[row.id])  # Keep the requested order
+
+    supermarkets, cells = price_comparison_matrix([row.id for row in rows], **variant_filters)
+
+    return Response({
+        "supermarkets": [{"id": supermarket_id, "name": name} for supermarket_id, name in supermarkets],
+        "products": [
+            {
+                **product_data(row),
+                "cells": [
+                    {"min_price": decimal_string(cell[0]), "variants": cell[1]} if cell else None
+                    for cell in cells[row.id]
+                ]
+            }
+            for row in rows
+        ]
+    })
+
+
+# View 15: Delta sync: variants created, updated or deleted since ?since=<ISO datetime>
+# Answers 410 Gone when the client must download the full catalog instead.
+@api_view(['GET'])
+def variant_changes_since(request):
+    try:
+        since = parse_since(request.GET.get('since'))
+        changes = variant_changes(since, request)
+    except ValueError as error:
+        return Response({"error": str(error)}, status=400)
+    except FullSyncRequired as error:
+        return Response({"error": str(error), "full_sync_required": True}, status=410)
+
+    return Response({
+        "since": since,
+        "catalog_version": get_catalog_version(),
+        **changes
+    })
+
+
+# View 16: Whole catalog as one compact columnar file (see products/columnar.py)
+@catalog_conditional
+@api_view(['GET'])
+def export_catalog_file(request):
+    # Exported once per catalog version and streamed from disk
+    exported = columnar.open_exported_catalog(settings.CATALOG_EXPORT_DIR)
+
+    return FileResponse(
+        exported,
+        as_attachment=True,
+        filename=os.path.basename(exported.name),
+        content_type=columnar.CONTENT_TYPE,
+    )
+
+
+# View 17: Variants of a generic product grouped into same items across supermarkets
+# (see products/matching.py), cheapest group first
+@catalog_conditional
+@api_view(['GET'])
+def matched_variants(request, product_id):
+    try:
+        product = GenericProduct.objects.get(id=product_id)
+    except GenericProduct.DoesNotExist:
+        return Response({"error": "Product not found."}, status=404)
+
+    rows = (
+        ProductVariant.objects
+        .filter(generic_product_id=product_id)
+        .order_by('match_group', 'price', 'id')
+        .values_list('match_group', *VARIANT_VALUES, named=True)
+    )
+    variant_data = variant_data_function(request)
+    groups = {}
+    for row in rows:
+        # Variants not grouped yet (before `rebuild_match_groups` ran) stand alone
+        groups.setdefault(row.match_group or row.id, []).append(variant_data(row[1:]))
+
+    return Response({
+        "generic_product": product.name,
+        "groups": sorted(
+            (
+                {"match_group": match_group, "min_price": variants[0]["price"], "variants": variants}
+                for match_group, variants in groups.items()
+            ),
+            key=lambda group: (Decimal(group["min_price"]), group["match_group"])
+        )
+    })
+
+
+# View 18: Cheapest variants of every category, "deals by aisle"
+# (?limit=N per category, ?per_supermarket=true for N per category and supermarket,
+# ?category=<id> for one category)
+@catalog_conditional
+@api_view(['GET'])
+def deals_by_category(request):
+    try:
+        limit = min(max(int(request.GET.get('limit', DEALS_PER_CATEGORY_DEFAULT_LIMIT)), 1), DEALS_PER_CATEGORY_MAX_LIMIT)
+        category_id = int(request.GET['category']) if request.GET.get('category') else None
+    except ValueError:
+        return Response({"error": "Limit and category must be numbers."}, status=400)
+    per_supermarket = request.GET.get('per_supermarket', '').lower() in ('1', 'true', 'yes')
+
+    rows = cheapest_variants_by_category(
+        limit, per_supermarket, category_id, values=('generic_product_id', 'generic_product__name', *VARIANT_VALUES)
+    )
+    # The VARIANT_VALUES columns come last, whatever the service puts before them
+    variant_columns = slice(-len(VARIANT_VALUES), None)
+    variant_data = variant_data_function(request)
+    categories = {}
+    for row in rows:
+        category = categories.setdefault(row.category_id, {"id": row.category_id, "name": row.category__name, "variants": []})
+        category["variants"].append({
+            "generic_product_id": row.generic_product_id,
+            "generic_product": row.generic_product__name,
+            **variant_data(row[variant_columns])
+        })
 
-    results = GenericProduct.objects.filter(name__icontains=query)
-    serializer = GenericProductSerializer(results, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    return Response({"categories": list(categories.values())})
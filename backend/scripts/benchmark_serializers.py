@@ -0,0 +1,101 @@
+"""
+Compares the DRF serializers with the values()-based fast path
+(products/fast_serializers.py) on large product and variant lists.
+
+Usage (from backend/):
+    python scripts/benchmark_serializers.py [--rows 10000] [--repeat 5]
+
+Creates the rows inside a transaction that is rolled back at the end, so
+the database is left unchanged.
+"""
+
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from products.fast_serializers import PRODUCT_VALUES, VARIANT_VALUES, product_data, variant_data_function
+from products.models import Category, GenericProduct, ProductVariant, Supermarket
+from products.serializers import GenericProductSerializer, ProductVariantSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+def best_time(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    request = APIRequestFactory().get("/api/products/all-products/")
+
+    try:
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=["testserver"]):
+            category = Category.objects.create(name="Benchmark")
+            supermarket = Supermarket.objects.create(name="Benchmark")
+            products = GenericProduct.objects.bulk_create(
+                GenericProduct(name=f"Product {i}", amount=Decimal("0.5"), unit="kg", category=category)
+                for i in range(args.rows)
+            )
+            ProductVariant.objects.bulk_create(
+                ProductVariant(
+                    generic_product=products[0], supermarket=supermarket, name=f"Variant {i}",
+                    price=Decimal(i % 5000) / 100, unit_price=Decimal(i % 5000) / 50, base_unit="kg",
+                    category=category, image=f"product_images/{i}.jpg" if i % 2 else "",
+                )
+                for i in range(args.rows)
+            )
+
+            product_rows = GenericProduct.objects.filter(category=category)
+            variant_rows = ProductVariant.objects.filter(generic_product=products[0])
+
+            cases = [
+                (
+                    "products",
+                    lambda: GenericProductSerializer(product_rows.select_related("category"), many=True).data,
+                    lambda: [product_data(row) for row in product_rows.values_list(*PRODUCT_VALUES, named=True)],
+                ),
+                (
+                    "variants",
+                    lambda: ProductVariantSerializer(
+                        variant_rows.select_related("supermarket"), many=True, context={"request": request}
+                    ).data,
+                    lambda: list(map(variant_data_function(request), variant_rows.values_list(*VARIANT_VALUES, named=True))),
+                ),
+            ]
+            print(f"{args.rows} rows, best of {args.repeat}")
+            for name, drf, fast in cases:
+                drf_time = best_time(drf, args.repeat)
+                fast_time = best_time(fast, args.repeat)
+                print(f"{name:9} DRF {drf_time * 1000:8.1f} ms   fast {fast_time * 1000:8.1f} ms   {drf_time / fast_time:5.1f}x")
+
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == "__main__":
+    main()
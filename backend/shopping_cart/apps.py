@@ -5,5 +5,9 @@ class ShoppingCartConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shopping_cart'
 
+    def ready(self):
+        # Keeps the in-memory price matrix current on catalog changes
+        from shopping_cart import signals  # noqa: F401
+
 
 #defines how Django initializes the shopping_cart app        
@@ -0,0 +1,208 @@
+"""
+Process-local price matrix used by the basket calculation.
+
+Holds the cheapest variant price of every GenericProduct in every
+supermarket as a flat `array('q')` of integer haléře (1 Kč = 100 haléřů),
+one row per product and one column per supermarket. A basket total is then
+a sparse dot product of the basket quantities against the matrix rows, so
+pricing a basket needs no database access at all.
+
+The matrix is built lazily on first use and tagged with the shared
+catalog version (`products.versioning`) it is current at. The signal
+handlers in `shopping_cart.signals` patch single rows when a variant or
+product changes in this process, moving the matrix to the version that
+write produced, and drop the whole matrix when supermarkets change.
+Writes from other processes (other workers, `import_prices`,
+`scrape_prices`, `import_catalog`) only bump the catalog version, so
+every read first compares it and rebuilds when another write moved it.
+Every build or patch increments `version`.
+"""
+
+import threading
+from array import array
+
+from django.db.models import Min
+from products.models import GenericProduct, ProductVariant
+from products.services import to_halere
+from products.versioning import get_catalog_version
+
+MISSING = -1  # Cell value for "no variant of this product in this supermarket"
+
+
+class PriceMatrix:
+    """
+    Cheapest price per (GenericProduct, Supermarket) pair in integer haléře.
+
+    Attributes:
+    - version: Incremented on every full build and every row patch.
+    - catalog_version: Shared catalog version the matrix is current at.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self.version = 0
+        self.catalog_version = None
+        self._rows = {}        # product_id -> row index
+        self._columns = []     # supermarket names, one per column
+        self._prices = array('q')
+
+    # ------------------------------------------------------------------
+    # Building and patching
+    # ------------------------------------------------------------------
+
+    def invalidate(self):
+        """
+        Drops the matrix; it is rebuilt from the database on next use.
+        """
+        with self._lock:
+            self._built = False
+            self._rows = {}
+            self._columns = []
+            self._prices = array('q')
+
+    def _build(self):
+        # Read the version before the data, as the catalog snapshot does: a
+        # concurrent write can only make the matrix newer than its label
+        catalog_version = get_catalog_version()
+        product_ids = list(GenericProduct.objects.values_list("id", flat=True))
+        cheapest = list(
+            ProductVariant.objects
+            .values("generic_product_id", "supermarket__name")
+            .annotate(min_price=Min("price"))
+        )
+
+        columns = sorted({row["supermarket__name"] for row in cheapest})
+        column_index = {name: i for i, name in enumerate(columns)}
+        rows = {product_id: i for i, product_id in enumerate(product_ids)}
+
+        prices = array('q', [MISSING]) * (len(rows) * len(columns))
+        for row in cheapest:
+            cell = rows[row["generic_product_id"]] * len(columns) + column_index[row["supermarket__name"]]
+            prices[cell] = to_halere(row["min_price"])
+
+        self._rows = rows
+        self._columns = columns
+        self._prices = prices
+        self._built = True
+        self.catalog_version = catalog_version
+        self.version += 1
+
+    def _ensure_current(self):
+        if not self._built or self.catalog_version != get_catalog_version():
+            self._build()
+
+    def refresh_products(self, product_ids, version=None):
+        """
+        Re-reads the rows of the given products from the database.
+
+        New products get a fresh row, deleted products lose theirs. If a
+        product turns out to be sold in a supermarket the matrix has no
+        column for, the whole matrix is rebuilt instead.
+
+        `version` is the catalog version the write produced. If the matrix
+        was exactly one version behind it, this write was the only change
+        and the matrix is current at `version`; otherwise the next read
+        rebuilds it.
+        """
+        product_ids = set(product_ids)
+        with self._lock:
+            if not self._built:
+                return  # Nothing cached yet; the next build picks it up
+            if product_ids:
+                self._patch_rows(product_ids)
+            if version is not None and self.catalog_version == version - 1:
+                self.catalog_version = version
+
+    def _patch_rows(self, product_ids):
+        # Called with the lock held
+        existing_ids = set(GenericProduct.objects.filter(id__in=product_ids).values_list("id", flat=True))
+        cheapest = list(
+            ProductVariant.objects
+            .filter(generic_product_id__in=existing_ids)
+            .values("generic_product_id", "supermarket__name")
+            .annotate(min_price=Min("price"))
+        )
+
+        column_index = {name: i for i, name in enumerate(self._columns)}
+        if any(row["supermarket__name"] not in column_index for row in cheapest):
+            self._build()
+            return
+
+        width = len(self._columns)
+        for product_id in product_ids:
+            if product_id not in existing_ids:
+                self._rows.pop(product_id, None)  # Row stays allocated until the next build
+                continue
+            if product_id not in self._rows:
+                self._rows[product_id] = len(self._prices) // width if width else len(self._rows)
+                self._prices.extend([MISSING] * width)
+            start = self._rows[product_id] * width
+            for offset in range(width):
+                self._prices[start + offset] = MISSING
+
+        for row in cheapest:
+            cell = self._rows[row["generic_product_id"]] * width + column_index[row["supermarket__name"]]
+            self._prices[cell] = to_halere(row["min_price"])
+
+        self.version += 1
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def cheapest_prices(self, product_id):
+        """
+        Returns {supermarket_name: price_in_halere} for one product, or None
+        if the product does not exist.
+        """
+        with self._lock:
+            self._ensure_current()
+            if product_id not in self._rows:
+                return None
+            width = len(self._columns)
+            start = self._rows[product_id] * width
+            return {
+                self._columns[offset]: self._prices[start + offset]
+                for offset in range(width)
+                if self._prices[start + offset] != MISSING
+            }
+
+    def basket_totals(self, quantities):
+        """
+        Multiplies the basket quantities against the matrix.
+
+        Args:
+            quantities (dict): {product_id: quantity}
+
+        Returns:
+            tuple:
+                - {supermarket_name: total_in_halere} for every supermarket
+                  selling at least one basket product.
+                - The first product id (in basket order) that does not exist,
+                  or None if all of them do.
+        """
+        with self._lock:
+            self._ensure_current()
+            rows = self._rows
+            for product_id in quantities:
+                if product_id not in rows:
+                    return {}, product_id
+
+            width = len(self._columns)
+            prices = self._prices
+            totals = [0] * width
+            priced = [False] * width
+            for product_id, quantity in quantities.items():
+                start = rows[product_id] * width
+                for offset in range(width):
+                    price = prices[start + offset]
+                    if price != MISSING:
+                        totals[offset] += price * quantity
+                        priced[offset] = True
+
+            return {self._columns[i]: totals[i] for i in range(width) if priced[i]}, None
+
+
+# Shared instance used by the basket service and kept current by signals
+price_matrix = PriceMatrix()
@@ -7,7 +7,12 @@ class BasketItemSerializer(serializers.Serializer):
 class BasketSerializer(serializers.Serializer):
     basket = BasketItemSerializer(many=True)
 
+    # Optional split-basket optimizer ("split" mode)
+    mode = serializers.ChoiceField(choices=["single", "split"], default="single")
+    max_stores = serializers.IntegerField(min_value=1, max_value=10, default=2)
+    store_penalty = serializers.DecimalField(max_digits=6, decimal_places=2, min_value=0, default=0)
+
     def validate_basket(self, value):
         if not value:
             raise serializers.ValidationError("Basket cannot be empty.")
-        return value
\ No newline at end of file
+        return value
@@ -1,11 +1,18 @@
+import time
 from decimal import Decimal
-from products.models import GenericProduct, ProductVariant
+
+from products.services import from_halere, to_halere
+from shopping_cart.price_matrix import price_matrix
 
 def calculate_total_per_supermarket(basket):
     """
     Calculates the total cost of a basket per supermarket, using the cheapest
     available variant of each product.
 
+    Prices come from the in-memory price matrix (see `price_matrix.py`),
+    so the calculation is a sparse dot product of the basket quantities
+    against the matrix and does not touch the database once it is built.
+
     Args:
         basket (list): A list of dictionaries in the form:
             [{"product_id": 1, "quantity": 2}, {"product_id": 4, "quantity": 1}, ...]
@@ -19,39 +26,178 @@ def calculate_total_per_supermarket(basket):
         If a product in the basket is missing, returns:
             ({"error": str}, None)
     """
-    supermarket_totals = {}
+    # Merge repeated lines so every product is priced once
+    quantities = {}
+    for item in basket:
+        product_id = item.get("product_id")
+        quantities[product_id] = quantities.get(product_id, 0) + item.get("quantity", 1)
+
+    # Validate product existence and add the price for each product
+    # (x quantity) to each supermarket total. Products without offers in a
+    # supermarket are simply skipped there.
+    supermarket_totals, missing_id = price_matrix.basket_totals(quantities)
+    if missing_id is not None:
+        return {"error": f"Product with ID {missing_id} not found."}, None
+
+    # Format results: list of totals per supermarket
+    results = [
+        {"supermarket": market, "total": from_halere(total)}
+        for market, total in supermarket_totals.items()
+    ]
+    cheapest = min(results, key=lambda x: x["total"]) if results else None
+
+    return results, cheapest
+
+
+# Wall-clock budget for the split-basket search, in seconds. When it runs
+# out, the best assignment found so far is returned (marked incomplete).
+SPLIT_BASKET_TIME_BUDGET = 0.05
+
+
+def optimize_split_basket(basket, max_stores=2, store_penalty=Decimal("0"), time_budget=SPLIT_BASKET_TIME_BUDGET):
+    """
+    Finds the cheapest way to buy a basket across at most `max_stores`
+    supermarkets, buying each product where it is cheapest among the
+    chosen ones.
+
+    Uses the same per-supermarket cheapest prices as
+    `calculate_total_per_supermarket` and a branch-and-bound search over
+    the subsets of supermarkets: a subset is pruned as soon as the best
+    price any extension could reach, plus the penalty already paid, is no
+    better than the best assignment found so far.
+
+    Args:
+        basket (list): Basket lines, same format as `calculate_total_per_supermarket`.
+        max_stores (int): Maximum number of supermarkets to visit.
+        store_penalty (Decimal): Cost added for every supermarket beyond the first.
+        time_budget (float): Seconds the search may take.
 
+    Returns:
+        dict:
+            {
+                "stores": [{"supermarket": "Albert", "items": [...], "subtotal": 42.80}, ...],
+                "items_total": 54.70,   # Sum of the item prices
+                "penalty": 10.00,       # store_penalty x extra supermarkets
+                "total": 64.70,
+                "unavailable": [7],     # Products with no offers anywhere
+                "complete": True,       # False if the time budget ran out
+            }
+            "stores" is empty if no combination of `max_stores`
+            supermarkets sells every available product.
+
+        If a product in the basket is missing, returns:
+            {"error": str}
+    """
+    deadline = time.monotonic() + time_budget
+    penalty = to_halere(store_penalty)
+
+    quantities = {}
     for item in basket:
         product_id = item.get("product_id")
-        quantity = item.get("quantity", 1)
+        quantities[product_id] = quantities.get(product_id, 0) + item.get("quantity", 1)
 
-        # Validate product existence
-        try:
-            product = GenericProduct.objects.get(id=product_id)
-        except GenericProduct.DoesNotExist:
-            return {"error": f"Product with ID {product_id} not found."}, None
+    # Line cost (price x quantity, in haléře) of each product in each supermarket
+    line_costs = {}
+    unavailable = []
+    for product_id, quantity in quantities.items():
+        prices = price_matrix.cheapest_prices(product_id)
+        if prices is None:
+            return {"error": f"Product with ID {product_id} not found."}
+        if not prices:
+            unavailable.append(product_id)
+            continue
+        line_costs[product_id] = {market: price * quantity for market, price in prices.items()}
 
-        # Get all available variants for the product
-        variants = ProductVariant.objects.filter(generic_product=product)
-        if not variants.exists():
-            continue  # Skip if no offers available
+    products = list(line_costs)
+    markets = sorted({market for costs in line_costs.values() for market in costs})
+    infinity = float("inf")
 
-        # Find the cheapest variant per supermarket
-        cheapest_by_market = {}
-        for variant in variants:
-            market = variant.supermarket.name  # ✅ FIXED here
-            price = Decimal(variant.price)
+    # Cost table: costs[i][j] = line cost of product i in market j (inf if not sold)
+    costs = [[line_costs[product_id].get(market, infinity) for market in markets] for product_id in products]
+    # suffix_best[j][i] = cheapest line cost of product i in markets j, j+1, ...
+    suffix_best = [[infinity] * len(products) for _ in range(len(markets) + 1)]
+    for j in range(len(markets) - 1, -1, -1):
+        suffix_best[j] = [min(costs[i][j], suffix_best[j + 1][i]) for i in range(len(products))]
 
-            if market not in cheapest_by_market or price < cheapest_by_market[market].price:
-                cheapest_by_market[market] = variant
+    # Seed the search with a valid assignment, so one cut short by the time
+    # budget still answers a priced basket: the cheapest supermarket selling
+    # everything, else supermarkets added greedily (most products, then cheapest)
+    best = {"cost": infinity, "stores": ()}
+    chosen, current = [], [infinity] * len(products)
+    while products and infinity in current and len(chosen) < max_stores:
+        def merged(j):
+            return [min(current[i], costs[i][j]) for i in range(len(products))]
 
-        # Add the price for this product (x quantity) to each supermarket total
-        for market, variant in cheapest_by_market.items():
-            price = Decimal(variant.price) * Decimal(quantity)
-            supermarket_totals[market] = supermarket_totals.get(market, Decimal("0.0")) + price
+        def rank(j):
+            row = merged(j)
+            return row.count(infinity), sum(cost for cost in row if cost != infinity)
 
-    # Format results: list of totals per supermarket
-    results = [{"supermarket": market, "total": round(total, 2)} for market, total in supermarket_totals.items()]
-    cheapest = min(results, key=lambda x: x["total"]) if results else None
+        j = min((j for j in range(len(markets)) if j not in chosen), key=rank)
+        chosen.append(j)
+        current = merged(j)
+    if products and infinity not in current:
+        best["cost"], best["stores"] = sum(current) + penalty * (len(chosen) - 1), tuple(sorted(chosen))
+
+    complete = True
+
+    def search(start, chosen, current):
+        # current[i] = cheapest line cost of product i within the chosen markets
+        nonlocal complete
+        if time.monotonic() > deadline:
+            complete = False
+            return
+
+        if chosen:
+            cost = sum(current) + penalty * (len(chosen) - 1)
+            if cost < best["cost"] or (cost == best["cost"] and len(chosen) < len(best["stores"])):
+                best["cost"], best["stores"] = cost, tuple(chosen)
+
+        if len(chosen) == max_stores:
+            return
+
+        for j in range(start, len(markets)):
+            # Lower bound for every subset extending `chosen` with markets j, j+1, ...
+            bound = sum(min(current[i], suffix_best[j][i]) for i in range(len(products)))
+            bound += penalty * len(chosen)
+            if bound == infinity or (best["stores"] and bound >= best["cost"]):
+                break  # Later j only have fewer markets to pick from
+
+            search(j + 1, chosen + [j], [min(current[i], costs[i][j]) for i in range(len(products))])
+            if not complete:
+                return
+
+    if products:
+        search(0, [], [infinity] * len(products))
+
+    stores = []
+    items_total = 0
+    if best["stores"]:
+        assigned = {j: [] for j in best["stores"]}
+        for i, product_id in enumerate(products):
+            j = min(best["stores"], key=lambda j: costs[i][j])
+            assigned[j].append(i)
+
+        for j, product_indexes in assigned.items():
+            if not product_indexes:
+                continue  # Never worth visiting a store that supplies nothing
+            items = [
+                {
+                    "product_id": products[i],
+                    "quantity": quantities[products[i]],
+                    "subtotal": from_halere(costs[i][j]),
+                }
+                for i in product_indexes
+            ]
+            subtotal = sum(costs[i][j] for i in product_indexes)
+            items_total += subtotal
+            stores.append({"supermarket": markets[j], "items": items, "subtotal": from_halere(subtotal)})
 
-    return results, cheapest
\ No newline at end of file
+    extra_penalty = penalty * max(len(stores) - 1, 0)
+    return {
+        "stores": stores,
+        "items_total": from_halere(items_total),
+        "penalty": from_halere(extra_penalty),
+        "total": from_halere(items_total + extra_penalty),
+        "unavailable": unavailable,
+        "complete": complete,
+    }
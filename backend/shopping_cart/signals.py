@@ -0,0 +1,23 @@
+"""
+Signal handlers that keep the basket price matrix in line with the catalog.
+
+They listen to `products.signals.catalog_changed`, which is sent after a
+catalog write committed, so the matrix never picks up prices from a
+transaction that is later rolled back, and learns the catalog version
+the write produced.
+"""
+
+from django.dispatch import receiver
+
+from products.models import Supermarket
+from products.signals import catalog_changed
+from shopping_cart.price_matrix import price_matrix
+
+
+@receiver(catalog_changed)
+def refresh_price_matrix(sender, product_ids, version, **kwargs):
+    if sender is Supermarket:
+        # Columns are keyed by supermarket name, so any change means a rebuild
+        price_matrix.invalidate()
+    else:
+        price_matrix.refresh_products(product_ids, version)
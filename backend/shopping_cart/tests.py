@@ -1,3 +1,264 @@
+import random
+from decimal import Decimal
+from itertools import combinations
+
 from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+
+from products.models import Category, GenericProduct, ProductVariant, Supermarket
+from products.versioning import bump_catalog_version
+from shopping_cart.price_matrix import price_matrix
+from shopping_cart.services import calculate_total_per_supermarket, optimize_split_basket
+from shopping_cart.views import calculate_basket
+
+
+class BasketTestData(TestCase):
+    """
+    Small catalog shared by the basket tests: three supermarkets and a
+    handful of products with several variants each.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tesco = Supermarket.objects.create(name="Tesco")
+        cls.billa = Supermarket.objects.create(name="Billa")
+        cls.albert = Supermarket.objects.create(name="Albert")
+        dairy = Category.objects.create(name="Dairy")
+
+        cls.milk = GenericProduct.objects.create(name="Whole milk", amount=1, unit="L", category=dairy)
+        cls.butter = GenericProduct.objects.create(name="Butter", amount=250, unit="g", category=dairy)
+        cls.cream = GenericProduct.objects.create(name="Cream", amount=200, unit="ml", category=dairy)
+
+        for product, market, name, price in [
+            (cls.milk, cls.tesco, "Tesco Mléko", "24.90"),
+            (cls.milk, cls.tesco, "Olma Mléko", "41.90"),
+            (cls.milk, cls.billa, "Madeta Mléko", "18.90"),
+            (cls.milk, cls.albert, "Albert Mléko", "23.90"),
+            (cls.butter, cls.tesco, "Tesco Máslo", "59.90"),
+            (cls.butter, cls.billa, "Milkpol máslo", "59.90"),
+            (cls.butter, cls.albert, "Milkpol Máslo", "39.90"),
+            (cls.butter, cls.albert, "President Máslo", "99.90"),
+        ]:
+            ProductVariant.objects.create(
+                generic_product=product, supermarket=market, name=name, price=Decimal(price)
+            )
+
+    def setUp(self):
+        # The matrix is process-wide; never let it leak between tests
+        price_matrix.invalidate()
+
+
+class TestCalculateTotalPerSupermarket(BasketTestData):
+    def test_totals_use_cheapest_variant_per_supermarket(self):
+        results, cheapest = calculate_total_per_supermarket([
+            {"product_id": self.milk.id, "quantity": 2},
+            {"product_id": self.butter.id, "quantity": 1},
+        ])
+
+        totals = {row["supermarket"]: row["total"] for row in results}
+        self.assertEqual(totals, {
+            "Tesco": Decimal("109.70"),
+            "Billa": Decimal("97.70"),
+            "Albert": Decimal("87.70"),
+        })
+        self.assertEqual(cheapest, {"supermarket": "Albert", "total": Decimal("87.70")})
+
+    def test_repeated_lines_are_added_up(self):
+        results, _ = calculate_total_per_supermarket([
+            {"product_id": self.milk.id, "quantity": 1},
+            {"product_id": self.milk.id, "quantity": 2},
+        ])
+
+        totals = {row["supermarket"]: row["total"] for row in results}
+        self.assertEqual(totals["Billa"], Decimal("56.70"))
+
+    def test_products_without_variants_are_skipped(self):
+        results, cheapest = calculate_total_per_supermarket([{"product_id": self.cream.id, "quantity": 1}])
+
+        self.assertEqual(results, [])
+        self.assertIsNone(cheapest)
+
+    def test_missing_product_returns_error(self):
+        results, cheapest = calculate_total_per_supermarket([
+            {"product_id": self.milk.id, "quantity": 1},
+            {"product_id": 999999, "quantity": 1},
+        ])
+
+        self.assertEqual(results, {"error": "Product with ID 999999 not found."})
+        self.assertIsNone(cheapest)
+
+    def test_query_count_does_not_grow_with_basket_size(self):
+        basket = [{"product_id": product.id, "quantity": 1} for product in (self.milk, self.butter, self.cream)]
+
+        # Building the matrix costs a fixed number of queries...
+        with self.assertNumQueries(2):
+            calculate_total_per_supermarket(basket)
+
+        # ...after which baskets of any size are priced from memory
+        with self.assertNumQueries(0):
+            calculate_total_per_supermarket(basket * 20)
+
+    def test_matrix_follows_variant_changes(self):
+        calculate_total_per_supermarket([{"product_id": self.milk.id, "quantity": 1}])
+        version = price_matrix.version
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductVariant.objects.create(
+                generic_product=self.milk, supermarket=self.tesco, name="Akční mléko", price=Decimal("9.90")
+            )
+        self.assertGreater(price_matrix.version, version)
+
+        # The write patched its row in place; the next basket needs no rebuild
+        with self.assertNumQueries(0):
+            results, cheapest = calculate_total_per_supermarket([{"product_id": self.milk.id, "quantity": 1}])
+        self.assertEqual(cheapest, {"supermarket": "Tesco", "total": Decimal("9.90")})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductVariant.objects.filter(name="Akční mléko").get().delete()
+
+        with self.assertNumQueries(0):
+            results, cheapest = calculate_total_per_supermarket([{"product_id": self.milk.id, "quantity": 1}])
+        self.assertEqual(cheapest, {"supermarket": "Billa", "total": Decimal("18.90")})
+
+    def test_matrix_picks_up_new_products(self):
+        calculate_total_per_supermarket([{"product_id": self.milk.id, "quantity": 1}])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            yogurt = GenericProduct.objects.create(name="Yogurt", amount=150, unit="g", category=self.milk.category)
+            ProductVariant.objects.create(
+                generic_product=yogurt, supermarket=self.albert, name="Albert Jogurt", price=Decimal("12.90")
+            )
+
+        results, cheapest = calculate_total_per_supermarket([{"product_id": yogurt.id, "quantity": 2}])
+        self.assertEqual(results, [{"supermarket": "Albert", "total": Decimal("25.80")}])
+
+    def test_matrix_follows_writes_from_other_processes(self):
+        calculate_total_per_supermarket([{"product_id": self.milk.id, "quantity": 1}])
+
+        # Another process: rows change without signals here, only the shared version moves
+        ProductVariant.objects.filter(generic_product=self.milk, supermarket=self.billa).update(price=Decimal("29.90"))
+        bump_catalog_version()
+
+        results, cheapest = calculate_total_per_supermarket([{"product_id": self.milk.id, "quantity": 1}])
+        self.assertEqual(cheapest, {"supermarket": "Albert", "total": Decimal("23.90")})
+
+
+class TestOptimizeSplitBasket(BasketTestData):
+    def setUp(self):
+        super().setUp()
+        self.basket = [
+            {"product_id": self.milk.id, "quantity": 1},
+            {"product_id": self.butter.id, "quantity": 1},
+        ]
+
+    def test_splits_across_two_stores_when_cheaper(self):
+        split = optimize_split_basket(self.basket, max_stores=2)
+
+        self.assertEqual(
+            [(store["supermarket"], [item["product_id"] for item in store["items"]]) for store in split["stores"]],
+            [("Albert", [self.butter.id]), ("Billa", [self.milk.id])],
+        )
+        self.assertEqual(split["total"], Decimal("58.80"))
+        self.assertTrue(split["complete"])
+
+    def test_store_penalty_keeps_single_store(self):
+        split = optimize_split_basket(self.basket, max_stores=2, store_penalty=Decimal("10.00"))
+
+        self.assertEqual([store["supermarket"] for store in split["stores"]], ["Albert"])
+        self.assertEqual(split["total"], Decimal("63.80"))
+        self.assertEqual(split["penalty"], Decimal("0.00"))
+
+    def test_unavailable_products_are_reported(self):
+        split = optimize_split_basket(self.basket + [{"product_id": self.cream.id, "quantity": 1}], max_stores=1)
+
+        self.assertEqual(split["unavailable"], [self.cream.id])
+        self.assertEqual(split["total"], Decimal("63.80"))
+
+    def test_missing_product_returns_error(self):
+        split = optimize_split_basket([{"product_id": 999999, "quantity": 1}])
+
+        self.assertEqual(split, {"error": "Product with ID 999999 not found."})
+
+    def test_time_budget_is_respected(self):
+        split = optimize_split_basket(self.basket, time_budget=0)
+
+        self.assertFalse(split["complete"])
+        # Cut short before the search ran: still the cheapest single store, never an empty basket
+        self.assertEqual([store["supermarket"] for store in split["stores"]], ["Albert"])
+        self.assertEqual(split["total"], Decimal("63.80"))
+
+    def test_matches_exhaustive_search(self):
+        rng = random.Random(7)
+        markets = [Supermarket.objects.create(name=f"Market {i}") for i in range(6)]
+        products = []
+        for i in range(8):
+            product = GenericProduct.objects.create(name=f"Product {i}", unit="pcs", category=self.milk.category)
+            for market in rng.sample(markets, rng.randint(2, 6)):
+                ProductVariant.objects.create(
+                    generic_product=product, supermarket=market, name=f"P{i}", price=Decimal(rng.randint(100, 9999)) / 100
+                )
+            products.append(product)
+        price_matrix.invalidate()
+        basket = [{"product_id": product.id, "quantity": rng.randint(1, 3)} for product in products]
+        penalty = Decimal("15.00")
+
+        # Brute force over every subset of at most 3 supermarkets
+        prices = {product.id: price_matrix.cheapest_prices(product.id) for product in products}
+        names = sorted({name for row in prices.values() for name in row})
+        expected = None
+        for size in range(1, 4):
+            for subset in combinations(names, size):
+                if any(not set(subset) & set(prices[item["product_id"]]) for item in basket):
+                    continue
+                total = sum(
+                    min(prices[item["product_id"]][name] for name in subset if name in prices[item["product_id"]]) * item["quantity"]
+                    for item in basket
+                ) + 1500 * (size - 1)
+                expected = total if expected is None else min(expected, total)
+
+        split = optimize_split_basket(basket, max_stores=3, store_penalty=penalty, time_budget=5)
+
+        self.assertEqual(split["total"], Decimal(expected).scaleb(-2))
+
+
+class TestCalculateBasketView(BasketTestData):
+    def test_post_returns_results_and_cheapest_supermarket(self):
+        factory = APIRequestFactory()
+        request = factory.post("/api/cart/basket/", {
+            "basket": [{"product_id": self.milk.id, "quantity": 1}]
+        }, format="json")
+
+        response = calculate_basket(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["cheapest_supermarket"], {"supermarket": "Billa", "total": Decimal("18.90")})
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_post_with_unknown_product_returns_404(self):
+        factory = APIRequestFactory()
+        request = factory.post("/api/cart/basket/", {
+            "basket": [{"product_id": 999999, "quantity": 1}]
+        }, format="json")
+
+        response = calculate_basket(request)
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_in_split_mode_adds_split_basket(self):
+        factory = APIRequestFactory()
+        request = factory.post("/api/cart/basket/", {
+            "basket": [
+                {"product_id": self.milk.id, "quantity": 1},
+                {"product_id": self.butter.id, "quantity": 1},
+            ],
+            "mode": "split",
+            "max_stores": 2,
+            "store_penalty": "4.00",
+        }, format="json")
+
+        response = calculate_basket(request)
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["cheapest_supermarket"]["supermarket"], "Albert")
+        self.assertEqual(response.data["split_basket"]["total"], Decimal("62.80"))
+        self.assertEqual(len(response.data["split_basket"]["stores"]), 2)
@@ -8,13 +8,17 @@ the cheapest option.
 Accessible via:
 - GET: Returns usage instructions.
 - POST: Processes basket and returns pricing results.
+
+With "mode": "split" the response also includes "split_basket": the
+cheapest way to buy the basket across at most "max_stores" supermarkets,
+where every supermarket beyond the first costs "store_penalty".
 """
 
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from shopping_cart.serializers import BasketSerializer
-from shopping_cart.services import calculate_total_per_supermarket
+from shopping_cart.services import calculate_total_per_supermarket, optimize_split_basket
 
 @api_view(['GET', 'POST'])
 def calculate_basket(request):
@@ -26,7 +30,16 @@ def calculate_basket(request):
                     {"product_id": 3, "quantity": 1}
                 ]
             },
-            "instructions": "Send a POST request with JSON like the example to calculate your basket price."
+            "instructions": "Send a POST request with JSON like the example to calculate your basket price.",
+            "split_example": {
+                "basket": [
+                    {"product_id": 1, "quantity": 2},
+                    {"product_id": 3, "quantity": 1}
+                ],
+                "mode": "split",
+                "max_stores": 2,
+                "store_penalty": "20.00"
+            }
         })
 
     # Validate basket structure
@@ -42,7 +55,17 @@ def calculate_basket(request):
     if isinstance(results, dict) and "error" in results:
         return Response(results, status=status.HTTP_404_NOT_FOUND)
 
-    return Response({
+    response = {
         "results": results,
         "cheapest_supermarket": cheapest
-    }, status=status.HTTP_200_OK)
\ No newline at end of file
+    }
+
+    # Optionally split the basket across several supermarkets
+    if serializer.validated_data["mode"] == "split":
+        response["split_basket"] = optimize_split_basket(
+            basket,
+            max_stores=serializer.validated_data["max_stores"],
+            store_penalty=serializer.validated_data["store_penalty"],
+        )
+
+    return Response(response, status=status.HTTP_200_OK)
\ No newline at end of file